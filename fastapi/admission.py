@@ -0,0 +1,422 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import re
+import time
+
+from starlette.exceptions import HTTPException
+
+from artifact_store import ARTIFACT_MAX_UPLOAD_BYTES
+from database import acquire
+from fast_json import dumps
+from metrics import ADMISSION_REJECTED
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# 유입 제어 설정
+# ============================================
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") == "1"
+# memory: 워커별 토큰 버킷, mysql: web 스키마의 admission_buckets 테이블을 워커 간에 공유
+ADMISSION_BACKEND = os.getenv("ADMISSION_BACKEND", "memory")
+# 규칙 기본값을 덮어쓰는 JSON 파일 ({"규칙 이름": {"client_rate": 10, ...}})
+ADMISSION_CONFIG = os.getenv("ADMISSION_CONFIG")
+# 워커 하나가 동시에 처리할 요청 수 상한. 넘으면 503 (0 이면 사용 안 함)
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "0"))
+# 동시 처리 상한에 걸린 요청이 대기열에서 기다리는 최대 시간(초)
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+# 프록시 뒤에서 실행할 때 X-Forwarded-For 의 첫 주소를 클라이언트로 사용
+ADMISSION_TRUST_FORWARDED = os.getenv("ADMISSION_TRUST_FORWARDED", "0") == "1"
+
+# 전체 동시 처리 상한에서도 제외하는 경로 (모니터링, 헬스 체크)
+EXEMPT_PATHS = {"/metrics", "/test", "/db-pool-stats", "/admission-stats"}
+
+
+class AdmissionRule:
+    """경로별 유입 제어 규칙.
+
+    - client_rate/client_burst: 클라이언트(IP)별 토큰 버킷 (초당 요청 수, 순간 허용량)
+    - route_rate/route_burst: 경로 전체 토큰 버킷
+    - max_concurrent/max_queue: 동시 처리 수와 대기열 길이 (워커별). 대기열이 차면 503
+    - max_body_bytes: 요청 본문 최대 크기. 넘으면 413
+    0 또는 None 은 해당 제한을 사용하지 않음을 뜻합니다.
+    """
+
+    FIELDS = ("client_rate", "client_burst", "route_rate", "route_burst",
+              "max_concurrent", "max_queue", "max_body_bytes")
+
+    def __init__(self, name: str, method: str, pattern: str, client_rate=0, client_burst=0,
+                 route_rate=0, route_burst=0, max_concurrent=0, max_queue=0, max_body_bytes=0):
+        self.name = name
+        self.method = method
+        self.pattern = re.compile(pattern)
+        self.client_rate = client_rate
+        self.client_burst = client_burst or client_rate
+        self.route_rate = route_rate
+        self.route_burst = route_burst or route_rate
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_body_bytes = max_body_bytes
+
+    def update(self, overrides: dict):
+        unknown = set(overrides) - set(self.FIELDS)
+        if unknown:
+            raise ValueError(f"{self.name}: 알 수 없는 설정 {', '.join(sorted(unknown))}")
+        for field, value in overrides.items():
+            setattr(self, field, value)
+
+    def matches(self, method: str, path: str) -> bool:
+        return method == self.method and self.pattern.match(path) is not None
+
+
+# 비용이 큰 엔드포인트의 기본 규칙 (ADMISSION_CONFIG 로 조정)
+ADMISSION_RULES = [
+    # 로그인 반복 시도 제한 (사용자 이름이 아닌 클라이언트 기준이라 다른 사람을 잠글 수 없음)
+    AdmissionRule("login", "POST", r"^/$", client_rate=1, client_burst=10),
+    # DB 조회 + 외부 모델 API 호출
+    AdmissionRule("welding-select", "GET", r"^/engineering/realtime-welding/select$",
+                  client_rate=5, client_burst=10, route_rate=200, route_burst=400,
+                  max_concurrent=64, max_queue=128),
+    AdmissionRule("stock-history", "GET", r"^/management/stock-history/[^/]+$",
+                  client_rate=2, client_burst=10, route_rate=100, route_burst=200),
+    AdmissionRule("bulk-score", "POST", r"^/engineering/bulk-score$",
+                  client_rate=0.2, client_burst=2, max_concurrent=2, max_queue=4),
+    # 대용량 업로드. 본문에는 파일 외에 폼 필드가 있으므로 여유분을 둠
+    AdmissionRule("model-apply", "POST", r"^/model-deployment/model-apply$",
+                  client_rate=0.2, client_burst=3, max_concurrent=2, max_queue=4,
+                  max_body_bytes=ARTIFACT_MAX_UPLOAD_BYTES + 1024 * 1024 if ARTIFACT_MAX_UPLOAD_BYTES else 0),
+]
+
+
+def load_rules(path=ADMISSION_CONFIG):
+    rules = ADMISSION_RULES
+    if path:
+        with open(path) as f:
+            overrides = json.load(f)
+        by_name = {rule.name: rule for rule in rules}
+        for name, values in overrides.items():
+            if name not in by_name:
+                raise ValueError(f"알 수 없는 유입 제어 규칙: {name}")
+            by_name[name].update(values)
+    return rules
+
+
+# ============================================
+# 토큰 버킷 저장소
+# ============================================
+
+class MemoryRateLimitBackend:
+    """워커 내부 토큰 버킷 (단일 워커 또는 워커별 제한)"""
+
+    SWEEP_EVERY = 1024
+
+    def __init__(self):
+        self._buckets = {}
+        self._calls = 0
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        """토큰 하나를 사용합니다. 허용이면 0, 거절이면 다음 토큰까지 남은 시간(초)"""
+        now = time.monotonic()
+        self._calls += 1
+        if self._calls % self.SWEEP_EVERY == 0:
+            self._sweep(now)
+        tokens, updated, _ = self._buckets.get(key, (burst, now, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        # 세 번째 값은 버킷이 다시 가득 차는 시각 (정리 기준)
+        self._buckets[key] = (tokens, now, now + (burst - tokens) / rate)
+        return wait
+
+    def _sweep(self, now: float):
+        # 다시 가득 찬 버킷은 지워도 새 버킷과 같으므로 정리 (클라이언트별 키가 계속 늘지 않도록)
+        for key in [k for k, (_, _, full_at) in self._buckets.items() if full_at <= now]:
+            del self._buckets[key]
+
+
+class MySQLRateLimitBackend:
+    """web 스키마의 admission_buckets 테이블로 워커 간에 토큰 버킷을 공유합니다.
+
+    갱신은 INSERT ... ON DUPLICATE KEY UPDATE 한 문장으로 원자적으로 처리하고,
+    갱신 전 토큰 수는 세션 변수로 읽습니다. 시각은 같은 호스트의 워커끼리 비교하므로 time.time() 을 사용합니다.
+    """
+
+    def __init__(self, db: str = "web"):
+        self.db = db
+        self._ready = False
+
+    async def _ensure_table(self, cursor):
+        if self._ready:
+            return
+        await cursor.execute(
+            """CREATE TABLE IF NOT EXISTS admission_buckets (
+                bucket_key VARCHAR(191) NOT NULL PRIMARY KEY,
+                tokens DOUBLE NOT NULL,
+                updated_at DOUBLE NOT NULL
+            )"""
+        )
+        self._ready = True
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        now = time.time()
+        async with acquire(self.db) as conn, conn.cursor() as cursor:
+            await self._ensure_table(cursor)
+            # 새 버킷이면 VALUES 에서, 기존 버킷이면 UPDATE 에서 @admission_tokens 가 채워짐
+            await cursor.execute(
+                "INSERT INTO admission_buckets (bucket_key, tokens, updated_at) "
+                "VALUES (%s, (@admission_tokens := %s) - 1, %s) "
+                "ON DUPLICATE KEY UPDATE "
+                "tokens = IF((@admission_tokens := LEAST(%s, tokens + GREATEST(VALUES(updated_at) - updated_at, 0) * %s)) >= 1, "
+                "@admission_tokens - 1, @admission_tokens), "
+                "updated_at = VALUES(updated_at)",
+                (key, burst, now, burst, rate),
+            )
+            await cursor.execute("SELECT @admission_tokens")
+            (tokens,) = await cursor.fetchone()
+        tokens = float(tokens)
+        return 0.0 if tokens >= 1 else (1 - tokens) / rate
+
+
+def make_rate_limit_backend(backend: str = ADMISSION_BACKEND):
+    if backend == "memory":
+        return MemoryRateLimitBackend()
+    if backend == "mysql":
+        return MySQLRateLimitBackend()
+    raise ValueError(f"Unknown admission backend: {backend}")
+
+
+# ============================================
+# 동시 처리 제한
+# ============================================
+
+class ConcurrencyLimiter:
+    """동시 처리 수를 제한하고, 대기열이 max_queue 를 넘거나 timeout 안에 차례가 오지 않으면 거절합니다."""
+
+    def __init__(self, limit: int, max_queue: int, timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def acquire(self) -> bool:
+        if not self._semaphore.locked():
+            # 빈 자리가 있으면 이벤트 루프에 양보하지 않고 바로 획득
+            await self._semaphore.acquire()
+        else:
+            if self.waiting >= self.max_queue:
+                return False
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                return False
+            finally:
+                self.waiting -= 1
+        self.active += 1
+        return True
+
+    def release(self):
+        self.active -= 1
+        self._semaphore.release()
+
+
+# ============================================
+# 유입 제어기
+# ============================================
+
+class Rejected(Exception):
+    def __init__(self, status: int, reason: str, detail: str, retry_after: float = ADMISSION_RETRY_AFTER):
+        super().__init__(detail)
+        self.status = status
+        self.reason = reason
+        self.detail = detail
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class BodyTooLarge(HTTPException):
+    """본문을 읽는 도중 제한을 넘음. FastAPI 가 본문 파싱 중 발생한 HTTPException 은 그대로 응답으로 바꿉니다."""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(status_code=413, detail=f"요청 본문이 제한({max_bytes} bytes)을 넘었습니다.")
+
+
+class AdmissionController:
+    """요청마다 규칙을 찾아 토큰 버킷 → 동시 처리 제한 순서로 검사합니다."""
+
+    def __init__(self, rules=None, backend=None, max_in_flight: int = ADMISSION_MAX_IN_FLIGHT):
+        self.rules = list(rules if rules is not None else load_rules())
+        self.backend = backend if backend is not None else make_rate_limit_backend()
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._limiters = {
+            rule.name: ConcurrencyLimiter(rule.max_concurrent, rule.max_queue)
+            for rule in self.rules if rule.max_concurrent
+        }
+
+    def match(self, method: str, path: str):
+        for rule in self.rules:
+            if rule.matches(method, path):
+                return rule
+        return None
+
+    async def _take(self, key: str, rate: float, burst: float) -> float:
+        try:
+            return await self.backend.take(key, rate, burst)
+        except Exception as e:
+            # 저장소 장애로 서비스 전체가 막히지 않도록 허용
+            logger.warning("admission backend failed, allowing request: %s", e)
+            return 0.0
+
+    async def check_rate(self, rule: AdmissionRule, client: str):
+        if rule.client_rate:
+            wait = await self._take(f"{rule.name}:client:{client}", rule.client_rate, rule.client_burst)
+            if wait:
+                raise Rejected(429, "client_rate", "요청이 너무 많습니다. 잠시 후 다시 시도하세요.", wait)
+        if rule.route_rate:
+            wait = await self._take(f"{rule.name}:route", rule.route_rate, rule.route_burst)
+            if wait:
+                raise Rejected(429, "route_rate", "요청이 너무 많습니다. 잠시 후 다시 시도하세요.", wait)
+
+    async def enter(self, rule: AdmissionRule):
+        """동시 처리 자리를 얻고, 반납할 limiter (없으면 None) 를 돌려줍니다."""
+        limiter = self._limiters.get(rule.name)
+        if limiter is None:
+            return None
+        if not await limiter.acquire():
+            raise Rejected(503, "queue_full", "서버가 혼잡합니다. 잠시 후 다시 시도하세요.")
+        return limiter
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "limiters": {
+                name: {"active": limiter.active, "waiting": limiter.waiting,
+                       "limit": limiter.limit, "max_queue": limiter.max_queue}
+                for name, limiter in self._limiters.items()
+            },
+        }
+
+
+admission_controller = AdmissionController()
+
+
+# ============================================
+# ASGI 미들웨어
+# ============================================
+
+def client_key(scope) -> str:
+    if ADMISSION_TRUST_FORWARDED:
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _content_length(scope):
+    for name, value in scope["headers"]:
+        if name == b"content-length":
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
+
+
+async def _send_rejection(send, rejected: Rejected):
+    body = dumps({"detail": rejected.detail})
+    await send({
+        "type": "http.response.start",
+        "status": rejected.status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"retry-after", str(rejected.retry_after).encode("latin-1")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """경로별 토큰 버킷, 동시 처리/대기열 제한, 본문 크기 제한, 워커 전체 동시 처리 상한을 적용합니다.
+
+    거절은 429(요청 빈도) 또는 503(혼잡), 413(본문 크기) 이며 Retry-After 헤더를 포함합니다.
+    """
+
+    def __init__(self, app, controller: AdmissionController = None):
+        self.app = app
+        self.controller = controller if controller is not None else admission_controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ADMISSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        controller = self.controller
+        path = scope["path"]
+        rule = controller.match(scope["method"], path)
+        rule_name = rule.name if rule is not None else "global"
+        limiter = None
+        try:
+            if (controller.max_in_flight and controller.in_flight >= controller.max_in_flight
+                    and path not in EXEMPT_PATHS):
+                raise Rejected(503, "overloaded", "서버가 혼잡합니다. 잠시 후 다시 시도하세요.")
+            if rule is not None:
+                if rule.max_body_bytes and (_content_length(scope) or 0) > rule.max_body_bytes:
+                    raise Rejected(413, "body_too_large", f"요청 본문이 제한({rule.max_body_bytes} bytes)을 넘었습니다.")
+                await controller.check_rate(rule, client_key(scope))
+                limiter = await controller.enter(rule)
+        except Rejected as rejected:
+            ADMISSION_REJECTED.labels(rule_name, rejected.reason).inc()
+            await _send_rejection(send, rejected)
+            return
+
+        if rule is not None and rule.max_body_bytes:
+            receive = self._limit_body(receive, rule)
+
+        started = False
+
+        async def send_wrapper(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        controller.in_flight += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BodyTooLarge as e:
+            # 라우트가 예외를 응답으로 바꾸지 않고 그대로 올린 경우
+            if not started:
+                await _send_rejection(send, Rejected(413, "body_too_large", e.detail))
+        finally:
+            controller.in_flight -= 1
+            if limiter is not None:
+                limiter.release()
+
+    @staticmethod
+    def _limit_body(receive, rule: AdmissionRule):
+        """Content-Length 없이(chunked) 보낸 본문도 읽은 만큼 세어 제한을 넘으면 중단"""
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > rule.max_body_bytes:
+                    ADMISSION_REJECTED.labels(rule.name, "body_too_large").inc()
+                    raise BodyTooLarge(rule.max_body_bytes)
+            return message
+
+        return limited_receive
@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+
+# ============================================
+# 모델 아티팩트 저장소 설정
+# ============================================
+
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "artifacts"))
+ARTIFACT_CHUNK_SIZE = int(os.getenv("ARTIFACT_CHUNK_SIZE", str(1024 * 1024)))
+# 업로드 한 건의 최대 크기 (model-apply). 0 이면 제한 없음
+ARTIFACT_MAX_UPLOAD_BYTES = int(os.getenv("ARTIFACT_MAX_UPLOAD_BYTES", str(512 * 1024 * 1024)))
+
+# DB 에는 파일 대신 "sha256:<hex>" 형태의 참조만 저장
+DIGEST_PREFIX = "sha256:"
+_DIGEST_RE = re.compile(r"^sha256:[0-9a-f]{64}$")
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class ArtifactTooLarge(Exception):
+    pass
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def as_digest(value):
+    """DB 컬럼 값이 아티팩트 참조이면 digest 문자열을, 아니면(예전 방식의 원본 바이너리) None 을 반환"""
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray)):
+        if len(value) != len(DIGEST_PREFIX) + 64:
+            return None
+        try:
+            value = value.decode("ascii")
+        except UnicodeDecodeError:
+            return None
+    return value if _DIGEST_RE.match(value) else None
+
+
+def parse_range(header: str, size: int):
+    """단일 Range 헤더를 (start, end) 포함 구간으로 해석합니다."""
+    m = _RANGE_RE.match(header.strip())
+    if not m or (not m.group(1) and not m.group(2)):
+        raise RangeNotSatisfiable(header)
+    if m.group(1):
+        start = int(m.group(1))
+        end = int(m.group(2)) if m.group(2) else size - 1
+    else:
+        # bytes=-N : 마지막 N 바이트
+        start = max(size - int(m.group(2)), 0)
+        end = size - 1
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        raise RangeNotSatisfiable(header)
+    return start, end
+
+
+class ArtifactStore:
+    """SHA-256 기반 콘텐츠 주소 저장소 (로컬 디스크, 오브젝트 스토리지 대용).
+
+    같은 내용의 파일은 한 번만 저장됩니다.
+    """
+
+    def __init__(self, root: str = ARTIFACT_DIR, chunk_size: int = ARTIFACT_CHUNK_SIZE):
+        self.root = root
+        self.chunk_size = chunk_size
+
+    def path_for(self, digest: str) -> str:
+        hex_digest = digest[len(DIGEST_PREFIX):]
+        return os.path.join(self.root, hex_digest[:2], hex_digest[2:4], hex_digest)
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self.path_for(digest))
+
+    def size(self, digest: str) -> int:
+        return os.path.getsize(self.path_for(digest))
+
+    async def save_upload(self, upload, max_bytes=None):
+        """업로드 파일을 청크 단위로 읽으며 해시를 계산해 저장합니다. (digest, size) 반환"""
+        tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        hasher = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while True:
+                    chunk = await upload.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if max_bytes is not None and size > max_bytes:
+                        raise ArtifactTooLarge(f"파일 크기가 제한({max_bytes} bytes)을 넘었습니다.")
+                    hasher.update(chunk)
+                    await asyncio.to_thread(f.write, chunk)
+            digest = DIGEST_PREFIX + hasher.hexdigest()
+            path = self.path_for(digest)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+            return digest, size
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _read_all(self, digest: str) -> bytes:
+        with open(self.path_for(digest), "rb") as f:
+            return f.read()
+
+    async def read_bytes(self, digest: str) -> bytes:
+        return await asyncio.to_thread(self._read_all, digest)
+
+    def iter_range(self, digest: str, start: int, end: int):
+        """메모리 매핑으로 [start, end] 구간을 청크 단위로 내보냅니다."""
+        with open(self.path_for(digest), "rb") as f:
+            if end < start:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                position = start
+                while position <= end:
+                    stop = min(position + self.chunk_size, end + 1)
+                    yield mm[position:stop]
+                    position = stop
+
+
+artifact_store = ArtifactStore()
@@ -0,0 +1,251 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import time
+import uuid
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+from database import acquire
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# 토큰 설정
+# ============================================
+
+# 모든 워커가 같은 키를 써야 하므로 운영에서는 반드시 AUTH_SECRET 을 설정
+AUTH_SECRET = os.getenv("AUTH_SECRET", "")
+# 1 이면 AUTH_SECRET 없이 시작 (프로세스마다 임의의 키를 만들므로 재시작하거나 워커가 바뀌면 토큰이 무효)
+AUTH_DEV_MODE = os.getenv("AUTH_DEV_MODE", "0") == "1"
+if not AUTH_SECRET:
+    if not AUTH_DEV_MODE:
+        raise RuntimeError("AUTH_SECRET 이 설정되지 않았습니다. 개발 환경에서는 AUTH_DEV_MODE=1 로 실행하세요.")
+    AUTH_SECRET = secrets.token_urlsafe(32)
+    logger.warning("AUTH_SECRET is not set; using a random per-process secret (AUTH_DEV_MODE=1)")
+TOKEN_TTL_SECONDS = int(os.getenv("TOKEN_TTL_SECONDS", str(12 * 3600)))
+# 다른 워커에서 로그아웃한 토큰 목록을 가져오는 주기(초)
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "5"))
+LAST_LOGIN_FLUSH_SECONDS = float(os.getenv("LAST_LOGIN_FLUSH_SECONDS", "5"))
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(AUTH_SECRET.encode(), payload.encode("ascii"), hashlib.sha256).digest())
+
+
+def issue_token(employee_no: int, name: str, position: str, ttl: int = TOKEN_TTL_SECONDS) -> str:
+    """HMAC-SHA256 서명 토큰 발급. 검증에 DB 가 필요 없도록 사번/직급을 담습니다."""
+    now = int(time.time())
+    claims = {
+        "sub": employee_no,
+        "name": name,
+        "position": position,
+        "iat": now,
+        "exp": now + ttl,
+        "jti": uuid.uuid4().hex,
+    }
+    payload = _b64encode(json.dumps(claims, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+    return f"{payload}.{_sign(payload)}"
+
+
+def decode_token(token: str) -> dict:
+    """서명과 만료를 검증하고 클레임을 반환합니다. 실패 시 ValueError"""
+    try:
+        payload, signature = token.split(".")
+    except ValueError:
+        raise ValueError("malformed token")
+    try:
+        expected = _sign(payload)
+    except UnicodeEncodeError:
+        raise ValueError("malformed token")
+    # 헤더는 latin-1 로 디코딩되어 ASCII 가 아닌 문자가 올 수 있으므로 (str 로 비교하면 TypeError) 바이트로 비교
+    if not hmac.compare_digest(signature.encode("latin-1", "replace"), expected.encode("ascii")):
+        raise ValueError("invalid signature")
+    try:
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        raise ValueError("malformed token")
+    if claims.get("exp", 0) < time.time():
+        raise ValueError("token expired")
+    return claims
+
+
+# ============================================
+# 로그아웃 토큰 목록
+# ============================================
+
+class RevocationList:
+    """로그아웃된 토큰(jti) 목록.
+
+    검증은 메모리에서만 하고, 로그아웃은 revoked_tokens 테이블에도 기록해
+    다른 워커가 주기적으로 가져갑니다.
+    """
+
+    def __init__(self, sync_seconds: float = REVOCATION_SYNC_SECONDS):
+        self.sync_seconds = sync_seconds
+        self._revoked = {}
+        self._synced_until = 0
+        self._task = None
+        self._ready = False
+
+    def is_revoked(self, jti: str) -> bool:
+        return jti in self._revoked
+
+    async def _ensure_table(self, cursor):
+        if self._ready:
+            return
+        await cursor.execute(
+            """CREATE TABLE IF NOT EXISTS revoked_tokens (
+                jti CHAR(32) NOT NULL PRIMARY KEY,
+                expires_at BIGINT NOT NULL,
+                revoked_at BIGINT NOT NULL,
+                KEY idx_revoked_at (revoked_at)
+            )"""
+        )
+        self._ready = True
+
+    async def revoke(self, jti: str, expires_at: int):
+        self._revoked[jti] = expires_at
+        async with acquire("web") as conn, conn.cursor() as cursor:
+            await self._ensure_table(cursor)
+            await cursor.execute(
+                "INSERT IGNORE INTO revoked_tokens (jti, expires_at, revoked_at) VALUES (%s, %s, %s)",
+                (jti, expires_at, int(time.time()))
+            )
+
+    async def sync(self):
+        now = int(time.time())
+        async with acquire("web") as conn, conn.cursor() as cursor:
+            await self._ensure_table(cursor)
+            await cursor.execute(
+                "SELECT jti, expires_at, revoked_at FROM revoked_tokens WHERE revoked_at >= %s AND expires_at > %s",
+                (self._synced_until, now)
+            )
+            for jti, expires_at, revoked_at in await cursor.fetchall():
+                self._revoked[jti] = expires_at
+                self._synced_until = max(self._synced_until, revoked_at)
+        # 만료된 토큰은 어차피 거부되므로 목록에서 제거
+        for jti in [j for j, exp in self._revoked.items() if exp <= now]:
+            del self._revoked[jti]
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.warning("revocation sync failed: %s", e)
+            await asyncio.sleep(self.sync_seconds)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="revocation-sync")
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+
+revocation_list = RevocationList()
+
+
+# ============================================
+# 마지막 로그인 시각 일괄 기록
+# ============================================
+
+class LastLoginWriter:
+    """로그인마다 UPDATE 하지 않고 모아 두었다가 한 문장으로 기록합니다."""
+
+    def __init__(self, flush_seconds: float = LAST_LOGIN_FLUSH_SECONDS):
+        self.flush_seconds = flush_seconds
+        self._pending = {}
+        self._task = None
+
+    def record(self, employee_no: int, login_time: str):
+        # 같은 사번이 여러 번 로그인하면 마지막 시각만 남김
+        self._pending[employee_no] = login_time
+
+    async def flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        cases = " ".join(["WHEN %s THEN %s"] * len(pending))
+        placeholders = ", ".join(["%s"] * len(pending))
+        params = [value for item in pending.items() for value in item] + list(pending)
+        try:
+            async with acquire("web") as conn, conn.cursor() as cursor:
+                await cursor.execute(
+                    f"UPDATE employees SET last_login = CASE employee_no {cases} END "
+                    f"WHERE employee_no IN ({placeholders})",
+                    params
+                )
+        except Exception:
+            # 실패한 항목은 다음 주기에 다시 시도 (그 사이 새 로그인이 있으면 그 값을 유지)
+            for employee_no, login_time in pending.items():
+                self._pending.setdefault(employee_no, login_time)
+            raise
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning("last_login flush failed: %s", e)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="last-login-writer")
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.warning("last_login final flush failed: %s", e)
+
+
+last_login_writer = LastLoginWriter()
+
+
+# ============================================
+# FastAPI 의존성
+# ============================================
+
+async def get_current_user(authorization: Optional[str] = Header(None)) -> dict:
+    """Authorization: Bearer <token> 을 DB 조회 없이 검증합니다."""
+    if not authorization or not authorization.lower().startswith("bearer "):
+        raise HTTPException(status_code=401, detail="인증 토큰이 없습니다.",
+                            headers={"WWW-Authenticate": "Bearer"})
+    try:
+        claims = decode_token(authorization[7:].strip())
+    except ValueError as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
+    if revocation_list.is_revoked(claims["jti"]):
+        raise HTTPException(status_code=401, detail="로그아웃된 토큰입니다.",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return claims
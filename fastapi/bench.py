@@ -0,0 +1,659 @@
+"""API 벤치마크 (로컬 MariaDB + 외부 서비스 스텁)
+
+    python bench.py --mariadb --seed                       # MariaDB 컨테이너를 띄우고 시드 후 측정
+    DB_HOST=127.0.0.1 DB_USER=root DB_PASSWORD=... python bench.py --seed
+    python bench.py --only login,user-list -n 2000 -c 32 -o bench.json
+    python bench.py --compare baseline.json bench.json     # 회귀 비교 (악화 시 종료 코드 1)
+
+모델 API, Superset, 네이버 금융은 이 프로세스 안의 aiohttp 스텁 서버로 대체하고,
+앱은 server.py 를 별도 프로세스로 실행해 실제 운영과 같은 경로(uvicorn, 커넥션 풀, 미들웨어)로 측정합니다.
+시나리오별 RPS, 지연 시간 p50/p95/p99, 요청당 DB 왕복 횟수(/metrics 의 http_request_db_queries)를 JSON 으로 기록합니다.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import secrets
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import aiomysql
+import httpx
+import numpy as np
+
+from database import DATABASES
+
+# ============================================
+# 벤치마크 설정
+# ============================================
+
+BENCH_DB_IMAGE = os.getenv("BENCH_DB_IMAGE", "mariadb:11")
+BENCH_DB_PORT = int(os.getenv("BENCH_DB_PORT", "33306"))
+BENCH_DB_PASSWORD = os.getenv("BENCH_DB_PASSWORD", "bench")
+BENCH_SEED = int(os.getenv("BENCH_SEED", "42"))
+
+BENCH_USER = ("user000001", 1)
+BENCH_SYMBOL = "005380"
+
+# (이름, 메서드, 경로, 지표의 라우트 템플릿, JSON 본문)
+SCENARIOS = [
+    ("login", "POST", "/", "/", {"username": BENCH_USER[0], "employee_no": BENCH_USER[1]}),
+    ("press-insert", "GET", "/engineering/realtime-press/insert", "/engineering/realtime-press/insert", None),
+    ("press-select", "GET", "/engineering/realtime-press/select", "/engineering/realtime-press/select", None),
+    ("welding-insert", "GET", "/engineering/realtime-welding/insert?stream=bench",
+     "/engineering/realtime-welding/insert", None),
+    ("welding-select", "GET", "/engineering/realtime-welding/select?stream=bench",
+     "/engineering/realtime-welding/select", None),
+    ("user-list", "GET", "/user-management/user-list?limit=100", "/user-management/user-list", None),
+    ("model-management-select", "GET", "/model-management/model-select", "/model-management/model-select", None),
+    ("model-deployment-select", "GET", "/model-deployment/model-select", "/model-deployment/model-select", None),
+    ("sales-hd", "GET", "/management/sales/hd", "/management/sales/hd", None),
+    ("sales-kia", "GET", "/management/sales/kia", "/management/sales/kia", None),
+    ("stock-history", "GET", f"/management/stock-history/{BENCH_SYMBOL}", "/management/stock-history/{symbol}", None),
+]
+
+POSITIONS = ["admin", "manager", "engineer", "operator"]
+MACHINES = ["machine_1", "machine_2", "machine_3", "machine_4"]
+ITEMS = ["item_A", "item_B", "item_C"]
+
+
+# ============================================
+# 스키마 및 시드 데이터
+# ============================================
+
+SCHEMA = {
+    "web": [
+        """CREATE TABLE employees (
+            name VARCHAR(64) NOT NULL,
+            employee_no INT NOT NULL PRIMARY KEY,
+            position VARCHAR(32) NOT NULL,
+            last_login DATETIME NULL,
+            KEY idx_name (name),
+            KEY idx_position (position, employee_no),
+            KEY idx_last_login (last_login)
+        )""",
+        """CREATE TABLE user_groups (
+            id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            group_name VARCHAR(64) NOT NULL UNIQUE,
+            description VARCHAR(255) NULL
+        )""",
+        """CREATE TABLE model_info (
+            model_info_id VARCHAR(255) NOT NULL PRIMARY KEY,
+            model_name VARCHAR(255) NOT NULL,
+            model_version VARCHAR(32) NOT NULL,
+            python_version VARCHAR(32) NOT NULL,
+            library VARCHAR(64) NOT NULL,
+            model_type VARCHAR(64) NOT NULL,
+            deployment_date DATETIME NOT NULL,
+            loss DOUBLE NOT NULL,
+            accuracy DOUBLE NOT NULL,
+            model_info_file LONGBLOB NULL
+        )""",
+        """CREATE TABLE model_use (
+            model_use_id VARCHAR(255) NOT NULL PRIMARY KEY,
+            model_use_state TINYINT NOT NULL DEFAULT 0,
+            model_use_file LONGBLOB NULL
+        )""",
+        "CREATE TABLE HD_sales (year VARCHAR(4) NOT NULL PRIMARY KEY, count INT NOT NULL)",
+        "CREATE TABLE KIA_sales (year VARCHAR(4) NOT NULL PRIMARY KEY, count INT NOT NULL)",
+    ],
+    "press": [
+        """CREATE TABLE press_raw_data (
+            idx BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            machine_name VARCHAR(64) NOT NULL,
+            item_no VARCHAR(64) NOT NULL,
+            working_time DATETIME NOT NULL,
+            press_time_ms DOUBLE NOT NULL,
+            pressure_1 DOUBLE NOT NULL,
+            pressure_2 DOUBLE NOT NULL,
+            pressure_5 DOUBLE NOT NULL,
+            KEY idx_working_time (working_time)
+        )""",
+    ],
+    "welding": [
+        """CREATE TABLE welding_raw_data (
+            idx BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            machine_name VARCHAR(64) NOT NULL,
+            item_no VARCHAR(64) NOT NULL,
+            working_time DATETIME NOT NULL,
+            thickness_1_mm DOUBLE NOT NULL,
+            thickness_2_mm DOUBLE NOT NULL,
+            welding_force_bar DOUBLE NOT NULL,
+            welding_current_ka DOUBLE NOT NULL,
+            weld_voltage_v DOUBLE NOT NULL,
+            weld_time_ms DOUBLE NOT NULL,
+            KEY idx_working_time (working_time)
+        )""",
+    ],
+}
+
+# 시드할 때 함께 지우는 테이블 (앱이 필요할 때 직접 생성하는 상태 테이블 포함)
+DROP_TABLES = {
+    "web": ["employees", "user_groups", "model_info", "model_use", "HD_sales", "KIA_sales",
+            "replay_cursor", "revoked_tokens"],
+    "press": ["press_raw_data"],
+    "welding": ["welding_raw_data"],
+}
+
+SEED_BATCH_ROWS = 5000
+
+
+def _employee_rows(rng, count, now):
+    for n in range(1, count + 1):
+        last_login = None if rng.random() < 0.2 else now - timedelta(seconds=rng.randrange(90 * 86400))
+        yield (f"user{n:06d}", n, rng.choice(POSITIONS), last_login)
+
+
+def _press_rows(rng, count, start):
+    for n in range(count):
+        yield (rng.choice(MACHINES), rng.choice(ITEMS), start + timedelta(seconds=n),
+               rng.gauss(600, 20), rng.gauss(150, 5), rng.gauss(140, 5), rng.gauss(120, 4))
+
+
+def _welding_rows(rng, count, start):
+    for n in range(count):
+        yield (rng.choice(MACHINES), rng.choice(ITEMS), start + timedelta(seconds=n),
+               rng.gauss(1.2, 0.05), rng.gauss(1.6, 0.05), rng.gauss(3.0, 0.2),
+               rng.gauss(12.0, 0.5), rng.gauss(4.5, 0.2), rng.gauss(250, 10))
+
+
+async def _insert_many(cursor, sql, rows):
+    """SEED_BATCH_ROWS 씩 다중 행 INSERT (aiomysql executemany 가 한 문장으로 묶음)"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= SEED_BATCH_ROWS:
+            await cursor.executemany(sql, batch)
+            batch = []
+    if batch:
+        await cursor.executemany(sql, batch)
+
+
+async def seed(db_config, employees: int, sensor_rows: int, models: int, seed_value: int = BENCH_SEED):
+    """스키마를 새로 만들고 같은 시드로 항상 같은 데이터를 넣습니다."""
+    rng = random.Random(seed_value)
+    now = datetime(2024, 6, 1, 9, 0, 0)
+    conn = await aiomysql.connect(autocommit=True, **db_config)
+    try:
+        async with conn.cursor() as cursor:
+            for db, schema in DATABASES.items():
+                await cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{schema}` DEFAULT CHARACTER SET utf8mb4")
+                await cursor.execute(f"USE `{schema}`")
+                for table in DROP_TABLES[db]:
+                    await cursor.execute(f"DROP TABLE IF EXISTS {table}")
+                for ddl in SCHEMA[db]:
+                    await cursor.execute(ddl)
+
+            await cursor.execute(f"USE `{DATABASES['web']}`")
+            await _insert_many(
+                cursor, "INSERT INTO employees (name, employee_no, position, last_login) VALUES (%s, %s, %s, %s)",
+                _employee_rows(rng, employees, now),
+            )
+            await _insert_many(
+                cursor, "INSERT INTO user_groups (group_name, description) VALUES (%s, %s)",
+                ((f"group_{n}", f"bench group {n}") for n in range(1, 21)),
+            )
+            await _insert_many(
+                cursor,
+                "INSERT INTO model_info (model_info_id, model_name, model_version, python_version, library, "
+                "model_type, deployment_date, loss, accuracy) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                (
+                    (f"model_{n}", f"welding_model_{n}", f"1.{n}", "3.10", "xgboost", "classification",
+                     now - timedelta(days=models - n), round(rng.uniform(0.05, 0.4), 4), round(rng.uniform(0.8, 0.99), 4))
+                    for n in range(1, models + 1)
+                ),
+            )
+            await cursor.execute(
+                "INSERT INTO model_use (model_use_id, model_use_state) VALUES (%s, 1)", (f"model_{models}",)
+            )
+            for table in ("HD_sales", "KIA_sales"):
+                await _insert_many(
+                    cursor, f"INSERT INTO {table} (year, count) VALUES (%s, %s)",
+                    ((str(year), rng.randrange(1_000_000, 4_000_000)) for year in range(2010, 2024)),
+                )
+
+            await cursor.execute(f"USE `{DATABASES['press']}`")
+            await _insert_many(
+                cursor,
+                "INSERT INTO press_raw_data (machine_name, item_no, working_time, press_time_ms, "
+                "pressure_1, pressure_2, pressure_5) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                _press_rows(rng, sensor_rows, now),
+            )
+            await cursor.execute(f"USE `{DATABASES['welding']}`")
+            await _insert_many(
+                cursor,
+                "INSERT INTO welding_raw_data (machine_name, item_no, working_time, thickness_1_mm, thickness_2_mm, "
+                "welding_force_bar, welding_current_ka, weld_voltage_v, weld_time_ms) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                _welding_rows(rng, sensor_rows, now),
+            )
+    finally:
+        conn.close()
+
+
+# ============================================
+# MariaDB 컨테이너
+# ============================================
+
+async def wait_for_db(db_config, timeout: float = 90):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            conn = await aiomysql.connect(**db_config)
+            conn.close()
+            return
+        except Exception:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(1)
+
+
+def start_mariadb(port: int = BENCH_DB_PORT, password: str = BENCH_DB_PASSWORD, image: str = BENCH_DB_IMAGE) -> str:
+    """docker 로 임시 MariaDB 를 띄우고 컨테이너 이름을 돌려줍니다. (--rm 이라 중지하면 삭제)"""
+    if shutil.which("docker") is None:
+        raise SystemExit("docker 를 찾을 수 없습니다. DB_HOST 등으로 기존 MySQL/MariaDB 를 지정하세요.")
+    name = f"bench-mariadb-{port}"
+    subprocess.run(
+        ["docker", "run", "-d", "--rm", "--name", name, "-p", f"{port}:3306",
+         "-e", f"MARIADB_ROOT_PASSWORD={password}", image],
+        check=True, stdout=subprocess.DEVNULL,
+    )
+    return name
+
+
+def stop_mariadb(name: str):
+    subprocess.run(["docker", "stop", name], check=False, stdout=subprocess.DEVNULL)
+
+
+# ============================================
+# 외부 서비스 스텁 (모델 API, Superset, 네이버 금융)
+# ============================================
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def start_stubs(port: int, latency: float, model_batch: bool = False):
+    """하나의 aiohttp 서버에서 경로로 구분해 세 외부 서비스를 흉내 냅니다. latency 초만큼 응답을 지연
+
+    실제 모델 서버에는 배치 엔드포인트가 없으므로 model_batch 일 때만 /model/predict-batch 를 엽니다.
+    """
+    from aiohttp import web
+
+    async def respond(payload):
+        if latency:
+            await asyncio.sleep(latency)
+        return web.json_response(payload)
+
+    async def predict(request):
+        await request.json()
+        return await respond({"prediction": 0})
+
+    async def predict_batch(request):
+        body = await request.json()
+        return await respond({"predictions": [0] * len(body["data"])})
+
+    async def dashboards(request):
+        return await respond({
+            "count": 2,
+            "result": [{"id": 1, "dashboard_title": "press"}, {"id": 2, "dashboard_title": "welding"}],
+        })
+
+    async def naver_item(request):
+        if latency:
+            await asyncio.sleep(latency)
+        price = 200000 + sum(map(ord, request.query.get("code", ""))) + random.randrange(1000)
+        html = f'<div class="no_today"><em><span class="blind">{price:,}</span></em></div>'
+        return web.Response(text=html, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_post("/model/predict", predict)
+    if model_batch:
+        app.router.add_post("/model/predict-batch", predict_batch)
+    app.router.add_get("/superset/api/v1/dashboard/", dashboards)
+    app.router.add_get("/naver/item/main.nhn", naver_item)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+def stub_env(port: int, model_batch: bool = False) -> dict:
+    base = f"http://127.0.0.1:{port}"
+    env = {
+        "MODEL_API_URL": f"{base}/model/predict",
+        "SUPERSET_URL": f"{base}/superset",
+        "NAVER_FINANCE_URL": f"{base}/naver",
+    }
+    if model_batch:
+        env["MODEL_API_BATCH_URL"] = f"{base}/model/predict-batch"
+        env["MODEL_BATCH_MAX_SIZE"] = "32"
+    return env
+
+
+# ============================================
+# 앱 서버 프로세스
+# ============================================
+
+def start_app(port: int, workers: int, db_config: dict, extra_env: dict, metrics_dir: str):
+    env = dict(os.environ)
+    env.update(extra_env)
+    env.update({
+        "HOST": "127.0.0.1",
+        "PORT": str(port),
+        "WEB_CONCURRENCY": str(workers),
+        "DB_HOST": db_config["host"],
+        "DB_PORT": str(db_config["port"]),
+        "DB_USER": db_config["user"],
+        "DB_PASSWORD": db_config["password"],
+        "MODEL_RUNTIME": "remote",
+        "AUTH_SECRET": env.get("AUTH_SECRET") or secrets.token_urlsafe(32),
+        # 측정 중에 백그라운드 작업이 끼어들지 않도록 끔
+        "ROLLUP_ENABLED": "0",
+        "SENSOR_STORE_ENABLED": "0",
+        "STOCK_SYMBOLS": BENCH_SYMBOL,
+        "STOCK_REFRESH_SECONDS": "1",
+        "LOG_LEVEL": env.get("LOG_LEVEL", "warning"),
+        "PROMETHEUS_MULTIPROC_DIR": metrics_dir,
+    })
+    return subprocess.Popen(
+        [sys.executable, "server.py"], env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+
+
+async def wait_for_app(client: httpx.AsyncClient, process, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while True:
+        if process is not None and process.poll() is not None:
+            raise SystemExit(f"앱 서버가 종료되었습니다 (exit {process.returncode})")
+        try:
+            if (await client.get("/test")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        if time.monotonic() > deadline:
+            raise SystemExit("앱 서버가 제시간에 응답하지 않습니다.")
+        await asyncio.sleep(0.5)
+
+
+# ============================================
+# 부하 생성 및 집계
+# ============================================
+
+ROUTE_METRICS = {
+    "db_queries": "http_request_db_queries",
+    "db_seconds": "http_request_db_seconds",
+    "outbound_seconds": "http_request_outbound_seconds",
+}
+
+
+async def scrape_route_totals(client: httpx.AsyncClient) -> dict:
+    """/metrics 에서 라우트별 (합계, 요청 수) 를 읽습니다. {(지표, 라우트): (sum, count)}"""
+    from prometheus_client.parser import text_string_to_metric_families
+
+    response = await client.get("/metrics")
+    response.raise_for_status()
+    wanted = {name: key for key, name in ROUTE_METRICS.items()}
+    totals = {}
+    for family in text_string_to_metric_families(response.text):
+        key = wanted.get(family.name)
+        if key is None:
+            continue
+        for sample in family.samples:
+            route = sample.labels.get("route")
+            entry = totals.setdefault((key, route), [0.0, 0.0])
+            if sample.name.endswith("_sum"):
+                entry[0] += sample.value
+            elif sample.name.endswith("_count"):
+                entry[1] += sample.value
+    return totals
+
+
+def _per_request(before: dict, after: dict, key: str, route: str):
+    sum_after, count_after = after.get((key, route), (0.0, 0.0))
+    sum_before, count_before = before.get((key, route), (0.0, 0.0))
+    count = count_after - count_before
+    if count <= 0:
+        return None
+    return (sum_after - sum_before) / count
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario, requests: int, concurrency: int, warmup: int):
+    name, method, path, route, body = scenario
+
+    async def send():
+        return await client.request(method, path, json=body)
+
+    for _ in range(warmup):
+        try:
+            await send()
+        except httpx.HTTPError:
+            pass
+
+    before = await scrape_route_totals(client)
+    latencies = []
+    statuses = Counter()
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                response = await send()
+                statuses[str(response.status_code)] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    after = await scrape_route_totals(client)
+
+    latency_ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(latency_ms, [50, 95, 99])
+    db_queries = _per_request(before, after, "db_queries", route)
+    db_seconds = _per_request(before, after, "db_seconds", route)
+    outbound_seconds = _per_request(before, after, "outbound_seconds", route)
+    return {
+        "method": method,
+        "path": path,
+        "route": route,
+        "requests": requests,
+        "errors": sum(n for status, n in statuses.items() if not status.startswith("2")),
+        "status": dict(statuses),
+        "seconds": round(elapsed, 4),
+        "rps": round(requests / elapsed, 2),
+        "latency_ms": {
+            "mean": round(float(latency_ms.mean()), 3),
+            "p50": round(float(p50), 3),
+            "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3),
+            "max": round(float(latency_ms.max()), 3),
+        },
+        "db_roundtrips_per_request": None if db_queries is None else round(db_queries, 3),
+        "db_ms_per_request": None if db_seconds is None else round(db_seconds * 1000, 3),
+        "outbound_ms_per_request": None if outbound_seconds is None else round(outbound_seconds * 1000, 3),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ============================================
+# 결과 비교
+# ============================================
+
+def compare(baseline: dict, current: dict, threshold: float) -> bool:
+    """p95 가 threshold 비율 이상 늘었거나, RPS 가 그만큼 줄었거나, DB 왕복이 늘었으면 회귀로 봅니다."""
+    regressed = False
+    print(f"{'scenario':<26}{'rps':>20}{'p95 ms':>22}{'db/req':>14}")
+    for name, now in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            continue
+        rps_change = now["rps"] / before["rps"] - 1 if before["rps"] else 0.0
+        p95_before, p95_now = before["latency_ms"]["p95"], now["latency_ms"]["p95"]
+        p95_change = p95_now / p95_before - 1 if p95_before else 0.0
+        db_before, db_now = before.get("db_roundtrips_per_request"), now.get("db_roundtrips_per_request")
+        worse = (
+            rps_change < -threshold
+            or p95_change > threshold
+            or (db_before is not None and db_now is not None and db_now > db_before + 0.01)
+        )
+        regressed = regressed or worse
+        print(
+            f"{name:<26}{before['rps']:>9.1f} -> {now['rps']:<9.1f}"
+            f"{p95_before:>10.2f} -> {p95_now:<10.2f}"
+            f"{db_before if db_before is not None else '-':>6} -> {db_now if db_now is not None else '-':<6}"
+            f"{'  REGRESSION' if worse else ''}"
+        )
+    return regressed
+
+
+# ============================================
+# 실행
+# ============================================
+
+async def run(args) -> dict:
+    if args.mariadb:
+        db_config = {"host": "127.0.0.1", "port": args.db_port, "user": "root", "password": BENCH_DB_PASSWORD}
+    else:
+        db_config = {
+            "host": os.getenv("DB_HOST", "127.0.0.1"),
+            "port": int(os.getenv("DB_PORT", "3306")),
+            "user": os.getenv("DB_USER", "root"),
+            "password": os.getenv("DB_PASSWORD", ""),
+        }
+    if args.seed and not args.mariadb and "DB_HOST" not in os.environ:
+        # 시드는 테이블을 지우고 다시 만드므로 기본 접속 정보(운영 DB)로는 실행하지 않음
+        raise SystemExit("--seed 는 --mariadb 와 함께 쓰거나 DB_HOST 로 벤치마크용 DB 를 지정해야 합니다.")
+
+    scenarios = SCENARIOS
+    if args.only:
+        selected = set(args.only.split(","))
+        scenarios = [s for s in SCENARIOS if s[0] in selected]
+        unknown = selected - {s[0] for s in scenarios}
+        if unknown:
+            raise SystemExit(f"알 수 없는 시나리오: {', '.join(sorted(unknown))}")
+
+    container = None
+    stubs = None
+    app_process = None
+    metrics_dir = tempfile.mkdtemp(prefix="bench-metrics-")
+    try:
+        if args.mariadb:
+            container = start_mariadb(args.db_port)
+            await wait_for_db(db_config)
+        if args.seed:
+            print("seeding ...", file=sys.stderr)
+            await seed(db_config, args.employees, args.sensor_rows, args.models)
+
+        stub_port = _free_port()
+        stubs = await start_stubs(stub_port, args.stub_latency / 1000, args.model_batch)
+        if args.url:
+            base_url = args.url.rstrip("/")
+        else:
+            app_port = _free_port()
+            app_process = start_app(app_port, args.workers, db_config, stub_env(stub_port, args.model_batch), metrics_dir)
+            base_url = f"http://127.0.0.1:{app_port}"
+
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, timeout=30, limits=limits) as client:
+            await wait_for_app(client, app_process)
+            results = {}
+            for scenario in scenarios:
+                print(f"running {scenario[0]} ...", file=sys.stderr)
+                results[scenario[0]] = await run_scenario(
+                    client, scenario, args.requests, args.concurrency, args.warmup
+                )
+    finally:
+        if app_process is not None:
+            app_process.terminate()
+            try:
+                app_process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                app_process.kill()
+        if stubs is not None:
+            await stubs.cleanup()
+        if container is not None and not args.keep_db:
+            stop_mariadb(container)
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "target": args.url or "server.py",
+            "workers": None if args.url else args.workers,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "stub_latency_ms": args.stub_latency,
+            "model_batch": args.model_batch,
+            "employees": args.employees,
+            "sensor_rows": args.sensor_rows,
+        },
+        "scenarios": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API 벤치마크")
+    parser.add_argument("-n", "--requests", type=int, default=1000, help="시나리오별 측정 요청 수")
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="동시 요청 수")
+    parser.add_argument("--warmup", type=int, default=50, help="측정 전 워밍업 요청 수")
+    parser.add_argument("--workers", type=int, default=1, help="앱 워커 수 (WEB_CONCURRENCY)")
+    parser.add_argument("--only", help="쉼표로 구분한 시나리오 이름")
+    parser.add_argument("--url", help="이미 실행 중인 앱에 측정 (스텁/DB 설정은 그 앱의 환경 변수를 따름)")
+    parser.add_argument("--mariadb", action="store_true", help="docker 로 임시 MariaDB 를 실행")
+    parser.add_argument("--db-port", type=int, default=BENCH_DB_PORT)
+    parser.add_argument("--keep-db", action="store_true", help="종료 후에도 MariaDB 컨테이너 유지")
+    parser.add_argument("--seed", action="store_true", help="스키마를 다시 만들고 시드 데이터 입력")
+    parser.add_argument("--employees", type=int, default=10000)
+    parser.add_argument("--sensor-rows", type=int, default=50000)
+    parser.add_argument("--models", type=int, default=20)
+    parser.add_argument("--stub-latency", type=float, default=5.0, help="스텁 응답 지연 (ms)")
+    parser.add_argument("--model-batch", action="store_true",
+                        help="모델 스텁에 배치 엔드포인트를 열고 마이크로 배치 사용 (기본: 단건 엔드포인트만)")
+    parser.add_argument("-o", "--output", help="결과 JSON 파일 (기본: 표준 출력)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="두 결과 파일 비교")
+    parser.add_argument("--threshold", type=float, default=0.1, help="회귀로 볼 변화 비율 (기본 10%%)")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+        sys.exit(1 if compare(baseline, current, args.threshold) else 0)
+
+    report = asyncio.run(run(args))
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from typing import Optional
+
+import numpy as np
+
+from database import acquire
+from model_runtime import model_runtime, ModelUnavailable
+from quality_scores import PROCESSES
+from rollup import rollup_engine
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# 대량 품질 예측 작업 설정
+# ============================================
+
+BULK_SCORING_CHUNK_SIZE = int(os.getenv("BULK_SCORING_CHUNK_SIZE", "5000"))
+# 요청으로 지정할 수 있는 최대 청크 크기 (한 번에 메모리에 올리는 행 수)
+BULK_SCORING_MAX_CHUNK_SIZE = int(os.getenv("BULK_SCORING_MAX_CHUNK_SIZE", "50000"))
+BULK_SCORING_CONCURRENCY = int(os.getenv("BULK_SCORING_CONCURRENCY", "1"))
+BULK_SCORING_MAX_JOBS = int(os.getenv("BULK_SCORING_MAX_JOBS", "50"))
+# 작업 상태 저장소. mysql: 워커 간 공유 (기본), memory: 단일 워커 개발용
+BULK_SCORING_JOB_BACKEND = os.getenv("BULK_SCORING_JOB_BACKEND", "mysql")
+
+
+class ScoringJob:
+    # 작업 저장소에 기록하는 필드 (bulk_score_job 테이블 컬럼 순서)
+    FIELDS = [
+        "job_id", "process", "status", "error", "model_use_id", "start_idx", "end_idx",
+        "start_time", "end_time", "chunk_size", "first_idx", "last_idx", "rows_scored", "rows_skipped",
+        "created_at", "started_at", "finished_at",
+    ]
+
+    def __init__(self, process: str, start_idx: Optional[int], end_idx: Optional[int],
+                 start_time: Optional[str], end_time: Optional[str], chunk_size: int):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.process = process
+        self.start_idx = start_idx
+        self.end_idx = end_idx
+        self.start_time = start_time
+        self.end_time = end_time
+        self.chunk_size = chunk_size
+        self.status = "pending"
+        self.error = None
+        self.model_use_id = None
+        self.first_idx = None
+        self.last_idx = None
+        self.rows_scored = 0
+        # 특징 값에 NULL 이 있어 예측하지 않은 행 수
+        self.rows_skipped = 0
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.task = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    def to_record(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.FIELDS)
+
+    @classmethod
+    def from_record(cls, record) -> "ScoringJob":
+        job = cls.__new__(cls)
+        job.task = None
+        for name, value in zip(cls.FIELDS, record):
+            setattr(job, name, value)
+        return job
+
+    def progress(self):
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        percent = None
+        if self.first_idx is not None and self.end_idx is not None and self.last_idx is not None:
+            span = max(self.end_idx - self.first_idx, 1)
+            percent = round(min((self.last_idx - self.first_idx) / span, 1.0) * 100, 2)
+        if self.status == "done":
+            percent = 100.0
+        return {
+            "job_id": self.job_id,
+            "process": self.process,
+            "status": self.status,
+            "error": self.error,
+            "model_use_id": self.model_use_id,
+            "start_idx": self.start_idx,
+            "end_idx": self.end_idx,
+            "last_idx": self.last_idx,
+            "rows_scored": self.rows_scored,
+            "rows_skipped": self.rows_skipped,
+            "percent": percent,
+            "elapsed_seconds": round(elapsed, 3) if elapsed is not None else None,
+            "rows_per_second": round(self.rows_scored / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+# ============================================
+# 작업 상태 저장소
+# ============================================
+
+class MemoryJobStore:
+    """프로세스 내부 작업 목록 (단일 워커 개발용)"""
+
+    def __init__(self):
+        self._jobs = {}
+        self._cancel_requested = set()
+
+    async def ensure_table(self):
+        pass
+
+    async def save(self, job: ScoringJob):
+        self._jobs[job.job_id] = job
+
+    async def get(self, job_id: str) -> Optional[ScoringJob]:
+        return self._jobs.get(job_id)
+
+    async def list(self) -> list:
+        return sorted(self._jobs.values(), key=lambda j: j.created_at)
+
+    async def request_cancel(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        self._cancel_requested.add(job_id)
+        return True
+
+    async def cancel_requested(self, job_id: str) -> bool:
+        return job_id in self._cancel_requested
+
+    async def trim(self, max_jobs: int):
+        # 끝난 작업부터 오래된 순으로 정리
+        finished = [j for j in await self.list() if j.finished]
+        while len(self._jobs) > max_jobs and finished:
+            job = finished.pop(0)
+            del self._jobs[job.job_id]
+            self._cancel_requested.discard(job.job_id)
+
+
+class MySQLJobStore:
+    """web 스키마의 bulk_score_job 테이블에 작업 상태를 두어 어느 워커에서든 조회/취소할 수 있게 합니다.
+
+    작업을 실행하는 워커는 청크마다 진행 상황을 기록하고 다른 워커가 남긴 취소 요청을 확인합니다.
+    """
+
+    def __init__(self, db: str = "web"):
+        self.db = db
+
+    async def ensure_table(self):
+        async with acquire(self.db) as conn, conn.cursor() as cursor:
+            await cursor.execute(
+                """CREATE TABLE IF NOT EXISTS bulk_score_job (
+                    job_id VARCHAR(32) NOT NULL PRIMARY KEY,
+                    process VARCHAR(32) NOT NULL,
+                    status VARCHAR(16) NOT NULL,
+                    error TEXT NULL,
+                    model_use_id VARCHAR(255) NULL,
+                    start_idx BIGINT NULL,
+                    end_idx BIGINT NULL,
+                    start_time VARCHAR(32) NULL,
+                    end_time VARCHAR(32) NULL,
+                    chunk_size INT NOT NULL,
+                    first_idx BIGINT NULL,
+                    last_idx BIGINT NULL,
+                    rows_scored BIGINT NOT NULL DEFAULT 0,
+                    rows_skipped BIGINT NOT NULL DEFAULT 0,
+                    created_at DOUBLE NOT NULL,
+                    started_at DOUBLE NULL,
+                    finished_at DOUBLE NULL,
+                    cancel_requested TINYINT NOT NULL DEFAULT 0,
+                    KEY idx_bulk_score_job_created (created_at)
+                )"""
+            )
+
+    async def save(self, job: ScoringJob):
+        columns = ", ".join(ScoringJob.FIELDS)
+        values = ", ".join(["%s"] * len(ScoringJob.FIELDS))
+        updates = ", ".join(f"{name} = VALUES({name})" for name in ScoringJob.FIELDS[1:])
+        async with acquire(self.db) as conn, conn.cursor() as cursor:
+            await cursor.execute(
+                f"INSERT INTO bulk_score_job ({columns}) VALUES ({values}) ON DUPLICATE KEY UPDATE {updates}",
+                job.to_record(),
+            )
+
+    async def get(self, job_id: str) -> Optional[ScoringJob]:
+        async with acquire(self.db) as conn, conn.cursor() as cursor:
+            await cursor.execute(
+                f"SELECT {', '.join(ScoringJob.FIELDS)} FROM bulk_score_job WHERE job_id = %s", (job_id,)
+            )
+            row = await cursor.fetchone()
+        return ScoringJob.from_record(row) if row else None
+
+    async def list(self) -> list:
+        async with acquire(self.db) as conn, conn.cursor() as cursor:
+            await cursor.execute(f"SELECT {', '.join(ScoringJob.FIELDS)} FROM bulk_score_job ORDER BY created_at")
+            rows = await cursor.fetchall()
+        return [ScoringJob.from_record(row) for row in rows]
+
+    async def request_cancel(self, job_id: str) -> bool:
+        async with acquire(self.db) as conn, conn.cursor() as cursor:
+            await cursor.execute(
+                "UPDATE bulk_score_job SET cancel_requested = 1 "
+                "WHERE job_id = %s AND status IN ('pending', 'running')",
+                (job_id,)
+            )
+            return cursor.rowcount == 1
+
+    async def cancel_requested(self, job_id: str) -> bool:
+        async with acquire(self.db) as conn, conn.cursor() as cursor:
+            await cursor.execute("SELECT cancel_requested FROM bulk_score_job WHERE job_id = %s", (job_id,))
+            row = await cursor.fetchone()
+        return bool(row and row[0])
+
+    async def trim(self, max_jobs: int):
+        # 끝난 작업부터 오래된 순으로 정리
+        async with acquire(self.db) as conn, conn.cursor() as cursor:
+            await cursor.execute("SELECT COUNT(*) FROM bulk_score_job")
+            (count,) = await cursor.fetchone()
+            if count > max_jobs:
+                await cursor.execute(
+                    "DELETE FROM bulk_score_job WHERE status IN ('done', 'failed', 'cancelled') "
+                    "ORDER BY created_at LIMIT %s",
+                    (count - max_jobs,)
+                )
+
+
+def make_job_store(backend: str = BULK_SCORING_JOB_BACKEND):
+    if backend == "memory":
+        return MemoryJobStore()
+    if backend == "mysql":
+        return MySQLJobStore()
+    raise ValueError(f"Unknown bulk scoring job backend: {backend}")
+
+
+# ============================================
+# 대량 예측 실행
+# ============================================
+
+class BulkScorer:
+    """idx/시간 범위의 원본 데이터를 청크 단위로 읽어 배치 예측하고 결과를 다건 INSERT 로 저장합니다.
+
+    작업은 요청을 받은 워커에서 실행되고, 상태는 작업 저장소를 통해 모든 워커에서 조회됩니다.
+    """
+
+    def __init__(self, concurrency: int = BULK_SCORING_CONCURRENCY, max_jobs: int = BULK_SCORING_MAX_JOBS,
+                 store=None):
+        self.store = store if store is not None else make_job_store()
+        # 이 워커에서 실행 중인 작업
+        self.jobs = {}
+        self.max_jobs = max_jobs
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def submit(self, process: str, start_idx=None, end_idx=None, start_time=None, end_time=None,
+                     chunk_size: int = BULK_SCORING_CHUNK_SIZE) -> ScoringJob:
+        if process not in PROCESSES:
+            raise ValueError(f"Unknown process: {process}")
+        if not 1 <= chunk_size <= BULK_SCORING_MAX_CHUNK_SIZE:
+            raise ValueError(f"chunk_size 는 1 이상 {BULK_SCORING_MAX_CHUNK_SIZE} 이하여야 합니다.")
+        job = ScoringJob(process, start_idx, end_idx, start_time, end_time, chunk_size)
+        await self.store.save(job)
+        await self.store.trim(self.max_jobs)
+        self.jobs[job.job_id] = job
+        job.task = asyncio.create_task(self._run(job), name=f"bulk-score-{job.job_id}")
+        job.task.add_done_callback(lambda _: self.jobs.pop(job.job_id, None))
+        return job
+
+    async def get(self, job_id: str) -> Optional[ScoringJob]:
+        # 이 워커에서 실행 중이면 저장소보다 최신 상태
+        return self.jobs.get(job_id) or await self.store.get(job_id)
+
+    async def list(self) -> list:
+        jobs = await self.store.list()
+        return [self.jobs.get(job.job_id, job) for job in jobs]
+
+    async def cancel(self, job_id: str) -> bool:
+        job = self.jobs.get(job_id)
+        if job is not None and job.task is not None and not job.task.done():
+            job.task.cancel()
+            return True
+        # 다른 워커에서 실행 중인 작업은 다음 청크를 기록할 때 취소됨
+        return await self.store.request_cancel(job_id)
+
+    async def _resolve_range(self, job: ScoringJob, cursor, table: str):
+        """시간 범위를 idx 범위로 한 번만 변환해 이후 청크는 PK 범위로만 읽습니다."""
+        where, params = [], []
+        if job.start_time:
+            where.append("working_time >= %s")
+            params.append(job.start_time)
+        if job.end_time:
+            where.append("working_time <= %s")
+            params.append(job.end_time)
+        if job.start_idx is not None:
+            where.append("idx >= %s")
+            params.append(job.start_idx)
+        if job.end_idx is not None:
+            where.append("idx <= %s")
+            params.append(job.end_idx)
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+        await cursor.execute(f"SELECT MIN(idx), MAX(idx) FROM {table}{clause}", params)
+        return await cursor.fetchone()
+
+    async def _fetch_chunk(self, job: ScoringJob, after_idx: int):
+        spec = PROCESSES[job.process]
+        columns = ", ".join(["idx"] + spec["features"])
+        query = f"SELECT {columns} FROM {spec['table']} WHERE idx > %s AND idx <= %s"
+        params = [after_idx, job.end_idx]
+        if job.start_time:
+            query += " AND working_time >= %s"
+            params.append(job.start_time)
+        if job.end_time:
+            query += " AND working_time <= %s"
+            params.append(job.end_time)
+        query += " ORDER BY idx LIMIT %s"
+        params.append(job.chunk_size)
+        async with acquire(spec["db"]) as conn, conn.cursor() as cursor:
+            await cursor.execute(query, params)
+            return await cursor.fetchall()
+
+    @staticmethod
+    def _complete_rows(rows):
+        """특징 값에 NULL 이 없는 행만 (n, 1 + 특징 수) 행렬로. NULL 행은 예측하지 않고 건너뜀"""
+        complete = [row for row in rows if None not in row]
+        if not complete:
+            return None
+        return np.asarray(complete, dtype=np.float64)
+
+    async def _write_scores(self, job: ScoringJob, idx: np.ndarray, predictions: np.ndarray):
+        # 이미 집계된 행의 예측/불량 건수도 같은 트랜잭션에서 고침
+        await rollup_engine.record_scores(job.process, job.model_use_id, idx.tolist(), predictions.tolist())
+
+    async def _run(self, job: ScoringJob):
+        try:
+            async with self._semaphore:
+                job.status = "running"
+                job.started_at = time.time()
+                await self.store.save(job)
+                model = await model_runtime.active()
+                if model.process_name not in (job.process, "unknown"):
+                    raise ModelUnavailable(
+                        f"활성 모델({model.model_use_id})은 {job.process} 공정용이 아닙니다."
+                    )
+                job.model_use_id = model.model_use_id
+
+                spec = PROCESSES[job.process]
+                async with acquire(spec["db"]) as conn, conn.cursor() as cursor:
+                    first_idx, last_idx = await self._resolve_range(job, cursor, spec["table"])
+                if first_idx is None:
+                    job.status = "done"
+                    return
+                job.first_idx = first_idx
+                job.end_idx = last_idx
+                job.last_idx = first_idx - 1
+
+                rows = await self._fetch_chunk(job, job.last_idx)
+                while rows:
+                    # 다음 청크를 미리 읽어오면서 현재 청크를 예측/저장
+                    next_rows = asyncio.create_task(self._fetch_chunk(job, rows[-1][0]))
+                    try:
+                        matrix = self._complete_rows(rows)
+                        scored = 0
+                        if matrix is not None:
+                            idx = matrix[:, 0].astype(np.int64)
+                            predictions = np.asarray(
+                                await asyncio.to_thread(model.predict, matrix[:, 1:]), dtype=np.float64
+                            )
+                            await self._write_scores(job, idx, predictions)
+                            scored = len(matrix)
+                        job.rows_scored += scored
+                        job.rows_skipped += len(rows) - scored
+                        job.last_idx = int(rows[-1][0])
+                        await self.store.save(job)
+                        if await self.store.cancel_requested(job.job_id):
+                            raise asyncio.CancelledError
+                    except BaseException:
+                        next_rows.cancel()
+                        raise
+                    rows = await next_rows
+                job.status = "done"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            try:
+                await self.store.save(job)
+            except Exception as e:
+                logger.warning("bulk score job %s: failed to save final status: %s", job.job_id, e)
+
+    async def close(self):
+        tasks = [job.task for job in self.jobs.values() if job.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+bulk_scorer = BulkScorer()
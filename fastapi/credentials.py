@@ -0,0 +1,286 @@
+"""비밀번호 해시/검증 (이벤트 루프 밖의 프로세스 풀에서 실행)
+
+    python credentials.py [동시 요청 수] [rounds]     # 이벤트 루프 지연 비교 벤치마크
+
+bcrypt 는 일부러 느린(rounds 12 기준 수백 ms) CPU 작업이므로 async 핸들러에서 직접 호출하면
+그동안 워커의 다른 요청이 모두 멈춥니다. 여기서는 크기가 정해진 프로세스 풀에서 실행하고,
+실패한 사용자 이름은 잠시 기억해 반복 시도에 bcrypt 를 다시 돌리지 않습니다.
+"""
+import asyncio
+import hashlib
+import hmac
+import multiprocessing
+import os
+import secrets
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# ============================================
+# 비밀번호 해시 설정
+# ============================================
+
+# bcrypt cost factor. 1 늘릴 때마다 해시 시간이 두 배. 기존 해시는 로그인 성공 시 새 rounds 로 다시 해시
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# 해시 전용 프로세스 수
+CREDENTIAL_POOL_SIZE = int(os.getenv("CREDENTIAL_POOL_SIZE", str(max(1, (os.cpu_count() or 2) // 2))))
+# 풀에 들어가 있을 수 있는 최대 작업 수. 넘으면 CredentialBusy (로그인 폭주가 워커 전체를 막지 않도록)
+CREDENTIAL_MAX_PENDING = int(os.getenv("CREDENTIAL_MAX_PENDING", str(CREDENTIAL_POOL_SIZE * 8)))
+# 실패 기록을 유지하는 시간(초)과, 이 횟수 이상 실패하면 그동안 bcrypt 없이 거절
+CREDENTIAL_NEGATIVE_TTL = float(os.getenv("CREDENTIAL_NEGATIVE_TTL", "300"))
+CREDENTIAL_MAX_FAILURES = int(os.getenv("CREDENTIAL_MAX_FAILURES", "5"))
+CREDENTIAL_NEGATIVE_CACHE_SIZE = int(os.getenv("CREDENTIAL_NEGATIVE_CACHE_SIZE", "10000"))
+
+
+class CredentialBusy(Exception):
+    """해시 작업 대기열이 가득 참"""
+
+
+# ============================================
+# bcrypt 호출 (풀의 자식 프로세스에서 실행)
+# ============================================
+
+def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    import bcrypt
+
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("ascii")
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    import bcrypt
+
+    try:
+        return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("ascii"))
+    except ValueError:
+        # bcrypt 형식이 아닌 값
+        return False
+
+
+def hash_rounds(hashed: str) -> int:
+    """$2b$12$... 형식에서 cost factor 를 읽습니다."""
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return 0
+
+
+def verify_and_update(password: str, hashed: str, rounds: int = BCRYPT_ROUNDS):
+    """(일치 여부, 새 해시). rounds 가 바뀌었으면 같은 프로세스에서 바로 다시 해시해 돌려줍니다."""
+    if not verify_password(password, hashed):
+        return False, None
+    if hash_rounds(hashed) != rounds:
+        return True, hash_password(password, rounds)
+    return True, None
+
+
+# ============================================
+# 실패 캐시
+# ============================================
+
+class NegativeCache:
+    """사용자 이름별 최근 실패 기록.
+
+    - 없는 사용자이거나 같은 (사용자, 비밀번호) 로 이미 실패했다면 bcrypt 를 다시 돌리지 않음
+    - max_failures 번 이상 실패한 사용자는 ttl 동안 검증 없이 거절
+    비밀번호는 프로세스마다 새로 만든 키의 HMAC 으로만 기억합니다.
+
+    기록은 워커 프로세스마다 따로 유지됩니다. 요청이 워커 N 개에 나뉘면 잠기기까지 최대
+    N x max_failures 번 시도할 수 있습니다. 이 캐시는 bcrypt 비용을 아끼는 것이 목적이며,
+    반복 시도 제한은 admission 규칙이 담당합니다.
+    """
+
+    def __init__(self, ttl: float = CREDENTIAL_NEGATIVE_TTL, max_failures: int = CREDENTIAL_MAX_FAILURES,
+                 maxsize: int = CREDENTIAL_NEGATIVE_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_failures = max_failures
+        self.maxsize = maxsize
+        self._key = secrets.token_bytes(32)
+        # 사용자 이름 -> [만료 시각, 실패 횟수, 실패한 비밀번호 HMAC 집합]
+        self._entries = {}
+        self.hits = 0
+
+    def _fingerprint(self, password: str) -> bytes:
+        return hmac.new(self._key, password.encode("utf-8"), hashlib.sha256).digest()
+
+    def _entry(self, username: str):
+        entry = self._entries.get(username)
+        if entry is not None and entry[0] <= time.monotonic():
+            del self._entries[username]
+            return None
+        return entry
+
+    def rejects(self, username: str, password: str) -> bool:
+        entry = self._entry(username)
+        if entry is None:
+            return False
+        if entry[1] >= self.max_failures or self._fingerprint(password) in entry[2]:
+            self.hits += 1
+            return True
+        return False
+
+    def record_failure(self, username: str, password: str):
+        entry = self._entry(username)
+        if entry is None:
+            if len(self._entries) >= self.maxsize:
+                # 가장 먼저 만료될 항목부터 정리
+                for name, _ in sorted(self._entries.items(), key=lambda item: item[1][0])[: self.maxsize // 10 or 1]:
+                    del self._entries[name]
+            entry = self._entries[username] = [0.0, 0, set()]
+        entry[0] = time.monotonic() + self.ttl
+        entry[1] += 1
+        entry[2].add(self._fingerprint(password))
+
+    def clear(self, username: str):
+        self._entries.pop(username, None)
+
+    def stats(self):
+        return {"users": len(self._entries), "hits": self.hits}
+
+
+# ============================================
+# 비동기 서비스
+# ============================================
+
+class CredentialService:
+    """bcrypt 작업을 프로세스 풀에서 실행하는 async 래퍼.
+
+    풀은 처음 사용할 때 만들어지며 spawn 방식이라 워커의 스레드/커넥션을 물려받지 않습니다.
+    """
+
+    def __init__(self, pool_size: int = CREDENTIAL_POOL_SIZE, max_pending: int = CREDENTIAL_MAX_PENDING,
+                 rounds: int = BCRYPT_ROUNDS, negative_cache: NegativeCache = None):
+        self.pool_size = pool_size
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self.negative_cache = negative_cache if negative_cache is not None else NegativeCache()
+        self._executor = None
+        self.pending = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.pool_size, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise CredentialBusy("비밀번호 검증 요청이 많습니다. 잠시 후 다시 시도하세요.")
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password, self.rounds)
+
+    async def check(self, password: str, hashed: str) -> bool:
+        """실패 캐시 없이 일치 여부만 확인"""
+        return await self._run(verify_password, password, hashed)
+
+    async def verify(self, username: str, password: str, hashed) -> tuple:
+        """(일치 여부, 새 해시 또는 None). 새 해시가 있으면 호출한 쪽에서 저장합니다.
+
+        hashed 가 None(없는 사용자)이면 bcrypt 없이 실패로 기록합니다.
+        """
+        if self.negative_cache.rejects(username, password):
+            return False, None
+        if hashed is None:
+            self.negative_cache.record_failure(username, password)
+            return False, None
+        ok, new_hash = await self._run(verify_and_update, password, hashed, self.rounds)
+        if ok:
+            self.negative_cache.clear(username)
+        else:
+            self.negative_cache.record_failure(username, password)
+        return ok, new_hash
+
+    def close(self):
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {
+            "pool_size": self.pool_size,
+            "rounds": self.rounds,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+            "negative_cache": self.negative_cache.stats(),
+        }
+
+
+credential_service = CredentialService()
+
+
+# ============================================
+# 벤치마크
+# ============================================
+
+async def _measure_loop_lag(stop: asyncio.Event, interval: float = 0.005):
+    """interval 마다 깨어나 예정보다 늦은 시간을 기록 (이벤트 루프가 막힌 정도)"""
+    lags = []
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, loop.time() - expected))
+    return lags
+
+
+async def _bench(mode: str, concurrency: int, hashed: str, service: CredentialService):
+    import numpy as np
+
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_measure_loop_lag(stop))
+    await asyncio.sleep(0.05)
+
+    async def login(n: int):
+        if mode == "inline":
+            # 기존 방식: async 핸들러에서 bcrypt 를 직접 호출
+            return verify_password("secret", hashed)
+        return (await service.verify(f"user{n}", "secret", hashed))[0]
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(login(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    lags = np.asarray(await ticker) * 1000
+    assert all(results)
+    return elapsed, np.percentile(lags, 50), np.percentile(lags, 99), lags.max()
+
+
+def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else BCRYPT_ROUNDS
+
+    print("rounds  hash ms")
+    for cost in range(max(4, rounds - 2), rounds + 2):
+        started = time.perf_counter()
+        hash_password("secret", cost)
+        print(f"{cost:>6}  {(time.perf_counter() - started) * 1000:8.1f}")
+
+    hashed = hash_password("secret", rounds)
+    service = CredentialService(rounds=rounds, max_pending=concurrency)
+
+    async def run():
+        # 풀 기동 시간은 제외
+        await service.verify("warmup", "secret", hashed)
+        try:
+            print(f"\n{concurrency} concurrent logins, rounds {rounds}, pool {service.pool_size}")
+            print(f"{'mode':<8}{'total ms':>10}{'lag p50':>10}{'lag p99':>10}{'lag max':>10}")
+            for mode in ("inline", "pool"):
+                elapsed, p50, p99, worst = await _bench(mode, concurrency, hashed, service)
+                print(f"{mode:<8}{elapsed * 1000:>10.1f}{p50:>10.1f}{p99:>10.1f}{worst:>10.1f}")
+        finally:
+            service.close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
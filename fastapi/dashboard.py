@@ -0,0 +1,72 @@
+import asyncio
+import logging
+
+from database import acquire
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# 대시보드 묶음 조회
+# ============================================
+
+async def gather_sections(sections: dict) -> dict:
+    """{섹션 이름: 코루틴} 을 동시에 실행합니다.
+
+    각 조회는 풀에서 별도 커넥션을 빌리므로 화면 전체의 지연 시간은 조회 시간의 합이 아니라
+    가장 느린 조회 하나와 비슷합니다. 실패한 섹션은 None 으로 두고 errors 에 사유를 담아
+    나머지 섹션은 그대로 돌려줍니다.
+    """
+    names = list(sections)
+    results = await asyncio.gather(*sections.values(), return_exceptions=True)
+    payload, errors = {}, {}
+    for name, result in zip(names, results):
+        if isinstance(result, asyncio.CancelledError):
+            raise result
+        if isinstance(result, Exception):
+            logger.warning("dashboard section %s failed: %s", name, result)
+            payload[name] = None
+            errors[name] = str(result)
+        else:
+            payload[name] = result
+    payload["errors"] = errors
+    return payload
+
+
+SALES_TABLES = {"hd": "HD_sales", "kia": "KIA_sales"}
+
+
+async def fetch_sales() -> dict:
+    """HD/KIA 연도별 판매량을 UNION 한 문장으로 조회 ({"hd": [...], "kia": [...]})"""
+    sql = " UNION ALL ".join(
+        f"SELECT '{brand}', year, count FROM {table}" for brand, table in SALES_TABLES.items()
+    ) + " ORDER BY 1, 2"
+    async with acquire("web") as conn, conn.cursor() as cursor:
+        await cursor.execute(sql)
+        result = await cursor.fetchall()
+    sales = {brand: [] for brand in SALES_TABLES}
+    for brand, year, count in result:
+        sales[brand].append({"year": year, "count": count})
+    return sales
+
+
+ACTIVE_MODEL_COLUMNS = ["model_name", "model_version", "python_version", "library", "model_type", "loss", "accuracy"]
+
+
+async def fetch_active_model():
+    """활성 모델을 model_use 와 model_info 의 JOIN 한 번으로 조회합니다.
+
+    활성 모델이 없으면 None, 활성 모델은 있지만 model_info 가 없으면 (model_use_id, None)
+    """
+    columns = ", ".join(f"i.{c}" for c in ACTIVE_MODEL_COLUMNS)
+    async with acquire("web") as conn, conn.cursor() as cursor:
+        await cursor.execute(
+            f"SELECT u.model_use_id, i.model_info_id, {columns} "
+            "FROM model_use u LEFT JOIN model_info i ON i.model_info_id = u.model_use_id "
+            "WHERE u.model_use_state = 1 LIMIT 1"
+        )
+        row = await cursor.fetchone()
+    if row is None:
+        return None
+    if row[1] is None:
+        return row[0], None
+    return row[0], dict(zip(ACTIVE_MODEL_COLUMNS, row[2:]))
@@ -1,28 +1,192 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
 import aiomysql
 
-async def get_db_connection():
-    return await aiomysql.connect(
-        host='opyter.iptime.org',
-        user='bigdata_busan_3',
-        password='busan12345678*',
-        db='web',
-        port=3306
-    )
+# ============================================
+# 접속 정보 및 풀 설정
+# ============================================
 
-async def get_db_press_connection():
-    return await aiomysql.connect(
-        host='opyter.iptime.org',
-        user='bigdata_busan_3',
-        password='busan12345678*',
-        db='press',
-        port=3306
-    )
+DB_HOST = os.getenv("DB_HOST", "opyter.iptime.org")
+DB_PORT = int(os.getenv("DB_PORT", "3306"))
+DB_USER = os.getenv("DB_USER", "bigdata_busan_3")
+DB_PASSWORD = os.getenv("DB_PASSWORD", "busan12345678*")
+
+# 논리 이름 -> 스키마 이름
+DATABASES = {
+    "web": "web",
+    "press": "press",
+    "welding": "welding",
+}
+
+POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+# 유휴 커넥션 재생성 주기(초). MySQL wait_timeout 보다 짧게 유지
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+POOL_CONNECT_TIMEOUT = float(os.getenv("DB_POOL_CONNECT_TIMEOUT", "10"))
+
+_pools = {}
+_pool_lock = asyncio.Lock()
+
+
+class PoolMetrics:
+    """풀 대기 시간 및 포화도 통계"""
+
+    def __init__(self):
+        self.acquire_count = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.waiting = 0
+        self.saturated_count = 0
+
+    def as_dict(self):
+        return {
+            "acquire_count": self.acquire_count,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+            "wait_seconds_avg": round(self.wait_seconds_total / self.acquire_count, 6) if self.acquire_count else 0.0,
+            "waiting": self.waiting,
+            "saturated_count": self.saturated_count,
+        }
+
+
+_metrics = {name: PoolMetrics() for name in DATABASES}
+
+# 쿼리 실행 시간을 받는 콜백 목록 (db 논리 이름, 초). metrics 모듈이 등록합니다.
+QUERY_OBSERVERS = []
+_SCHEMA_TO_DB = {schema: name for name, schema in DATABASES.items()}
+
+
+def _observe(cursor, started: float):
+    seconds = time.perf_counter() - started
+    db = _SCHEMA_TO_DB.get(cursor.connection.db, cursor.connection.db)
+    for observer in QUERY_OBSERVERS:
+        observer(db, seconds)
+
+
+class TimedCursor(aiomysql.Cursor):
+    """쿼리 실행 시간을 QUERY_OBSERVERS 에 알리는 커서 (풀의 기본 커서).
+    executemany 도 내부적으로 execute 를 호출하므로 DB 왕복마다 한 번씩 기록됩니다.
+    """
 
-async def get_db_welding_connection():
-    return await aiomysql.connect(
-        host='opyter.iptime.org',
-        user='bigdata_busan_3',
-        password='busan12345678*',
-        db='welding',
-        port=3306
+    async def execute(self, query, args=None):
+        started = time.perf_counter()
+        try:
+            return await super().execute(query, args)
+        finally:
+            _observe(self, started)
+
+
+# ============================================
+# 풀 생명주기 (lifespan 에서 호출)
+# ============================================
+
+async def _create_pool(db: str):
+    return await aiomysql.create_pool(
+        host=DB_HOST,
+        port=DB_PORT,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        db=DATABASES[db],
+        minsize=POOL_MIN_SIZE,
+        maxsize=POOL_MAX_SIZE,
+        pool_recycle=POOL_RECYCLE,
+        connect_timeout=POOL_CONNECT_TIMEOUT,
+        # 조회 후 트랜잭션 스냅샷이 풀에 남지 않도록 autocommit 사용.
+        # 여러 문장을 묶어야 하는 쓰기는 conn.begin() 으로 트랜잭션을 시작합니다.
+        autocommit=True,
+        cursorclass=TimedCursor,
     )
+
+
+async def init_pools():
+    """스키마별 커넥션 풀 생성"""
+    async with _pool_lock:
+        for db in DATABASES:
+            if db not in _pools:
+                _pools[db] = await _create_pool(db)
+
+
+async def close_pools():
+    """모든 커넥션 풀을 닫고 사용 중인 커넥션이 반환될 때까지 대기"""
+    async with _pool_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+    for pool in pools:
+        await pool.wait_closed()
+
+
+async def _get_pool(db: str):
+    pool = _pools.get(db)
+    if pool is not None:
+        return pool
+    if db not in DATABASES:
+        raise KeyError(f"Unknown database: {db}")
+    # lifespan 밖(스크립트 등)에서 호출된 경우 지연 생성
+    async with _pool_lock:
+        if db not in _pools:
+            _pools[db] = await _create_pool(db)
+        return _pools[db]
+
+
+@asynccontextmanager
+async def acquire(db: str = "web"):
+    """풀에서 커넥션을 빌려오고 블록이 끝나면 반드시 반환합니다.
+
+    사용 예:
+        async with acquire("welding") as conn:
+            async with conn.cursor() as cursor:
+                ...
+    """
+    pool = await _get_pool(db)
+    metrics = _metrics[db]
+    if pool.freesize == 0 and pool.size >= pool.maxsize:
+        metrics.saturated_count += 1
+
+    metrics.waiting += 1
+    started = time.perf_counter()
+    try:
+        conn = await pool.acquire()
+    finally:
+        metrics.waiting -= 1
+    waited = time.perf_counter() - started
+    metrics.acquire_count += 1
+    metrics.wait_seconds_total += waited
+    metrics.wait_seconds_max = max(metrics.wait_seconds_max, waited)
+
+    try:
+        yield conn
+    except BaseException:
+        # 커밋되지 않은 트랜잭션이 다음 사용자에게 넘어가지 않도록 정리
+        try:
+            await conn.rollback()
+        except Exception:
+            conn.close()
+        raise
+    finally:
+        pool.release(conn)
+
+
+def pool_stats():
+    """풀 포화도 및 대기 시간 지표"""
+    stats = {}
+    for db, metrics in _metrics.items():
+        pool = _pools.get(db)
+        entry = metrics.as_dict()
+        if pool is not None:
+            in_use = pool.size - pool.freesize
+            entry.update({
+                "size": pool.size,
+                "free": pool.freesize,
+                "in_use": in_use,
+                "min_size": pool.minsize,
+                "max_size": pool.maxsize,
+                "saturation": round(in_use / pool.maxsize, 4) if pool.maxsize else 0.0,
+            })
+        stats[db] = entry
+    return stats
+
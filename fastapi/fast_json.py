@@ -0,0 +1,165 @@
+"""빠른 JSON 응답 직렬화
+
+    python fast_json.py [행 수]     # 현재 방식(jsonable_encoder + json)과 비교하는 마이크로 벤치마크
+
+orjson 이 설치되어 있으면 orjson, 없으면 ujson(requirements 에 포함), 둘 다 없으면 표준 json 을 사용합니다.
+"""
+import datetime
+import decimal
+import json
+import sys
+import time
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+JSON_BACKEND = "orjson" if orjson else "ujson" if ujson else "json"
+
+
+def _default(value):
+    """orjson/표준 json 이 직접 처리하지 못하는 DB 값 변환"""
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8", errors="replace")
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if hasattr(value, "tolist"):
+        # numpy 스칼라/배열
+        return value.tolist()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _plain(value):
+    """ujson 용: 처리 못 하는 값을 미리 변환 (ujson 의 default 는 버전에 따라 없음)"""
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return _default(value)
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(value) -> bytes:
+        return orjson.dumps(value, default=_default, option=_ORJSON_OPTIONS)
+elif ujson is not None:
+    def dumps(value) -> bytes:
+        return ujson.dumps(_plain(value), ensure_ascii=False).encode("utf-8")
+else:
+    def dumps(value) -> bytes:
+        return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """앱 기본 응답 클래스. 핸들러가 이 응답을 직접 반환하면 jsonable_encoder 도 거치지 않습니다."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+class RowCodec:
+    """컬럼 목록으로 한 번 만들어 두고 DB 행(tuple)을 응답 형태로 변환합니다."""
+
+    FORMATS = ("objects", "columnar")
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+
+    def to_dicts(self, rows):
+        columns = self.columns
+        return [dict(zip(columns, row)) for row in rows]
+
+    def to_columnar(self, rows):
+        return {"columns": self.columns, "rows": [list(row) for row in rows]}
+
+    def encode(self, rows, output_format: str = "objects", key: str = "rows"):
+        """objects: {key: [{컬럼: 값}, ...]}, columnar: {"columns": [...], "rows": [[...], ...]}"""
+        if output_format == "columnar":
+            return self.to_columnar(rows)
+        if output_format != "objects":
+            raise ValueError(f"format 은 {list(self.FORMATS)} 중 하나여야 합니다.")
+        return {key: self.to_dicts(rows)}
+
+
+# ============================================
+# 마이크로 벤치마크
+# ============================================
+
+def _sample_rows(count: int):
+    base = datetime.datetime(2024, 1, 1)
+    return [
+        (i, f"press-{i % 8}", f"item-{i % 97}", base + datetime.timedelta(seconds=i),
+         decimal.Decimal("512.25"), 101.5 + i % 7, 98.25, 77.0)
+        for i in range(count)
+    ]
+
+
+def _timeit(fn, repeat: int = 5):
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = len(fn())
+        best = min(best, time.perf_counter() - started)
+    return best, size
+
+
+def benchmark(count: int = 10000):
+    from fastapi.encoders import jsonable_encoder
+    from replay import PRESS_COLUMNS
+
+    rows = _sample_rows(count)
+    codec = RowCodec(PRESS_COLUMNS)
+
+    def current():
+        # 기존 라우터: 행마다 dict 를 만들고 jsonable_encoder + 표준 json 으로 직렬화
+        data = [
+            {
+                "idx": row[0], "machine_name": row[1], "item_no": row[2], "working_time": row[3],
+                "press_time_ms": row[4], "pressure_1": row[5], "pressure_2": row[6], "pressure_5": row[7],
+            } for row in rows
+        ]
+        return json.dumps(jsonable_encoder({"press_raw_data": data}), ensure_ascii=False).encode("utf-8")
+
+    cases = [
+        ("current (jsonable_encoder + json)", current),
+        (f"codec objects + {JSON_BACKEND}", lambda: dumps(codec.encode(rows, "objects", "press_raw_data"))),
+        (f"codec columnar + {JSON_BACKEND}", lambda: dumps(codec.encode(rows, "columnar"))),
+    ]
+    results = []
+    for name, fn in cases:
+        seconds, size = _timeit(fn)
+        results.append((name, seconds, size))
+    return results
+
+
+def main(argv):
+    count = int(argv[0]) if argv else 10000
+    results = benchmark(count)
+    baseline = results[0][1]
+    print(f"{count} rows, backend={JSON_BACKEND}")
+    print(f"{'case':<40} {'ms':>9} {'bytes':>10} {'speedup':>8}")
+    for name, seconds, size in results:
+        print(f"{name:<40} {seconds * 1000:9.2f} {size:10d} {baseline / seconds:7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,16 @@
+# gunicorn -c gunicorn.conf.py main:app
+import os
+
+from server import HOST, PORT, WORKERS, GRACEFUL_TIMEOUT, LOG_LEVEL
+
+bind = f"{HOST}:{PORT}"
+workers = WORKERS
+worker_class = "uvicorn.workers.UvicornWorker"
+graceful_timeout = GRACEFUL_TIMEOUT
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+loglevel = LOG_LEVEL
+# 메모리 누수 대비: 일정 요청 수마다 워커 재시작 (0 이면 비활성)
+max_requests = int(os.getenv("MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "0"))
+# UvicornWorker 는 uvloop/httptools 가 설치되어 있으면 자동으로 사용합니다.
@@ -0,0 +1,232 @@
+import asyncio
+import os
+import time
+
+from metrics import outbound
+
+# ============================================
+# 외부 모델 API 설정
+# ============================================
+
+MODEL_API_URL = os.getenv(
+    "MODEL_API_URL",
+    "https://4c6d-34-45-140-254.ngrok-free.app/engineering/realtime-welding/predict",
+)
+# 여러 샘플을 {"data": [[...], ...]} 로 받아 {"predictions": [...]} 를 돌려주는 엔드포인트.
+# 모델 서버가 배치 엔드포인트를 제공할 때만 설정합니다 (비어 있으면 마이크로 배치를 쓰지 않음)
+MODEL_API_BATCH_URL = os.getenv("MODEL_API_BATCH_URL", "")
+
+MODEL_API_TIMEOUT = float(os.getenv("MODEL_API_TIMEOUT", "5"))
+MODEL_API_RETRIES = int(os.getenv("MODEL_API_RETRIES", "2"))
+MODEL_API_POOL_SIZE = int(os.getenv("MODEL_API_POOL_SIZE", "20"))
+MODEL_API_KEEPALIVE = float(os.getenv("MODEL_API_KEEPALIVE", "30"))
+
+# 마이크로 배치 설정. MAX_SIZE 가 1 이거나 배치 URL 이 없으면 단건 엔드포인트를 사용합니다.
+MODEL_BATCH_MAX_SIZE = int(os.getenv("MODEL_BATCH_MAX_SIZE", "1"))
+MODEL_BATCH_MAX_WAIT = float(os.getenv("MODEL_BATCH_MAX_WAIT", "0.01"))
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("MODEL_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("MODEL_BREAKER_RESET", "30"))
+
+
+class InferenceError(Exception):
+    """모델 API 호출 실패. status 는 응답 코드(없으면 503)"""
+
+    def __init__(self, message: str, status: int = 503):
+        super().__init__(message)
+        self.status = status
+
+
+class CircuitBreaker:
+    """연속 실패가 임계치를 넘으면 일정 시간 호출을 차단합니다."""
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        return self.state != "open"
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class InferenceClient:
+    """keep-alive 커넥션 풀을 재사용하는 모델 API 클라이언트"""
+
+    def __init__(self, url: str = MODEL_API_URL, batch_url: str = MODEL_API_BATCH_URL,
+                 timeout: float = MODEL_API_TIMEOUT, retries: int = MODEL_API_RETRIES,
+                 pool_size: int = MODEL_API_POOL_SIZE,
+                 max_batch_size: int = MODEL_BATCH_MAX_SIZE,
+                 max_wait: float = MODEL_BATCH_MAX_WAIT):
+        self.url = url
+        self.batch_url = batch_url or None
+        self.timeout = timeout
+        self.retries = retries
+        self.pool_size = pool_size
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.breaker = CircuitBreaker()
+        self._session = None
+        self._queue = None
+        self._worker = None
+        # 전송 중인 배치 작업 -> 그 배치 (종료 시 실패 처리용)
+        self._inflight = {}
+
+    def _get_session(self):
+        # aiohttp 는 첫 예측 요청 때 임포트 (시작 시간 단축)
+        import aiohttp
+
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=MODEL_API_KEEPALIVE)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def _post(self, url: str, payload: dict) -> dict:
+        if not self.breaker.allow():
+            raise InferenceError("모델 API 회로 차단 중")
+        import aiohttp
+
+        last_error = None
+        for attempt in range(self.retries + 1):
+            try:
+                async with outbound("model_api") as call, self._get_session().post(url, json=payload) as response:
+                    if response.status == 200:
+                        result = await response.json()
+                        self.breaker.record_success()
+                        return result
+                    call.outcome = "error"
+                    last_error = InferenceError(f"모델 API 예측 실패, 상태: {response.status}", response.status)
+                    # 4xx 는 재시도해도 같은 결과이므로 즉시 실패
+                    if response.status < 500:
+                        raise last_error
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                last_error = InferenceError(f"모델 API 연결 실패: {e}")
+            if attempt < self.retries:
+                await asyncio.sleep(0.1 * 2 ** attempt)
+        self.breaker.record_failure()
+        raise last_error
+
+    async def predict_one(self, features) -> object:
+        result = await self._post(self.url, {"data": list(features)})
+        return result.get("prediction")
+
+    async def predict_many(self, rows) -> list:
+        """여러 샘플을 한 번의 요청으로 예측"""
+        rows = [list(r) for r in rows]
+        result = await self._post(self.batch_url, {"data": rows})
+        predictions = result.get("predictions")
+        if predictions is None or len(predictions) != len(rows):
+            raise InferenceError("모델 API 배치 응답 크기가 요청과 다릅니다.", 502)
+        return predictions
+
+    @property
+    def batching(self) -> bool:
+        return self.max_batch_size > 1 and self.batch_url is not None
+
+    async def predict(self, features) -> object:
+        """단건 예측. 동시에 들어온 호출은 마이크로 배치로 묶어서 보냅니다."""
+        if not self.batching:
+            return await self.predict_one(features)
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._batch_loop(), name="inference-batcher")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((list(features), future))
+        return await future
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        batch = []
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_batch_size:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                # 다음 배치를 모으는 동안 요청이 진행되도록 분리
+                task = asyncio.create_task(self._dispatch(batch))
+                self._inflight[task] = batch
+                task.add_done_callback(lambda t: self._inflight.pop(t, None))
+                batch = []
+        except asyncio.CancelledError:
+            # 모으던 중이던 배치는 보내지 못하므로 호출한 쪽에 실패를 알림
+            _fail(batch, InferenceError("모델 API 클라이언트가 종료되었습니다."))
+            raise
+
+    async def _predict_each(self, rows) -> list:
+        return await asyncio.gather(*(self.predict_one(features) for features in rows))
+
+    async def _dispatch(self, batch):
+        rows = [features for features, _ in batch]
+        try:
+            if len(batch) == 1 or self.batch_url is None:
+                predictions = await self._predict_each(rows)
+            else:
+                try:
+                    predictions = await self.predict_many(rows)
+                except InferenceError as e:
+                    # 배치 엔드포인트가 없는 모델 서버: 이후로는 단건 호출만 사용
+                    if e.status not in (404, 405):
+                        raise
+                    self.batch_url = None
+                    predictions = await self._predict_each(rows)
+        except Exception as e:
+            _fail(batch, e)
+            return
+        for (_, future), prediction in zip(batch, predictions):
+            if not future.done():
+                future.set_result(prediction)
+
+    async def close(self):
+        """배치 작업을 멈추고 대기 중이거나 전송 중인 호출은 모두 InferenceError 로 끝냅니다."""
+        worker, self._worker = self._worker, None
+        inflight, self._inflight = self._inflight, {}
+        tasks = ([worker] if worker is not None else []) + list(inflight)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        error = InferenceError("모델 API 클라이언트가 종료되었습니다.")
+        for batch in inflight.values():
+            _fail(batch, error)
+        queue, self._queue = self._queue, None
+        while queue is not None and not queue.empty():
+            _fail([queue.get_nowait()], error)
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+def _fail(batch, error: Exception):
+    for _, future in batch:
+        if not future.done():
+            future.set_exception(error)
+
+
+inference_client = InferenceClient()
@@ -0,0 +1,90 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+
+# ============================================
+# 로깅 설정
+# ============================================
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info").upper()
+# json: 한 줄에 JSON 하나 (수집기용), text: 사람이 읽기 쉬운 형식 (개발용)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+
+# 미들웨어가 요청마다 설정하고 로그 레코드에 함께 기록
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+# LogRecord 기본 속성 (extra 로 넘긴 필드만 골라내기 위함)
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+_listener = None
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """logger.info("...", extra={"키": 값}) 의 extra 필드를 최상위 키로 기록합니다."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if record.request_id:
+            entry["request_id"] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT):
+    """루트 로거를 큐 핸들러로 교체합니다.
+
+    핸들러는 레코드를 큐에 넣기만 하고, 포맷과 출력은 QueueListener 스레드에서 처리하므로
+    로그 출력이 이벤트 루프를 막지 않습니다. 여러 번 호출해도 한 번만 설정됩니다.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    output = logging.StreamHandler(sys.stdout)
+    if fmt == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    handler = logging.handlers.QueueHandler(log_queue)
+    # request_id 는 요청을 처리하는 태스크의 컨텍스트에서 읽어야 하므로 큐에 넣기 전에 채움
+    handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """남은 로그를 모두 출력하고 리스너 스레드를 종료합니다."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
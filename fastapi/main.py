@@ -1,37 +1,86 @@
-from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form
+from log_setup import setup_logging
+
+# 다른 모듈이 임포트 중에 남기는 로그도 큐 핸들러를 거치도록 가장 먼저 설정
+setup_logging()
+
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi import Depends #로그인
 
 from controllers import test_controller
-from superset import get_superset_data
-import mysql.connector
-from mysql.connector import Error
-import pkgutil
-import importlib
-import aiomysql
+from superset import superset_gateway
+from startup import register_routers
+from fast_json import FastJSONResponse
 from pydantic import BaseModel
-from typing import Optional, List, Dict
-import aiohttp
-from io import BytesIO
 from datetime import datetime
 import logging
 import pytz
 
-#비밀번호 암호화를 위한 라이브러리
-from passlib.context import CryptContext
-from sqlalchemy import Column, Integer, String, create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
-from database import get_db_connection
-
-import uvicorn
+from database import acquire, init_pools, close_pools, pool_stats
+from realtime_feed import close_channels, attach_trend_engine
+from trend import trend_engine
+from stock_quotes import stock_quote_service
+from inference_client import inference_client
+from bulk_scoring import bulk_scorer
+from replay import welding_replay
+from rollup import rollup_engine, live_score_writer, ROLLUP_ENABLED
+from sensor_store import sensor_store, SENSOR_STORE_ENABLED
+from auth import issue_token, revocation_list, last_login_writer
+from credentials import credential_service
+from metrics import MetricsMiddleware, render_metrics
+from admission import AdmissionMiddleware, admission_controller
+from query_cache import query_cache
+from contextlib import asynccontextmanager
 
-# 로깅 설정 추가
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
-
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 스키마별 커넥션 풀을 시작 시 한 번만 생성
+    await init_pools()
+    # 워커 간 캐시 무효화에 쓰는 세대 번호 테이블
+    await query_cache.generations.ensure_table()
+    query_cache.generations.start()
+    # 대량 예측 작업 상태 (어느 워커에서든 조회/취소)
+    await bulk_scorer.store.ensure_table()
+    # 웰딩 리플레이와 실시간 피드 위치가 함께 쓰는 공유 커서 테이블
+    await welding_replay.store.ensure_table()
+    # 품질 예측/집계 테이블 (요청마다 확인하지 않도록 시작 시 한 번)
+    await rollup_engine.ensure_tables()
+    if ROLLUP_ENABLED:
+        rollup_engine.start()
+    if SENSOR_STORE_ENABLED:
+        # 원본 테이블을 로컬 Parquet 파티션으로 증분 복제 (이력 조회용)
+        sensor_store.start()
+    # 트렌드 엔진은 실시간 피드의 모든 행을 받아 이동 통계를 유지
+    attach_trend_engine(trend_engine)
+    stock_quote_service.start()
+    revocation_list.start()
+    last_login_writer.start()
+    live_score_writer.start()
+    try:
+        yield
+    finally:
+        await stock_quote_service.stop()
+        await query_cache.generations.stop()
+        await revocation_list.stop()
+        # 남은 last_login 을 기록한 뒤 풀을 닫음
+        await last_login_writer.stop()
+        await live_score_writer.stop()
+        await rollup_engine.stop()
+        await sensor_store.stop()
+        await close_channels()
+        await bulk_scorer.close()
+        await inference_client.close()
+        await superset_gateway.close()
+        credential_service.close()
+        await close_pools()
+
+
+# 모든 라우터의 JSON 응답을 orjson(없으면 ujson) 으로 직렬화
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+
+# 비용이 큰 엔드포인트의 요청 빈도/동시 처리 제한. CORS 안쪽에 두어 거절 응답에도 CORS 헤더가 붙도록 함
+app.add_middleware(AdmissionMiddleware)
 
 # CORS 설정
 app.add_middleware(
@@ -41,29 +90,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-uvicorn.run(app, host="0.0.0.0", port=8000)
-
-
-def register_routers(app):
-    router = APIRouter()
-    package = "routers"
-    for _, module_name, _ in pkgutil.iter_modules([package]):
-        full_module_name = f"{package}.{module_name}"
-        try:
-            module = importlib.import_module(full_module_name)
-            if hasattr(module, "router"):
-                router.include_router(
-                    module.router,
-                    prefix=f"/{module_name.replace('_', '-')}",
-                    tags=[module_name.capitalize()]
-                )
-                print(f"Registered router for {full_module_name}")
-        except ImportError as e:
-            print(f"Error importing {full_module_name}: {e}")
-
-    app.include_router(router)
-
+# 가장 바깥에서 요청 지연 시간과 DB/외부 호출 시간을 측정
+app.add_middleware(MetricsMiddleware)
 
 # 컨트롤러의 라우터를 애플리케이션에 포함
 app.include_router(test_controller.router)
@@ -73,58 +101,31 @@ register_routers(app)
 async def read_item(item_id: int):
     return {"item_id": item_id, "name": f"Item {item_id}"}
 
-@app.get("/superset-data")
-async def superset_data():
-    try:
-        data = await get_superset_data()
-        return data
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+# /superset-data 는 controllers/test_controller.py 에서 (superset_gateway 를 거쳐) 제공합니다.
 
 @app.get("/test")
 async def test_endpoint():
     return {"message": "Hello from FastAPI!"}
 
+@app.get("/db-pool-stats")
+async def db_pool_stats():
+    """커넥션 풀 대기 시간 및 포화도"""
+    return pool_stats()
 
+@app.get("/admission-stats")
+async def admission_stats():
+    """유입 제어 현황 (처리 중 요청 수, 규칙별 동시 처리/대기열)"""
+    return admission_controller.stats()
 
-######################################## 로그인 ############################################
-# 비밀번호 암호화를 위한 설정
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-# 데이터베이스 설정 (예: SQLite 사용)
-DATABASE_URL = "sqlite:///./test.db"
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
-
-# 사용자 모델 정의 (데이터베이스 테이블 구조)
-class User(Base):
-    __tablename__ = "users"
-    id = Column(Integer, primary_key=True, index=True)
-    username = Column(String, unique=True, index=True)
-    hashed_password = Column(String)  # 비밀번호는 해시 형태로 저장
-
-# 데이터베이스 초기화 (테이블 생성)
-Base.metadata.create_all(bind=engine)
-
-# 의존성: 데이터베이스 세션 생성
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus 지표 (라우트별 지연 시간, DB/외부 호출 시간, 처리 중 요청 수, 커넥션 풀)"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
-# 비밀번호 검증 함수
-def verify_password(plain_password, hashed_password):
-    """사용자가 입력한 비밀번호(평문)와 해시화된 비밀번호를 비교"""
-    return pwd_context.verify(plain_password, hashed_password)
 
-# 비밀번호 해시화 함수
-def hash_password(password):
-    """사용자가 입력한 비밀번호를 해시화하여 저장할 때 사용"""
-    return pwd_context.hash(password)
 
+######################################## 로그인 ############################################
 # 로그인 요청 모델
 class LoginRequest(BaseModel):
     username: str
@@ -134,47 +135,37 @@ class LoginRequest(BaseModel):
 # FastAPI 로그인 엔드포인트 확인
 @app.post("/")
 async def login(request: LoginRequest):
-    conn = await get_db_connection()
-    try:
+    # 반복 시도 제한은 admission 의 클라이언트별 규칙("login")이 담당
+    async with acquire("web") as conn:
         async with conn.cursor() as cursor:
-            # 로그인 시도 로그
-            print(f"로그인 시도 - username: {request.username}, employee_no: {request.employee_no}")
             await cursor.execute(
                 "SELECT name, employee_no, position FROM employees WHERE name = %s AND employee_no = %s",
                 (request.username, request.employee_no)
             )
             result = await cursor.fetchone()
             if not result:
+                logger.info("login failed", extra={"employee_no": request.employee_no})
                 raise HTTPException(status_code=400, detail="Invalid username or employee number")
 
             name, employee_no, position = result
-            print(f"로그인 성공 - Role: {position}")
+            logger.info("login succeeded", extra={"employee_no": employee_no, "position": position})
 
             # pytz를 사용해 현재 시간을 한국 시간대로 설정
             kst = pytz.timezone('Asia/Seoul')
             current_time = datetime.now(kst).strftime('%Y-%m-%d %H:%M:%S')
-            print(f"Current Time (KST): {current_time}")  # 로그로 현재 시간 확인
-
-            await cursor.execute(
-                "UPDATE employees SET last_login = %s WHERE employee_no = %s",
-                (current_time, employee_no)
-            )
-            await conn.commit()
 
-            return {"message": "Login successful", "role": position}
-    finally:
-        conn.close()
+    # last_login 은 백그라운드에서 모아서 기록 (로그인 응답을 UPDATE 가 막지 않도록)
+    last_login_writer.record(employee_no, current_time)
+    token = issue_token(employee_no, name, position)
+    return {"message": "Login successful", "role": position, "access_token": token, "token_type": "bearer"}
 
 
 ######################################### 로그아웃 ###########################################
-# @app.post("/")
-# async def logout():
-#     """
-#     로그아웃 엔드포인트:
-#     - 클라이언트의 세션을 종료하거나 쿠키를 삭제합니다.
-#     """
-#     # 로그아웃 관련 세션 삭제 및 응답 설정
-#     response = {"message": "로그아웃되었습니다."}
-#     # 여기서 필요한 경우 세션 정보를 삭제하는 로직 추가 가능
-#     return response
-#
+# 로그아웃은 routers/logout.py (POST /logout/) 에서 토큰을 폐기합니다.
+
+
+if __name__ == "__main__":
+    # pm2 등에서 `python main.py` 로 실행해도 멀티 워커 서버로 기동
+    from server import main
+
+    main()
@@ -0,0 +1,224 @@
+import contextvars
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.core import GaugeMetricFamily
+
+import database
+from log_setup import request_id_var
+
+# ============================================
+# 성능 지표 설정
+# ============================================
+
+# 여러 워커의 지표를 합치려면 PROMETHEUS_MULTIPROC_DIR 을 설정 (prometheus_client 멀티프로세스 모드)
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+registry = CollectorRegistry(auto_describe=True)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "요청 처리 시간", ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS, registry=registry,
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds", "요청 하나에서 DB 쿼리에 쓴 시간", ["route"],
+    buckets=LATENCY_BUCKETS, registry=registry,
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "요청 하나에서 실행한 DB 쿼리 수 (왕복 횟수)", ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100), registry=registry,
+)
+REQUEST_OUTBOUND_TIME = Histogram(
+    "http_request_outbound_seconds", "요청 하나에서 외부 HTTP 호출에 쓴 시간", ["route"],
+    buckets=LATENCY_BUCKETS, registry=registry,
+)
+IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "처리 중인 요청 수", ["method"],
+    registry=registry, multiprocess_mode="livesum",
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "DB 쿼리 실행 시간", ["db"],
+    buckets=LATENCY_BUCKETS, registry=registry,
+)
+OUTBOUND_LATENCY = Histogram(
+    "outbound_http_duration_seconds", "외부 HTTP 호출 시간 (model_api, superset, naver)", ["target", "outcome"],
+    buckets=LATENCY_BUCKETS, registry=registry,
+)
+OUTBOUND_ERRORS = Counter(
+    "outbound_http_errors_total", "외부 HTTP 호출 실패 수", ["target"], registry=registry,
+)
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total", "유입 제어로 거절한 요청 수", ["rule", "reason"], registry=registry,
+)
+
+
+class RequestStats:
+    __slots__ = ("db_seconds", "db_queries", "outbound_seconds", "outbound_calls")
+
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.db_queries = 0
+        self.outbound_seconds = 0.0
+        self.outbound_calls = 0
+
+
+_request_stats = contextvars.ContextVar("request_stats", default=None)
+
+
+def current_request_stats():
+    return _request_stats.get()
+
+
+# ============================================
+# DB / 외부 호출 측정
+# ============================================
+
+def _observe_query(db: str, seconds: float):
+    DB_QUERY_LATENCY.labels(db).observe(seconds)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.db_seconds += seconds
+        stats.db_queries += 1
+
+
+database.QUERY_OBSERVERS.append(_observe_query)
+
+
+class OutboundCall:
+    __slots__ = ("outcome",)
+
+    def __init__(self):
+        self.outcome = "ok"
+
+
+@asynccontextmanager
+async def outbound(target: str):
+    """외부 HTTP 호출 시간을 기록합니다. 예외 없이 실패한 응답은 call.outcome = "error" 로 표시
+
+    사용 예:
+        async with outbound("superset") as call:
+            response = await client.get(...)
+    """
+    call = OutboundCall()
+    started = time.perf_counter()
+    try:
+        yield call
+    except BaseException:
+        call.outcome = "error"
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        if call.outcome != "ok":
+            OUTBOUND_ERRORS.labels(target).inc()
+        OUTBOUND_LATENCY.labels(target, call.outcome).observe(seconds)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.outbound_seconds += seconds
+            stats.outbound_calls += 1
+
+
+class PoolCollector:
+    """커넥션 풀 상태 (database.pool_stats) 를 스크랩 시점에 읽어 내보냅니다."""
+
+    FIELDS = ("size", "free", "in_use", "waiting", "saturation", "acquire_count",
+              "wait_seconds_total", "wait_seconds_max", "saturated_count")
+
+    def collect(self):
+        families = {
+            field: GaugeMetricFamily(f"db_pool_{field}", f"커넥션 풀 {field}", labels=["db", "pid"])
+            for field in self.FIELDS
+        }
+        pid = str(os.getpid())
+        for db, stats in database.pool_stats().items():
+            for field in self.FIELDS:
+                if field in stats:
+                    families[field].add_metric([db, pid], stats[field])
+        return list(families.values())
+
+
+registry.register(PoolCollector())
+
+
+def render_metrics():
+    """Prometheus 텍스트 형식 (본문, Content-Type)"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        # 워커별로 기록된 파일을 합산. 풀 상태는 스크랩을 받은 워커의 값만 포함
+        merged = CollectorRegistry()
+        multiprocess.MultiProcessCollector(merged)
+        merged.register(PoolCollector())
+        return generate_latest(merged), CONTENT_TYPE_LATEST
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+# ============================================
+# ASGI 미들웨어
+# ============================================
+
+def route_template(scope) -> str:
+    """매칭된 라우트의 경로 템플릿 (/model-management/model-info/{model_id}).
+
+    FastAPI 버전에 따라 include_router 로 붙은 라우트의 path 에 prefix 가 빠져 있으므로
+    실제 경로에서 같은 개수의 세그먼트를 떼어 prefix 를 복원합니다.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path_format", None) or getattr(route, "path", None)
+    if not template:
+        return "unmatched"
+    segments = scope["path"].split("/")
+    depth = template.count("/")
+    prefix = "/".join(segments[:-depth]) if depth < len(segments) else ""
+    return prefix + template
+
+
+class MetricsMiddleware:
+    """라우트별 지연 시간, 요청당 DB/외부 호출 시간, 처리 중인 요청 수를 기록합니다.
+
+    순수 ASGI 미들웨어라 스트리밍 응답을 버퍼링하지 않습니다. 라우트는 경로 템플릿(/model-info/{model_id})
+    단위로 집계해 지표 개수가 늘어나지 않게 합니다.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        request_id = next(
+            (v.decode("latin-1") for k, v in scope["headers"] if k == b"x-request-id"), None
+        ) or uuid.uuid4().hex
+        stats = RequestStats()
+        stats_token = _request_stats.set(stats)
+        id_token = request_id_var.set(request_id)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        IN_FLIGHT.labels(method).inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            seconds = time.perf_counter() - started
+            IN_FLIGHT.labels(method).dec()
+            route = route_template(scope)
+            REQUEST_LATENCY.labels(method, route, str(status)).observe(seconds)
+            REQUEST_DB_TIME.labels(route).observe(stats.db_seconds)
+            REQUEST_DB_QUERIES.labels(route).observe(stats.db_queries)
+            REQUEST_OUTBOUND_TIME.labels(route).observe(stats.outbound_seconds)
+            _request_stats.reset(stats_token)
+            request_id_var.reset(id_token)
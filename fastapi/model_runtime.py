@@ -0,0 +1,165 @@
+import asyncio
+import io
+import os
+import pickle
+import time
+
+import numpy as np
+
+from database import acquire
+from artifact_store import artifact_store, as_digest
+
+# ============================================
+# 로컬 모델 런타임 설정
+# ============================================
+
+# local: 배포된 model_use_file 로 직접 예측, remote: 외부 모델 API 사용
+MODEL_RUNTIME = os.getenv("MODEL_RUNTIME", "local")
+# 다른 워커에서 배포가 바뀌었는지 확인하는 주기(초)
+MODEL_ACTIVE_CHECK_SECONDS = float(os.getenv("MODEL_ACTIVE_CHECK_SECONDS", "10"))
+MODEL_CACHE_SIZE = int(os.getenv("MODEL_CACHE_SIZE", "3"))
+# 불러오기에 실패한 모델을 다시 시도하기까지의 시간(초). 그동안은 바로 ModelUnavailable
+MODEL_LOAD_RETRY_SECONDS = float(os.getenv("MODEL_LOAD_RETRY_SECONDS", "60"))
+
+WELDING_FEATURES = ["welding_force_bar", "welding_current_ka", "weld_voltage_v", "weld_time_ms"]
+PRESS_FEATURES = ["pressure_1", "pressure_2", "pressure_5", "press_time_ms"]
+
+
+class ModelUnavailable(Exception):
+    """활성 모델이 없거나 모델 파일이 비어 있음"""
+
+
+def process_name_of(model_id: str) -> str:
+    """모델 이름으로 공정 이름을 추정합니다."""
+    name = model_id.lower()
+    if "press" in name:
+        return "press"
+    if "welding" in name:
+        return "welding"
+    return "unknown"
+
+
+def load_artifact(data: bytes):
+    """업로드된 모델 바이너리를 역직렬화합니다. joblib 이 있으면 우선 사용
+
+    pickle 은 임의 코드를 실행할 수 있으므로 모델 파일은 인증된 사용자만 올리고 배포할 수 있습니다
+    (/model-deployment/model-apply, /model-deployment/deploy-previous-model).
+    """
+    try:
+        import joblib
+    except ImportError:
+        return pickle.loads(data)
+    return joblib.load(io.BytesIO(data))
+
+
+class LoadedModel:
+    def __init__(self, model_use_id: str, model):
+        self.model_use_id = model_use_id
+        self.process_name = process_name_of(model_use_id)
+        self.model = model
+        self.loaded_at = time.time()
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """(n, 4) 특징 행렬을 한 번에 예측"""
+        features = np.asarray(features, dtype=np.float64)
+        if features.ndim == 1:
+            features = features.reshape(1, -1)
+        return np.asarray(self.model.predict(features))
+
+
+class ModelRuntime:
+    """활성 모델(model_use_state = 1)을 한 번만 읽어 메모리에 두고 재사용합니다."""
+
+    def __init__(self, cache_size: int = MODEL_CACHE_SIZE, check_seconds: float = MODEL_ACTIVE_CHECK_SECONDS,
+                 retry_seconds: float = MODEL_LOAD_RETRY_SECONDS):
+        self.cache_size = cache_size
+        self.check_seconds = check_seconds
+        self.retry_seconds = retry_seconds
+        self._models = {}
+        # 모델 ID -> (다시 시도할 시각, 실패 사유)
+        self._failures = {}
+        self._active_id = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def _fetch_active_id(self):
+        async with acquire("web") as conn, conn.cursor() as cursor:
+            await cursor.execute("SELECT model_use_id FROM model_use WHERE model_use_state = 1 LIMIT 1")
+            row = await cursor.fetchone()
+            return row[0] if row else None
+
+    async def _fetch_artifact(self, model_use_id: str):
+        async with acquire("web") as conn, conn.cursor() as cursor:
+            await cursor.execute("SELECT model_use_file FROM model_use WHERE model_use_id = %s", (model_use_id,))
+            row = await cursor.fetchone()
+            return row[0] if row else None
+
+    async def _load(self, model_use_id: str) -> LoadedModel:
+        failure = self._failures.get(model_use_id)
+        if failure is not None and failure[0] > time.monotonic():
+            raise ModelUnavailable(failure[1])
+        try:
+            loaded = await self._load_uncached(model_use_id)
+        except Exception as e:
+            reason = f"모델을 불러오지 못했습니다: {model_use_id}: {e}"
+            self._failures[model_use_id] = (time.monotonic() + self.retry_seconds, reason)
+            raise ModelUnavailable(reason) from e
+        self._failures.pop(model_use_id, None)
+        return loaded
+
+    async def _load_uncached(self, model_use_id: str) -> LoadedModel:
+        data = await self._fetch_artifact(model_use_id)
+        if not data:
+            raise ModelUnavailable(f"모델 파일이 없습니다: {model_use_id}")
+        digest = as_digest(data)
+        if digest is not None:
+            if not artifact_store.exists(digest):
+                raise ModelUnavailable(f"아티팩트 저장소에 모델 파일이 없습니다: {digest}")
+            data = await artifact_store.read_bytes(digest)
+        # 역직렬화는 CPU 작업이므로 이벤트 루프 밖에서 실행
+        model = await asyncio.to_thread(load_artifact, data)
+        loaded = LoadedModel(model_use_id, model)
+        self._models[model_use_id] = loaded
+        while len(self._models) > self.cache_size:
+            oldest = min(self._models.values(), key=lambda m: m.loaded_at)
+            del self._models[oldest.model_use_id]
+        return loaded
+
+    async def active(self) -> LoadedModel:
+        """현재 활성 모델. 배포가 바뀌었으면 새 모델로 교체합니다."""
+        async with self._lock:
+            now = time.monotonic()
+            if self._active_id is None or now - self._checked_at >= self.check_seconds:
+                self._active_id = await self._fetch_active_id()
+                self._checked_at = now
+            if self._active_id is None:
+                raise ModelUnavailable("활성 모델이 없습니다.")
+            loaded = self._models.get(self._active_id)
+            if loaded is None:
+                loaded = await self._load(self._active_id)
+            return loaded
+
+    def activate(self, model_use_id: str):
+        """배포 엔드포인트에서 호출. 다음 예측부터 새 모델을 사용합니다."""
+        self._active_id = model_use_id
+        self._checked_at = time.monotonic()
+        self._models.pop(model_use_id, None)
+        self._failures.pop(model_use_id, None)
+
+    async def predict(self, features) -> np.ndarray:
+        loaded = await self.active()
+        features = np.asarray(features, dtype=np.float64)
+        if len(features) > 1024:
+            return await asyncio.to_thread(loaded.predict, features)
+        return loaded.predict(features)
+
+    def stats(self):
+        return {
+            "runtime": MODEL_RUNTIME,
+            "active_model_use_id": self._active_id,
+            "cached_models": sorted(self._models),
+            "failed_models": sorted(self._failures),
+        }
+
+
+model_runtime = ModelRuntime()
@@ -0,0 +1,33 @@
+import os
+
+from database import acquire
+from model_runtime import WELDING_FEATURES, PRESS_FEATURES
+
+# ============================================
+# 공정별 원본/예측 테이블
+# ============================================
+
+# 이 값으로 예측된 행을 불량으로 집계합니다.
+DEFECT_LABEL = float(os.getenv("DEFECT_LABEL", "1"))
+
+PROCESSES = {
+    "welding": {"db": "welding", "table": "welding_raw_data", "features": WELDING_FEATURES},
+    "press": {"db": "press", "table": "press_raw_data", "features": PRESS_FEATURES},
+}
+
+
+def score_table(process: str) -> str:
+    return f"{process}_quality_score"
+
+
+async def ensure_score_table(process: str):
+    async with acquire(PROCESSES[process]["db"]) as conn, conn.cursor() as cursor:
+        await cursor.execute(
+            f"""CREATE TABLE IF NOT EXISTS {score_table(process)} (
+                idx BIGINT NOT NULL PRIMARY KEY,
+                model_use_id VARCHAR(255) NOT NULL,
+                prediction DOUBLE NOT NULL,
+                is_defect TINYINT NOT NULL,
+                scored_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            )"""
+        )
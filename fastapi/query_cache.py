@@ -0,0 +1,234 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from fastapi import Request, Response
+
+from database import acquire
+from fast_json import dumps
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# 조회 결과 캐시 설정
+# ============================================
+
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "300"))
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "512"))
+# 태그 세대 번호 저장소. mysql: 워커 간 공유 (기본), memory: 단일 워커 개발용
+QUERY_CACHE_GENERATION_BACKEND = os.getenv("QUERY_CACHE_GENERATION_BACKEND", "mysql")
+# 다른 워커의 무효화를 가져오는 주기(초). 다른 워커에는 최대 이 시간만큼 늦게 반영됨
+QUERY_CACHE_GENERATION_SYNC_SECONDS = float(os.getenv("QUERY_CACHE_GENERATION_SYNC_SECONDS", "2"))
+
+
+class CacheEntry:
+    __slots__ = ("body", "etag", "expires_at", "tags", "generations")
+
+    def __init__(self, body: bytes, expires_at: float, tags, generations=None):
+        self.body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        self.expires_at = expires_at
+        self.tags = frozenset(tags)
+        # 조회를 시작할 때의 태그별 세대 번호
+        self.generations = generations or {}
+
+
+# ============================================
+# 태그 세대 번호 저장소
+# ============================================
+
+class MemoryGenerationStore:
+    """프로세스 내부 세대 번호 (단일 워커 개발용)"""
+
+    def __init__(self):
+        self._generations = {}
+
+    async def ensure_table(self):
+        pass
+
+    def current(self, tags) -> dict:
+        return {tag: self._generations.get(tag, 0) for tag in tags}
+
+    async def bump(self, tag: str):
+        self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class MySQLGenerationStore:
+    """web 스키마의 cache_generation 테이블에 태그별 세대 번호를 두어 워커 간에 무효화를 공유합니다.
+
+    조회 경로에서는 메모리의 세대 번호만 보고, 백그라운드 작업이 sync_seconds 마다 테이블 전체
+    (태그 몇 개)를 읽어 갱신합니다. 무효화한 워커에는 바로, 다른 워커에는 다음 동기화 때 반영됩니다.
+    """
+
+    def __init__(self, db: str = "web", sync_seconds: float = QUERY_CACHE_GENERATION_SYNC_SECONDS):
+        self.db = db
+        self.sync_seconds = sync_seconds
+        self._generations = {}
+        self._task = None
+
+    async def ensure_table(self):
+        async with acquire(self.db) as conn, conn.cursor() as cursor:
+            await cursor.execute(
+                """CREATE TABLE IF NOT EXISTS cache_generation (
+                    tag VARCHAR(64) NOT NULL PRIMARY KEY,
+                    generation BIGINT NOT NULL DEFAULT 0
+                )"""
+            )
+
+    def current(self, tags) -> dict:
+        return {tag: self._generations.get(tag, 0) for tag in tags}
+
+    def _update(self, rows):
+        # 세대 번호는 늘기만 하므로 더 큰 값만 반영
+        for tag, generation in rows:
+            if generation > self._generations.get(tag, 0):
+                self._generations[tag] = generation
+
+    async def sync(self):
+        async with acquire(self.db) as conn, conn.cursor() as cursor:
+            await cursor.execute("SELECT tag, generation FROM cache_generation")
+            self._update(await cursor.fetchall())
+
+    async def bump(self, tag: str):
+        async with acquire(self.db) as conn, conn.cursor() as cursor:
+            await cursor.execute(
+                "INSERT INTO cache_generation (tag, generation) VALUES (%s, 1) "
+                "ON DUPLICATE KEY UPDATE generation = generation + 1",
+                (tag,)
+            )
+            await cursor.execute("SELECT generation FROM cache_generation WHERE tag = %s", (tag,))
+            (generation,) = await cursor.fetchone()
+        self._update([(tag, generation)])
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.warning("cache generation sync failed: %s", e)
+            await asyncio.sleep(self.sync_seconds)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="cache-generation-sync")
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+
+def make_generation_store(backend: str = QUERY_CACHE_GENERATION_BACKEND):
+    if backend == "memory":
+        return MemoryGenerationStore()
+    if backend == "mysql":
+        return MySQLGenerationStore()
+    raise ValueError(f"Unknown query cache generation backend: {backend}")
+
+
+class QueryCache:
+    """TTL + LRU 조회 결과 캐시.
+
+    값은 JSON 으로 한 번만 직렬화해 보관하고, 쓰기 엔드포인트가 태그 단위로 무효화합니다.
+    무효화는 태그의 세대 번호를 올리는 방식이라 세대 저장소를 공유하는 모든 워커에 반영됩니다.
+    조회 시 세대 비교는 메모리에서만 하므로 캐시 적중은 DB 를 거치지 않습니다.
+    """
+
+    def __init__(self, maxsize: int = QUERY_CACHE_SIZE, ttl: float = QUERY_CACHE_TTL, generations=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generations = generations if generations is not None else make_generation_store()
+        self._entries = OrderedDict()
+        self._loading = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _put(self, key: str, entry: CacheEntry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def get_or_load(self, key: str, loader, tags=()) -> CacheEntry:
+        generations = self.generations.current(tags)
+        entry = self._get(key)
+        if entry is not None and entry.generations == generations:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        # 같은 키를 동시에 조회하면 DB 조회는 한 번만
+        pending = self._loading.get(key)
+        if pending is None:
+            pending = self._loading[key] = asyncio.ensure_future(self._load(key, loader, tags, generations))
+            pending.add_done_callback(lambda _: self._loading.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def _load(self, key: str, loader, tags, generations) -> CacheEntry:
+        value = await loader()
+        body = dumps(value)
+        entry = CacheEntry(body, time.monotonic() + self.ttl, tags, generations)
+        self._put(key, entry)
+        return entry
+
+    async def invalidate(self, tag: str):
+        """태그가 붙은 항목을 모두 제거하고 다른 워커에도 알립니다 (쓰기를 커밋한 뒤 호출)."""
+        self.invalidate_local(tag)
+        await self.generations.bump(tag)
+
+    def invalidate_local(self, tag: str):
+        for key in [k for k, e in self._entries.items() if tag in e.tags]:
+            del self._entries[key]
+        for future in list(self._loading.values()):
+            # 무효화 이전에 시작된 조회 결과가 캐시에 남지 않도록
+            future.add_done_callback(lambda f, t=tag: self._drop_loaded(f, t))
+
+    def _drop_loaded(self, future, tag: str):
+        if future.cancelled() or future.exception() is not None:
+            return
+        entry = future.result()
+        if tag in entry.tags:
+            for key, cached in list(self._entries.items()):
+                if cached is entry:
+                    del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+query_cache = QueryCache()
+
+
+async def cached_json(request: Request, key: str, loader, tags=()) -> Response:
+    """캐시된 JSON 응답. If-None-Match 가 ETag 와 같으면 304 를 돌려줍니다."""
+    entry = await query_cache.get_or_load(key, loader, tags)
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and entry.etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import os
+import tempfile
+
+from fast_json import dumps
+from replay import ReplayEngine, PRESS_COLUMNS, WELDING_COLUMNS
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+FEED_INTERVAL_SECONDS = float(os.getenv("FEED_INTERVAL_SECONDS", "1.0"))
+FEED_BATCH_SIZE = int(os.getenv("FEED_BATCH_SIZE", "100"))
+# 구독자별 대기열 크기. 가득 차면 느린 구독자로 보고 연결을 끊습니다.
+FEED_QUEUE_SIZE = int(os.getenv("FEED_QUEUE_SIZE", "256"))
+# 피드 위치를 전진시킬 워커 하나를 고르는 잠금 파일 (같은 호스트의 워커끼리 공유)
+FEED_LOCK_PATH = os.getenv("FEED_LOCK_PATH", os.path.join(tempfile.gettempdir(), "fastapi-feed.lock"))
+
+
+class FeedLeader:
+    """여러 워커 중 파일 잠금을 얻은 하나만 피드 위치를 전진시킵니다. (잠금을 가진 워커가 죽으면 다른 워커가 이어받음)"""
+
+    def __init__(self, path: str = FEED_LOCK_PATH):
+        self.path = path
+        self._lock_file = None
+
+    @property
+    def held(self) -> bool:
+        return self._lock_file is not None
+
+    def try_acquire(self) -> bool:
+        if self._lock_file is not None:
+            return True
+        lock_file = open(self.path, "w")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+        self._lock_file = lock_file
+        return True
+
+    def release(self):
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+class Subscription:
+    """구독자 한 명의 대기열"""
+
+    def __init__(self, maxsize: int):
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = False
+
+    async def get(self):
+        """다음 메시지(JSON 문자열). 느린 구독자로 끊긴 경우 None"""
+        return await self.queue.get()
+
+    def _drop(self):
+        self.dropped = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class FeedChannel:
+    """공정별 생산자 태스크 하나가 원본 데이터를 읽어 모든 구독자에게 전달합니다.
+
+    피드 위치(마지막으로 내보낸 idx)는 리플레이 커서 저장소에 두고, 잠금을 가진 워커 하나만
+    interval 마다 한 행씩 전진시킵니다. 다른 워커는 공유 위치까지의 행을 따라 읽으므로
+    어느 워커에 연결해도 같은 행을 같은 순서로 받고, 트렌드 창도 워커 간에 같습니다.
+    구독자 수와 관계없이 DB 조회는 프로세스당 생산자 하나뿐이며,
+    생산자는 구독자나 내부 소비자가 있을 때만 동작합니다.
+    """
+
+    def __init__(self, name: str, engine: ReplayEngine, leader: FeedLeader,
+                 interval: float = FEED_INTERVAL_SECONDS,
+                 batch_size: int = FEED_BATCH_SIZE,
+                 queue_size: int = FEED_QUEUE_SIZE):
+        self.name = name
+        self.engine = engine
+        self.leader = leader
+        # 사용자 스트림 이름(check_stream_id)에는 ':' 를 쓸 수 없으므로 겹치지 않음
+        self.stream_id = f"feed:{name}"
+        self.interval = interval
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.subscribers = set()
+        # 구독자와 별개로 모든 행을 받아야 하는 내부 소비자(트렌드 엔진 등)
+        self.listeners = []
+        self.dropped_count = 0
+        # 이 워커가 마지막으로 내보낸 idx (None 이면 아직 공유 위치를 읽지 않음)
+        self._last_idx = None
+        self._task = None
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._produce(), name=f"feed-{self.name}")
+
+    def subscribe(self) -> Subscription:
+        sub = Subscription(self.queue_size)
+        self.subscribers.add(sub)
+        self._ensure_running()
+        return sub
+
+    def add_listener(self, listener):
+        """행마다 호출할 동기 함수를 등록하고 생산자를 시작합니다."""
+        self.listeners.append(listener)
+        self._ensure_running()
+
+    def unsubscribe(self, sub: Subscription):
+        self.subscribers.discard(sub)
+
+    def publish(self, row: dict):
+        for listener in self.listeners:
+            try:
+                listener(row)
+            except Exception:
+                logger.exception("feed %s: listener failed", self.name)
+        if not self.subscribers:
+            return
+        message = dumps(row).decode("utf-8")
+        for sub in list(self.subscribers):
+            try:
+                sub.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # 생산자를 막지 않도록 밀린 구독자는 끊어냄
+                self.subscribers.discard(sub)
+                self.dropped_count += 1
+                sub._drop()
+                logger.warning("feed %s: slow consumer dropped", self.name)
+
+    async def _advance(self, position: int) -> int:
+        """(잠금을 가진 워커만) 공유 위치를 한 행 전진. 끝까지 재생했으면 처음부터 다시 시작"""
+        rows = await self.engine.fetch_after(position, 1)
+        new = rows[0][0] if rows else 0
+        if await self.engine.store.compare_and_set(self.stream_id, position, new):
+            return new
+        return await self.engine.store.get(self.stream_id)
+
+    async def _step(self):
+        position = await self.engine.store.get(self.stream_id)
+        if self.leader.try_acquire():
+            position = await self._advance(position)
+        if self._last_idx is None or position < self._last_idx:
+            # 새로 시작했거나 처음부터 다시 재생: 현재 위치부터 따라감
+            self._last_idx = position
+            return
+        if position == self._last_idx:
+            return
+        # 뒤처진 워커는 한 번에 batch_size 행까지 따라잡음
+        rows = await self.engine.fetch_after(self._last_idx, self.batch_size)
+        for row in rows:
+            if row[0] > position or not (self.subscribers or self.listeners):
+                break
+            self._last_idx = row[0]
+            self.publish(dict(zip(self.engine.columns, row)))
+
+    async def _produce(self):
+        while self.subscribers or self.listeners:
+            try:
+                await self._step()
+            except Exception:
+                logger.exception("feed %s: step failed", self.name)
+            await asyncio.sleep(self.interval)
+
+    async def close(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        for sub in list(self.subscribers):
+            sub._drop()
+        self.subscribers.clear()
+        self.listeners.clear()
+
+    def stats(self):
+        return {
+            "subscribers": len(self.subscribers),
+            "listeners": len(self.listeners),
+            "dropped": self.dropped_count,
+            "last_idx": self._last_idx,
+            "leader": self.leader.held,
+            "running": self._task is not None and not self._task.done(),
+        }
+
+
+# 피드 위치는 리플레이와 같은 커서 저장소(REPLAY_CURSOR_BACKEND)에 두고 원본 테이블은 읽기만 합니다.
+feed_leader = FeedLeader()
+
+channels = {
+    "press": FeedChannel("press", ReplayEngine("press", "press_raw_data", PRESS_COLUMNS), feed_leader),
+    "welding": FeedChannel("welding", ReplayEngine("welding", "welding_raw_data", WELDING_COLUMNS), feed_leader),
+}
+
+
+def attach_trend_engine(engine):
+    """트렌드 엔진이 모든 실시간 행을 받도록 각 채널에 연결합니다."""
+    for name, channel in channels.items():
+        channel.add_listener(engine.listener(name))
+
+
+async def close_channels():
+    for channel in channels.values():
+        await channel.close()
+    feed_leader.release()
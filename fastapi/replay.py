@@ -0,0 +1,174 @@
+import asyncio
+import os
+import re
+from collections import OrderedDict, deque
+
+from database import acquire
+
+# ============================================
+# 원본 테이블 컬럼 정의
+# ============================================
+
+PRESS_COLUMNS = [
+    "idx", "machine_name", "item_no", "working_time",
+    "press_time_ms", "pressure_1", "pressure_2", "pressure_5",
+]
+
+WELDING_COLUMNS = [
+    "idx", "machine_name", "item_no", "working_time",
+    "thickness_1_mm", "thickness_2_mm", "welding_force_bar",
+    "welding_current_ka", "weld_voltage_v", "weld_time_ms",
+]
+
+REPLAY_BLOCK_SIZE = int(os.getenv("REPLAY_BLOCK_SIZE", "256"))
+REPLAY_CURSOR_BACKEND = os.getenv("REPLAY_CURSOR_BACKEND", "mysql")
+# 워커가 버퍼를 유지하는 최대 스트림 수. 넘으면 가장 오래 쓰이지 않은 스트림의 버퍼를 버림
+REPLAY_MAX_STREAMS = int(os.getenv("REPLAY_MAX_STREAMS", "256"))
+
+# 스트림 이름 (replay_cursor.stream_id 가 VARCHAR(64))
+STREAM_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+def check_stream_id(stream_id: str) -> str:
+    if not STREAM_ID_PATTERN.match(stream_id):
+        raise ValueError("stream 은 영문/숫자/._- 로 된 64자 이하의 이름이어야 합니다.")
+    return stream_id
+
+
+# ============================================
+# 커서 저장소
+# ============================================
+
+class MemoryCursorStore:
+    """프로세스 내부 커서 저장소 (단일 워커 개발용)"""
+
+    def __init__(self):
+        self._cursors = {}
+
+    async def ensure_table(self):
+        pass
+
+    async def get(self, stream_id: str) -> int:
+        return self._cursors.get(stream_id, 0)
+
+    async def compare_and_set(self, stream_id: str, expected: int, new: int) -> bool:
+        if self._cursors.get(stream_id, 0) != expected:
+            return False
+        self._cursors[stream_id] = new
+        return True
+
+
+class MySQLCursorStore:
+    """web 스키마의 replay_cursor 테이블에 커서를 저장해 워커 간에 공유합니다."""
+
+    def __init__(self, db: str = "web"):
+        self.db = db
+
+    async def ensure_table(self):
+        """앱 시작 시 한 번 호출"""
+        async with acquire(self.db) as conn, conn.cursor() as cursor:
+            await cursor.execute(
+                """CREATE TABLE IF NOT EXISTS replay_cursor (
+                    stream_id VARCHAR(64) NOT NULL PRIMARY KEY,
+                    last_idx BIGINT NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+                )"""
+            )
+
+    async def get(self, stream_id: str) -> int:
+        async with acquire(self.db) as conn, conn.cursor() as cursor:
+            await cursor.execute("INSERT IGNORE INTO replay_cursor (stream_id, last_idx) VALUES (%s, 0)", (stream_id,))
+            await cursor.execute("SELECT last_idx FROM replay_cursor WHERE stream_id = %s", (stream_id,))
+            (last_idx,) = await cursor.fetchone()
+            return last_idx
+
+    async def compare_and_set(self, stream_id: str, expected: int, new: int) -> bool:
+        async with acquire(self.db) as conn, conn.cursor() as cursor:
+            await cursor.execute(
+                "UPDATE replay_cursor SET last_idx = %s WHERE stream_id = %s AND last_idx = %s",
+                (new, stream_id, expected)
+            )
+            return cursor.rowcount == 1
+
+
+def make_cursor_store(backend: str = REPLAY_CURSOR_BACKEND):
+    if backend == "memory":
+        return MemoryCursorStore()
+    if backend == "mysql":
+        return MySQLCursorStore()
+    raise ValueError(f"Unknown replay cursor backend: {backend}")
+
+
+# ============================================
+# 리플레이 엔진
+# ============================================
+
+class ReplayEngine:
+    """idx 기준 키셋 페이지네이션으로 원본 데이터를 순서대로 재생합니다.
+
+    워커는 공유 커서를 compare-and-set 으로 한 블록씩 선점한 뒤 링 버퍼에서 응답하므로,
+    여러 워커가 떠 있어도 같은 행이 두 번 나가지 않고 커서가 함께 전진합니다.
+    워커 간 엄격한 순서가 필요하면 block_size 를 1로 설정합니다.
+    스트림별 버퍼는 max_streams 개까지만 두며, 밀려난 스트림의 남은 버퍼 행은 건너뜁니다.
+    """
+
+    def __init__(self, db: str, table: str, columns, store=None, block_size: int = REPLAY_BLOCK_SIZE,
+                 max_streams: int = REPLAY_MAX_STREAMS):
+        self.db = db
+        self.table = table
+        self.columns = list(columns)
+        self.store = store if store is not None else make_cursor_store()
+        self.block_size = block_size
+        self.max_streams = max_streams
+        # 스트림 -> (링 버퍼, 락). 최근에 쓴 순서
+        self._streams = OrderedDict()
+        self._query = (
+            f"SELECT {', '.join(self.columns)} FROM {table} "
+            f"WHERE idx > %s ORDER BY idx LIMIT %s"
+        )
+
+    def _stream(self, stream_id: str):
+        state = self._streams.get(stream_id)
+        if state is None:
+            state = self._streams[stream_id] = (deque(maxlen=self.block_size), asyncio.Lock())
+            self._evict()
+        self._streams.move_to_end(stream_id)
+        return state
+
+    def _evict(self):
+        # 사용 중(락을 잡은) 스트림은 남겨 둠
+        for stream_id in list(self._streams):
+            if len(self._streams) <= self.max_streams:
+                break
+            if not self._streams[stream_id][1].locked():
+                del self._streams[stream_id]
+
+    async def fetch_after(self, after_idx: int, limit: int):
+        """after_idx 이후의 행을 최대 limit 개 읽어옵니다."""
+        async with acquire(self.db) as conn, conn.cursor() as cursor:
+            await cursor.execute(self._query, (after_idx, limit))
+            return await cursor.fetchall()
+
+    async def _claim_block(self, stream_id: str, buf: deque) -> bool:
+        while True:
+            cursor = await self.store.get(stream_id)
+            rows = await self.fetch_after(cursor, self.block_size)
+            if not rows:
+                # 끝까지 재생했으면 처음부터 다시 시작
+                await self.store.compare_and_set(stream_id, cursor, 0)
+                return False
+            if await self.store.compare_and_set(stream_id, cursor, rows[-1][0]):
+                buf.extend(rows)
+                return True
+            # 다른 워커가 먼저 전진했으면 새 커서로 재시도
+
+    async def next(self, stream_id: str = "default"):
+        """스트림의 다음 행을 dict 로 반환합니다. 마지막 행 이후에는 None"""
+        buf, lock = self._stream(check_stream_id(stream_id))
+        async with lock:
+            if not buf and not await self._claim_block(stream_id, buf):
+                return None
+            return dict(zip(self.columns, buf.popleft()))
+
+
+welding_replay = ReplayEngine("welding", "welding_raw_data", WELDING_COLUMNS)
@@ -0,0 +1,380 @@
+import asyncio
+import logging
+import math
+import os
+from datetime import datetime, timedelta
+
+from database import acquire
+from quality_scores import PROCESSES, DEFECT_LABEL, score_table, ensure_score_table
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# 집계 설정
+# ============================================
+
+ROLLUP_ENABLED = os.getenv("ROLLUP_ENABLED", "1") == "1"
+ROLLUP_INTERVAL_SECONDS = float(os.getenv("ROLLUP_INTERVAL_SECONDS", "60"))
+# 한 트랜잭션에서 처리할 최대 idx 범위
+ROLLUP_BATCH_SIZE = int(os.getenv("ROLLUP_BATCH_SIZE", "50000"))
+# 실시간 예측 결과를 모아서 기록하는 주기(초)
+LIVE_SCORE_FLUSH_SECONDS = float(os.getenv("LIVE_SCORE_FLUSH_SECONDS", "5"))
+
+# 집계 단위 -> 버킷 시작 시각 식 (파라미터 바인딩을 쓰므로 % 는 %% 로 이스케이프)
+GRANULARITIES = {
+    "minute": "DATE_FORMAT(r.working_time, '%%Y-%%m-%%d %%H:%%i:00')",
+    "hour": "DATE_FORMAT(r.working_time, '%%Y-%%m-%%d %%H:00:00')",
+    "day": "DATE(r.working_time)",
+    "week": "DATE_SUB(DATE(r.working_time), INTERVAL WEEKDAY(r.working_time) DAY)",
+    "month": "DATE_FORMAT(r.working_time, '%%Y-%%m-01')",
+}
+
+
+def rollup_table(process: str) -> str:
+    return f"{process}_rollup"
+
+
+def parse_bucket(value) -> datetime:
+    """?bucket= 값 (예: 2024-05-01, 2024-05-01T13:00:00) -> datetime. 형식이 틀리면 ValueError"""
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        raise ValueError(f"bucket 형식이 올바르지 않습니다: {value!r} (예: 2024-05-01T13:00:00)") from None
+
+
+def bucket_start(granularity: str, working_time: datetime) -> datetime:
+    """working_time -> 버킷 시작 시각 (GRANULARITIES 의 SQL 식과 같은 값)"""
+    if granularity == "minute":
+        return working_time.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return working_time.replace(minute=0, second=0, microsecond=0)
+    day = datetime(working_time.year, working_time.month, working_time.day)
+    if granularity == "day":
+        return day
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    raise ValueError(f"Unknown period: {granularity}")
+
+
+def score_deltas(raw_rows, previous: dict, current: dict) -> list:
+    """예측 결과가 바뀐 행 -> 집계 행별 (예측 건수 증분, 불량 건수 증분, 집계 단위, 버킷, 설비, 품번)
+
+    raw_rows 는 (idx, 설비, 품번, working_time), previous/current 는 idx -> 이전/새 불량 여부 (처음 예측이면 previous 에 없음).
+    """
+    totals = {}
+    for idx, machine_name, item_no, working_time in raw_rows:
+        old = previous.get(idx)
+        scored = 1 if old is None else 0
+        defect = current[idx] - (old or 0)
+        if not scored and not defect:
+            continue
+        for granularity in GRANULARITIES:
+            key = (granularity, bucket_start(granularity, working_time), machine_name, item_no)
+            total_scored, total_defect = totals.get(key, (0, 0))
+            totals[key] = (total_scored + scored, total_defect + defect)
+    return [(scored, defect) + key for key, (scored, defect) in totals.items() if scored or defect]
+
+
+class RollupEngine:
+    """원본 데이터를 idx 워터마크 이후만 읽어 공정/설비/품번별 집계 테이블에 누적합니다.
+
+    건수, 합, 제곱합, 최소/최대는 모두 합칠 수 있는 값이므로 새로 들어온 구간만
+    ON DUPLICATE KEY UPDATE 로 더하면 되고, 평균/표준편차는 조회 시 계산합니다.
+    예측/불량 건수는 집계할 때 예측 테이블에서 세고, 이미 집계된 행을 나중에 (다시) 예측하면
+    record_scores 가 차이만큼 집계 행을 고치므로 조회는 집계 행만 읽습니다.
+    설비/품번이 NULL 인 행은 '' 로 묶고, working_time 이 NULL 인 행은 버킷을 정할 수 없어 제외합니다.
+    """
+
+    def __init__(self, interval: float = ROLLUP_INTERVAL_SECONDS, batch_size: int = ROLLUP_BATCH_SIZE):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task = None
+        self._ready = set()
+
+    async def _ensure_tables(self, process: str, cursor):
+        if process in self._ready:
+            return
+        signals = PROCESSES[process]["features"]
+        signal_columns = ",\n".join(
+            f"{s}_count BIGINT NOT NULL, {s}_sum DOUBLE NOT NULL, {s}_sumsq DOUBLE NOT NULL, "
+            f"{s}_min DOUBLE NULL, {s}_max DOUBLE NULL"
+            for s in signals
+        )
+        await cursor.execute(
+            f"""CREATE TABLE IF NOT EXISTS {rollup_table(process)} (
+                granularity VARCHAR(8) NOT NULL,
+                bucket_start DATETIME NOT NULL,
+                machine_name VARCHAR(64) NOT NULL,
+                item_no VARCHAR(64) NOT NULL,
+                row_count BIGINT NOT NULL,
+                scored_count BIGINT NOT NULL DEFAULT 0,
+                defect_count BIGINT NOT NULL DEFAULT 0,
+                {signal_columns},
+                PRIMARY KEY (granularity, bucket_start, machine_name, item_no)
+            )"""
+        )
+        await cursor.execute(
+            """CREATE TABLE IF NOT EXISTS rollup_watermark (
+                name VARCHAR(64) NOT NULL PRIMARY KEY,
+                last_idx BIGINT NOT NULL DEFAULT 0
+            )"""
+        )
+        self._ready.add(process)
+
+    async def ensure_tables(self):
+        """예측/집계 테이블 생성 (시작 시 한 번)"""
+        for process in PROCESSES:
+            await ensure_score_table(process)
+            async with acquire(PROCESSES[process]["db"]) as conn, conn.cursor() as cursor:
+                await self._ensure_tables(process, cursor)
+
+    def _merge_sql(self, process: str, granularity: str) -> str:
+        spec = PROCESSES[process]
+        signals = spec["features"]
+        # 신호별 평균은 NULL 이 아닌 값의 개수로 나눠야 하므로 COUNT(*) 가 아닌 COUNT(신호)
+        aggregates = ", ".join(
+            f"COUNT(r.{s}), COALESCE(SUM(r.{s}), 0), COALESCE(SUM(r.{s} * r.{s}), 0), MIN(r.{s}), MAX(r.{s})"
+            for s in signals
+        )
+        columns = ", ".join(f"{s}_count, {s}_sum, {s}_sumsq, {s}_min, {s}_max" for s in signals)
+        updates = ", ".join(
+            f"{s}_count = {s}_count + VALUES({s}_count), "
+            f"{s}_sum = {s}_sum + VALUES({s}_sum), {s}_sumsq = {s}_sumsq + VALUES({s}_sumsq), "
+            f"{s}_min = LEAST(COALESCE({s}_min, VALUES({s}_min)), COALESCE(VALUES({s}_min), {s}_min)), "
+            f"{s}_max = GREATEST(COALESCE({s}_max, VALUES({s}_max)), COALESCE(VALUES({s}_max), {s}_max))"
+            for s in signals
+        )
+        bucket = GRANULARITIES[granularity]
+        keys = "COALESCE(r.machine_name, ''), COALESCE(r.item_no, '')"
+        return (
+            f"INSERT INTO {rollup_table(process)} "
+            f"(granularity, bucket_start, machine_name, item_no, row_count, scored_count, defect_count, {columns}) "
+            f"SELECT '{granularity}', {bucket}, {keys}, COUNT(*), COUNT(q.idx), COALESCE(SUM(q.is_defect), 0), "
+            f"{aggregates} "
+            f"FROM {spec['table']} r LEFT JOIN {score_table(process)} q ON q.idx = r.idx "
+            f"WHERE r.idx > %s AND r.idx <= %s AND r.working_time IS NOT NULL "
+            f"GROUP BY {bucket}, {keys} "
+            f"ON DUPLICATE KEY UPDATE row_count = row_count + VALUES(row_count), "
+            f"scored_count = scored_count + VALUES(scored_count), "
+            f"defect_count = defect_count + VALUES(defect_count), {updates}"
+        )
+
+    async def record_scores(self, process: str, model_use_id: str, idx: list, predictions: list):
+        """예측 결과를 저장하고, 이미 집계된 행이면 그 버킷의 예측/불량 건수를 같은 트랜잭션에서 고칩니다.
+
+        같은 idx 를 다시 예측하면 이전 결과와의 차이만 더합니다. 워터마크 행을 공유 잠금으로 읽어
+        집계 배치(FOR UPDATE)와 겹치지 않게 하므로, 각 예측은 집계 시점이나 여기 중 한 번만 세어집니다.
+        """
+        if not idx:
+            return
+        spec = PROCESSES[process]
+        table = score_table(process)
+        current = {i: int(p == DEFECT_LABEL) for i, p in zip(idx, predictions)}
+        values = [(i, model_use_id, p, current[i]) for i, p in zip(idx, predictions)]
+        placeholders = ", ".join(["%s"] * len(idx))
+        async with acquire(spec["db"]) as conn, conn.cursor() as cursor:
+            await self._ensure_tables(process, cursor)
+            await conn.begin()
+            await cursor.execute(
+                "SELECT last_idx FROM rollup_watermark WHERE name = %s LOCK IN SHARE MODE", (process,)
+            )
+            row = await cursor.fetchone()
+            watermark = row[0] if row else 0
+            await cursor.execute(
+                f"SELECT idx, is_defect FROM {table} WHERE idx IN ({placeholders}) FOR UPDATE", list(idx)
+            )
+            previous = dict(await cursor.fetchall())
+            # executemany 는 INSERT ... VALUES 를 다건 INSERT 문으로 묶어서 전송합니다.
+            await cursor.executemany(
+                f"INSERT INTO {table} (idx, model_use_id, prediction, is_defect) "
+                f"VALUES (%s, %s, %s, %s) "
+                f"ON DUPLICATE KEY UPDATE model_use_id = VALUES(model_use_id), "
+                f"prediction = VALUES(prediction), is_defect = VALUES(is_defect)",
+                values,
+            )
+            # 워터마크 이후의 행은 다음 집계 때 예측 테이블에서 세어짐
+            rolled = [i for i in idx if i <= watermark]
+            if rolled:
+                await cursor.execute(
+                    f"SELECT idx, COALESCE(machine_name, ''), COALESCE(item_no, ''), working_time "
+                    f"FROM {spec['table']} WHERE idx IN ({', '.join(['%s'] * len(rolled))}) "
+                    f"AND working_time IS NOT NULL",
+                    rolled,
+                )
+                deltas = score_deltas(await cursor.fetchall(), previous, current)
+                if deltas:
+                    await cursor.executemany(
+                        f"UPDATE {rollup_table(process)} "
+                        f"SET scored_count = scored_count + %s, defect_count = defect_count + %s "
+                        f"WHERE granularity = %s AND bucket_start = %s AND machine_name = %s AND item_no = %s",
+                        deltas,
+                    )
+            await conn.commit()
+
+    async def refresh(self, process: str) -> int:
+        """워터마크 이후 한 배치를 집계합니다. 전진한 idx 폭을 반환 (0이면 최신 상태)"""
+        spec = PROCESSES[process]
+        async with acquire(spec["db"]) as conn, conn.cursor() as cursor:
+            await self._ensure_tables(process, cursor)
+            await conn.begin()
+            await cursor.execute("INSERT IGNORE INTO rollup_watermark (name, last_idx) VALUES (%s, 0)", (process,))
+            # 워커가 여러 개여도 같은 구간을 두 번 더하지 않도록 워터마크 행을 잠금
+            await cursor.execute("SELECT last_idx FROM rollup_watermark WHERE name = %s FOR UPDATE", (process,))
+            (watermark,) = await cursor.fetchone()
+            await cursor.execute(f"SELECT MAX(idx) FROM {spec['table']} WHERE idx > %s", (watermark,))
+            (latest,) = await cursor.fetchone()
+            if latest is None:
+                await conn.commit()
+                return 0
+            upper = min(latest, watermark + self.batch_size)
+            for granularity in GRANULARITIES:
+                await cursor.execute(self._merge_sql(process, granularity), (watermark, upper))
+            await cursor.execute("UPDATE rollup_watermark SET last_idx = %s WHERE name = %s", (upper, process))
+            await conn.commit()
+            return upper - watermark
+
+    async def refresh_all(self):
+        for process in PROCESSES:
+            while await self.refresh(process):
+                pass
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.refresh_all()
+            except Exception:
+                logger.exception("rollup refresh failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="rollup")
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def query(self, process: str, granularity: str, bucket_start=None):
+        """집계 버킷(기본: 가장 최근 버킷)의 설비/품번별 통계"""
+        if process not in PROCESSES:
+            raise ValueError(f"Unknown process: {process}")
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown period: {granularity}")
+        if bucket_start is not None:
+            bucket_start = parse_bucket(bucket_start)
+        signals = PROCESSES[process]["features"]
+        table = rollup_table(process)
+        async with acquire(PROCESSES[process]["db"]) as conn, conn.cursor() as cursor:
+            await self._ensure_tables(process, cursor)
+            if bucket_start is None:
+                await cursor.execute(
+                    f"SELECT MAX(bucket_start) FROM {table} WHERE granularity = %s", (granularity,)
+                )
+                (bucket_start,) = await cursor.fetchone()
+                if bucket_start is None:
+                    return {"period": granularity, "bucket_start": None, "rows": []}
+            columns = ", ".join(f"{s}_count, {s}_sum, {s}_sumsq, {s}_min, {s}_max" for s in signals)
+            await cursor.execute(
+                f"SELECT machine_name, item_no, row_count, scored_count, defect_count, {columns} "
+                f"FROM {table} WHERE granularity = %s AND bucket_start = %s "
+                f"ORDER BY machine_name, item_no",
+                (granularity, bucket_start),
+            )
+            result = await cursor.fetchall()
+
+        rows = []
+        for row in result:
+            machine_name, item_no, count, scored, defect_count = row[:5]
+            stats = {}
+            for i, signal in enumerate(signals):
+                n, total, total_sq, low, high = row[5 + i * 5: 10 + i * 5]
+                mean = total / n if n else None
+                variance = max(total_sq / n - mean * mean, 0.0) if n else None
+                stats[signal] = {
+                    "mean": mean,
+                    "min": low,
+                    "max": high,
+                    "stddev": math.sqrt(variance) if variance is not None else None,
+                }
+            rows.append({
+                "machine_name": machine_name,
+                "item_no": item_no,
+                "count": count,
+                "scored_count": scored,
+                "defect_rate": defect_count / scored if scored else None,
+                "signals": stats,
+            })
+        return {"period": granularity, "bucket_start": bucket_start, "rows": rows}
+
+
+rollup_engine = RollupEngine()
+
+
+# ============================================
+# 실시간 예측 결과 일괄 기록
+# ============================================
+
+class LiveScoreWriter:
+    """실시간 예측 결과를 요청마다 기록하지 않고 모아 두었다가 record_scores 로 한 번에 기록합니다."""
+
+    def __init__(self, engine: RollupEngine, flush_seconds: float = LIVE_SCORE_FLUSH_SECONDS):
+        self.engine = engine
+        self.flush_seconds = flush_seconds
+        # (공정, 모델) -> idx -> 예측값
+        self._pending = {}
+        self._task = None
+
+    def record(self, process: str, model_use_id: str, idx: int, prediction: float):
+        # 같은 idx 를 여러 번 예측하면 마지막 결과만 남김
+        self._pending.setdefault((process, model_use_id), {})[idx] = prediction
+
+    async def flush(self):
+        pending, self._pending = self._pending, {}
+        failed = None
+        for (process, model_use_id), scores in pending.items():
+            try:
+                await self.engine.record_scores(process, model_use_id, list(scores), list(scores.values()))
+            except Exception as e:
+                # 실패한 항목은 다음 주기에 다시 시도 (그 사이 새 예측이 있으면 그 값을 유지)
+                for idx, prediction in scores.items():
+                    self._pending.setdefault((process, model_use_id), {}).setdefault(idx, prediction)
+                failed = e
+        if failed is not None:
+            raise failed
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning("live score flush failed: %s", e)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="live-score-writer")
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.warning("live score final flush failed: %s", e)
+
+
+live_score_writer = LiveScoreWriter(rollup_engine)
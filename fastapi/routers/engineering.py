@@ -1,16 +1,33 @@
-from fastapi import APIRouter, HTTPException
-from database import get_db_press_connection, get_db_welding_connection
-import aiohttp
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from database import acquire
+from replay import welding_replay, check_stream_id, PRESS_COLUMNS, WELDING_COLUMNS
+from realtime_feed import channels
+from inference_client import inference_client, InferenceError
+from model_runtime import model_runtime, ModelUnavailable, MODEL_RUNTIME
+from bulk_scoring import bulk_scorer, BULK_SCORING_CHUNK_SIZE
+from rollup import live_score_writer
+from trend import trend_engine, TREND_SIGNALS, TREND_DEFAULT_WIDTH
+from fast_json import FastJSONResponse, RowCodec
+from sensor_store import sensor_store
+from sensor_export import ExportUnavailable
+from dashboard import gather_sections
+from datetime import datetime
+from pydantic import BaseModel
+from typing import Optional
 import logging
 
 router = APIRouter()
-current_index = 0
 
-# 외부 API URL 설정
-NGROK_MODEL_API = "https://4c6d-34-45-140-254.ngrok-free.app/engineering/realtime-welding/predict"
+logger = logging.getLogger(__name__)
 
-# 로깅 설정
-logging.basicConfig(level=logging.INFO)
+PRESS_CODEC = RowCodec(PRESS_COLUMNS)
+WELDING_CODEC = RowCodec(WELDING_COLUMNS)
+OUTPUT_FORMATS = RowCodec.FORMATS
+
+def _check_format(output_format: str):
+    if output_format not in OUTPUT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format 은 {list(OUTPUT_FORMATS)} 중 하나여야 합니다.")
 
 # -------------------------------
 # 홈 엔드포인트
@@ -33,26 +50,14 @@ async def engineering_welding_home():
 # -------------------------------
 
 @router.get("/realtime-press/insert")
-async def get_realtime_press_insert():
-    """실시간 프레스 데이터 한 항목 가져오기"""
+async def get_realtime_press_insert(format: str = "objects"):
+    """실시간 프레스 데이터 한 항목 가져오기 (format=columnar 이면 컬럼/행 배열)"""
+    _check_format(format)
     try:
-        conn = await get_db_press_connection()
-        async with conn.cursor() as cursor:
-            await cursor.execute("SELECT * FROM press_raw_data LIMIT 1")
+        async with acquire("press") as conn, conn.cursor() as cursor:
+            await cursor.execute(f"SELECT {', '.join(PRESS_COLUMNS)} FROM press_raw_data LIMIT 1")
             result = await cursor.fetchall()
-            press_raw_data = [
-                {
-                    "idx": row[0],
-                    "machine_name": row[1],
-                    "item_no": row[2],
-                    "working_time": row[3],
-                    "press_time_ms": row[4],
-                    "pressure_1": row[5],
-                    "pressure_2": row[6],
-                    "pressure_5": row[7],
-                } for row in result
-            ] if result else []
-            return {"press_raw_data": press_raw_data}
+        return FastJSONResponse(PRESS_CODEC.encode(result, format, key="press_raw_data"))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -61,54 +66,89 @@ async def realtime_press_select():
     """특정 실시간 프레스 데이터 선택"""
     return {"message": "실시간 프레스 데이터 선택"}
 
+TREND_STAT_COLUMNS = ["count", "mean", "stddev", "ewma", "p50", "p95", "p99", "lcl", "ucl", "breach_count"]
+
+def _trend_columnar(result):
+    """신호별 통계를 한 표로, 시계열은 신호별 x/y 배열로 묶습니다."""
+    signals = result["signals"]
+    return {
+        "machine_name": result["machine_name"],
+        "columns": ["signal"] + TREND_STAT_COLUMNS,
+        "rows": [[name] + [summary[c] for c in TREND_STAT_COLUMNS] for name, summary in signals.items()],
+        "series": {name: summary["series"] for name, summary in signals.items()},
+        "recent_breaches": {name: summary["recent_breaches"] for name, summary in signals.items()},
+    }
+
+def _trend_response(process: str, machine: Optional[str], signals: Optional[str], width: int,
+                    output_format: str = "objects"):
+    _check_format(output_format)
+    if machine is None:
+        return {"machines": trend_engine.machines(process), "signals": TREND_SIGNALS[process]}
+    try:
+        result = trend_engine.query(
+            process, machine, signals.split(",") if signals else None, max(3, width)
+        )
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No trend data for machine: {machine}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if output_format == "columnar":
+        result = _trend_columnar(result)
+    return FastJSONResponse(result)
+
 @router.get("/realtime-press/trend")
-async def realtime_press_trend():
-    """프레스 트렌드 데이터 가져오기"""
-    return {"message": "프레스 트렌드 데이터"}
+async def realtime_press_trend(machine: Optional[str] = None, signals: Optional[str] = None,
+                               width: int = TREND_DEFAULT_WIDTH, format: str = "objects"):
+    """프레스 트렌드 데이터 가져오기 (이동 통계 + 차트 폭에 맞춘 다운샘플 시계열)"""
+    return _trend_response("press", machine, signals, width, format)
 
 # -------------------------------
 # 실시간 웰딩 데이터 엔드포인트
 # -------------------------------
 
 @router.get("/realtime-welding/insert")
-async def get_realtime_welding_insert():
-    """실시간 웰딩 데이터 한 항목 가져오기 및 인덱스 자동 증가"""
-    global current_index
+async def get_realtime_welding_insert(stream: str = "default", format: str = "objects"):
+    """실시간 웰딩 데이터 한 항목 가져오기 (스트림별 커서 자동 증가, format=columnar 이면 컬럼/행 배열)"""
+    _check_format(format)
     try:
-        conn = await get_db_welding_connection()
-        async with conn.cursor() as cursor:
-            query = f"SELECT * FROM welding_raw_data LIMIT 1 OFFSET {current_index}"
-            await cursor.execute(query)
-            result = await cursor.fetchall()
-            if result:
-                current_index += 1
-                welding_raw_data = [
-                    {
-                        "idx": row[0],
-                        "machine_name": row[1],
-                        "item_no": row[2],
-                        "working_time": row[3],
-                        "thickness_1_mm": row[4],
-                        "thickness_2_mm": row[5],
-                        "welding_force_bar": row[6],
-                        "welding_current_ka": row[7],
-                        "weld_voltage_v": row[8],
-                        "weld_time_ms": row[9]
-                    } for row in result
-                ]
-                return {"welding_raw_data": welding_raw_data}
-            else:
-                current_index = 0
-                return {"message": "더 이상 데이터가 없으므로 인덱스를 초기화합니다."}
+        check_stream_id(stream)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        row = await welding_replay.next(stream)
+        if row is None:
+            return {"message": "더 이상 데이터가 없으므로 인덱스를 초기화합니다."}
+        if format == "columnar":
+            return WELDING_CODEC.to_columnar([[row[c] for c in WELDING_COLUMNS]])
+        return {"welding_raw_data": [row]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# 외부 모델 API 로 예측한 결과를 기록할 때의 모델 식별자
+MODEL_API_SCORE_ID = "model-api"
+
+async def predict_welding_quality(sample_data):
+    """배포된 웰딩 모델이 있으면 프로세스 내부에서 예측하고, 그렇지 않거나 실패하면 외부 모델 API로 보냅니다.
+
+    (예측값, 예측한 모델 식별자) 를 반환합니다.
+    """
+    if MODEL_RUNTIME == "local":
+        try:
+            loaded = await model_runtime.active()
+            if loaded.process_name != "welding":
+                raise ModelUnavailable(f"활성 모델이 웰딩 모델이 아닙니다: {loaded.model_use_id}")
+            return (await model_runtime.predict([sample_data]))[0].item(), loaded.model_use_id
+        except ModelUnavailable as e:
+            logger.info("로컬 모델 사용 불가, 모델 API로 전송: %s", e)
+        except Exception:
+            logger.exception("로컬 모델 예측 실패, 모델 API로 전송")
+    return await inference_client.predict(sample_data), MODEL_API_SCORE_ID
+
 @router.get("/realtime-welding/select")
-async def select_and_predict_welding_quality():
+async def select_and_predict_welding_quality(stream: str = "default"):
     """실시간 웰딩 데이터 가져오기 및 품질 예측"""
     try:
-        logging.info("Insert 엔드포인트에서 웰딩 데이터 가져오는 중")
-        welding_data = await get_realtime_welding_insert()
+        welding_data = await get_realtime_welding_insert(stream)
         raw_data = welding_data["welding_raw_data"][0]  # 첫 번째 데이터 가져오기
 
         sample_data = [
@@ -118,24 +158,183 @@ async def select_and_predict_welding_quality():
             float(raw_data["weld_time_ms"])
         ]
 
-        payload = {"data": sample_data}
-        logging.info(f"데이터를 ngrok API로 전송: {payload}")
-
-        async with aiohttp.ClientSession() as session:
-            async with session.post(NGROK_MODEL_API, json=payload) as response:
-                if response.status == 200:
-                    prediction_result = await response.json()
-                    logging.info(f"예측 결과 받음: {prediction_result}")
-                    return {"prediction": prediction_result.get("prediction")}
-                else:
-                    error_message = f"ngrok API 예측 실패, 상태: {response.status}"
-                    logging.error(error_message)
-                    raise HTTPException(status_code=response.status, detail=error_message)
+        try:
+            prediction, model_use_id = await predict_welding_quality(sample_data)
+        except InferenceError as e:
+            logger.warning("welding prediction failed: %s", e)
+            raise HTTPException(status_code=e.status, detail=str(e))
+        logger.debug("welding prediction: %s", prediction)
+        # 예측 결과는 모아서 기록되고 집계의 예측/불량 건수에 반영됨
+        if isinstance(prediction, (int, float)):
+            live_score_writer.record("welding", model_use_id, int(raw_data["idx"]), float(prediction))
+        return {"prediction": prediction}
+    except HTTPException:
+        raise
     except Exception as e:
-        logging.error(f"오류 발생: {e}")
+        logger.exception("welding select failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/realtime-welding/trend")
-async def realtime_welding_trend():
-    """웰딩 트렌드 데이터 가져오기"""
-    return {"message": "웰딩 트렌드 데이터"}
+async def realtime_welding_trend(machine: Optional[str] = None, signals: Optional[str] = None,
+                                 width: int = TREND_DEFAULT_WIDTH, format: str = "objects"):
+    """웰딩 트렌드 데이터 가져오기 (이동 통계 + 차트 폭에 맞춘 다운샘플 시계열)"""
+    return _trend_response("welding", machine, signals, width, format)
+
+# -------------------------------
+# 대량 품질 예측 작업 엔드포인트
+# -------------------------------
+
+class BulkScoreRequest(BaseModel):
+    process: str = "welding"
+    start_idx: Optional[int] = None
+    end_idx: Optional[int] = None
+    start_time: Optional[str] = None
+    end_time: Optional[str] = None
+    chunk_size: int = BULK_SCORING_CHUNK_SIZE
+
+@router.post("/bulk-score")
+async def create_bulk_score_job(request: BulkScoreRequest):
+    """idx 또는 시간 범위의 과거 데이터를 일괄 예측하는 작업 생성"""
+    try:
+        job = await bulk_scorer.submit(
+            request.process,
+            start_idx=request.start_idx,
+            end_idx=request.end_idx,
+            start_time=request.start_time,
+            end_time=request.end_time,
+            chunk_size=request.chunk_size,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return job.progress()
+
+@router.get("/bulk-score")
+async def list_bulk_score_jobs():
+    """대량 예측 작업 목록"""
+    return {"jobs": [job.progress() for job in await bulk_scorer.list()]}
+
+@router.get("/bulk-score/{job_id}")
+async def get_bulk_score_job(job_id: str):
+    """대량 예측 작업 진행률 및 처리량(rows/s)"""
+    job = await bulk_scorer.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.progress()
+
+@router.delete("/bulk-score/{job_id}")
+async def cancel_bulk_score_job(job_id: str):
+    """대량 예측 작업 취소"""
+    if not await bulk_scorer.cancel(job_id):
+        raise HTTPException(status_code=404, detail="Running job not found")
+    return {"message": "작업 취소를 요청했습니다.", "job_id": job_id}
+
+# -------------------------------
+# 실시간 푸시 엔드포인트 (WebSocket / SSE)
+# -------------------------------
+
+def _get_channel(process: str):
+    channel = channels.get(process)
+    if channel is None:
+        raise HTTPException(status_code=404, detail=f"Unknown process: {process}")
+    return channel
+
+@router.websocket("/realtime-{process}/ws")
+async def realtime_feed_ws(websocket: WebSocket, process: str):
+    """실시간 프레스/웰딩 데이터를 WebSocket 으로 전달"""
+    channel = channels.get(process)
+    if channel is None:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    sub = channel.subscribe()
+    try:
+        while True:
+            message = await sub.get()
+            if message is None:
+                # 느린 구독자로 분류되어 끊김
+                await websocket.close(code=1013)
+                return
+            await websocket.send_text(message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        channel.unsubscribe(sub)
+
+@router.get("/realtime-{process}/stream")
+async def realtime_feed_sse(process: str):
+    """실시간 프레스/웰딩 데이터를 Server-Sent Events 로 전달"""
+    channel = _get_channel(process)
+
+    async def event_stream():
+        # 응답을 보내기 전에 연결이 끊기면 제너레이터가 시작되지 않으므로 구독도 여기서 시작
+        sub = channel.subscribe()
+        try:
+            while True:
+                message = await sub.get()
+                if message is None:
+                    yield "event: dropped\ndata: {}\n\n"
+                    return
+                yield f"data: {message}\n\n"
+        finally:
+            channel.unsubscribe(sub)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/realtime-feed/stats")
+async def realtime_feed_stats():
+    """푸시 채널별 구독자 및 드롭 현황"""
+    return {name: channel.stats() for name, channel in channels.items()}
+
+# -------------------------------
+# 이력 조회 (로컬 컬럼형 저장소)
+# -------------------------------
+
+def _split(value: Optional[str]):
+    return [v.strip() for v in value.split(",") if v.strip()] if value else None
+
+@router.get("/history")
+async def history_stats():
+    """로컬 센서 저장소 동기화 현황"""
+    return sensor_store.stats()
+
+@router.get("/history/{process}")
+async def sensor_history(process: str, granularity: str = "hour", start: Optional[datetime] = None,
+                         end: Optional[datetime] = None, machine: Optional[str] = None,
+                         signals: Optional[str] = None):
+    """기간별 설비 신호 통계 (운영 DB 대신 로컬 Parquet 파티션을 조회)"""
+    try:
+        return FastJSONResponse(
+            await sensor_store.history(process, granularity, start, end, _split(machine), _split(signals))
+        )
+    except ExportUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# -------------------------------
+# 엔지니어링 대시보드 (한 화면을 한 번의 요청으로)
+# -------------------------------
+
+async def _latest_row(db: str, table: str, codec: RowCodec):
+    async with acquire(db) as conn, conn.cursor() as cursor:
+        await cursor.execute(f"SELECT {', '.join(codec.columns)} FROM {table} ORDER BY idx DESC LIMIT 1")
+        rows = await cursor.fetchall()
+    return codec.to_dicts(rows)[0] if rows else None
+
+@router.get("/overview")
+async def engineering_overview():
+    """프레스/웰딩 최신 데이터(각 스키마 동시 조회), 트렌드 설비 목록, 푸시 채널 현황을 한 번에 반환"""
+    overview = await gather_sections({
+        "press_latest": _latest_row("press", "press_raw_data", PRESS_CODEC),
+        "welding_latest": _latest_row("welding", "welding_raw_data", WELDING_CODEC),
+    })
+    overview["trend"] = {
+        process: {"machines": trend_engine.machines(process), "signals": signals}
+        for process, signals in TREND_SIGNALS.items()
+    }
+    overview["feed"] = {name: channel.stats() for name, channel in channels.items()}
+    return FastJSONResponse(overview)
@@ -0,0 +1,52 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from sensor_export import ExportQuery, ExportUnavailable, EXPORT_FORMATS, stream_export, require_pyarrow
+from datetime import datetime
+from typing import Optional
+
+router = APIRouter()
+
+def _split(value: Optional[str]):
+    return [v.strip() for v in value.split(",") if v.strip()] if value else None
+
+# -------------------------------
+# 센서 원본 데이터 내보내기 (Arrow IPC / Parquet)
+# -------------------------------
+
+@router.get("/{process}")
+async def export_raw_data(
+    process: str,
+    format: str = "arrow",
+    columns: Optional[str] = None,
+    machine_name: Optional[str] = None,
+    item_no: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    start_idx: Optional[int] = None,
+    end_idx: Optional[int] = None,
+):
+    """press/welding 원본 데이터를 배치 단위로 스트리밍합니다.
+
+    - columns: 내보낼 컬럼 (쉼표 구분, 기본 전체)
+    - machine_name, item_no: 쉼표로 여러 값 지정
+    - start/end: working_time 범위 [start, end), start_idx/end_idx: idx 범위
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format 은 {list(EXPORT_FORMATS)} 중 하나여야 합니다.")
+    try:
+        require_pyarrow()
+        query = ExportQuery(
+            process, _split(columns), _split(machine_name), _split(item_no),
+            start, end, start_idx, end_idx,
+        )
+    except ExportUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    media_type, extension = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        stream_export(query, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{process}_raw_data.{extension}"'},
+    )
@@ -1,12 +1,14 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+
+from auth import get_current_user, revocation_list
 
 router = APIRouter()
 
-# @router.post("/")
-# async def logout():
-#     """
-#     로그아웃 엔드포인트:
-#     - 클라이언트의 세션을 종료하거나 쿠키를 삭제합니다.
-#     """
-#     response = {"message": "로그아웃되었습니다."}
-#     return response
+@router.post("/")
+async def logout(user: dict = Depends(get_current_user)):
+    """
+    로그아웃 엔드포인트:
+    - 현재 토큰을 폐기 목록에 올려 만료 전이라도 더 이상 사용할 수 없게 합니다.
+    """
+    await revocation_list.revoke(user["jti"], user["exp"])
+    return {"message": "로그아웃되었습니다."}
@@ -1,10 +1,14 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
+from database import acquire
+from rollup import rollup_engine, GRANULARITIES
+from sensor_store import sensor_store
+from sensor_export import ExportUnavailable
+from fast_json import FastJSONResponse
 from datetime import datetime
-import requests
-from bs4 import BeautifulSoup
-from database import get_db_connection
+from stock_quotes import stock_quote_service
+from dashboard import gather_sections, fetch_sales
 
 router = APIRouter()
 
@@ -25,56 +29,46 @@ async def management_month_sales():
     return {"message": "Monthly sales data"}
 
 @router.get("/press/{period}")
-async def management_press(period: str):
-    return {"message": f"Press data for {period}"}
+async def management_press(period: str, bucket: Optional[str] = None):
+    """프레스 공정 집계 (minute/hour/day/week/month, 기본은 가장 최근 버킷)"""
+    try:
+        return await rollup_engine.query("press", period, bucket)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/welding/{period}")
-async def management_welding(period: str):
-    return {"message": f"Welding data for {period}"}
+async def management_welding(period: str, bucket: Optional[str] = None):
+    """웰딩 공정 집계 (minute/hour/day/week/month, 기본은 가장 최근 버킷)"""
+    try:
+        return await rollup_engine.query("welding", period, bucket)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/history/{process}")
+async def management_history(process: str, granularity: str = "day", start: Optional[datetime] = None,
+                             end: Optional[datetime] = None, machine: Optional[str] = None):
+    """기간별 설비/품번 생산량 및 신호 통계 (로컬 Parquet 파티션에서 집계)"""
+    machines = [m.strip() for m in machine.split(",") if m.strip()] if machine else None
+    try:
+        return FastJSONResponse(
+            await sensor_store.history(process, granularity, start, end, machines, by=("machine_name", "item_no"))
+        )
+    except ExportUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 # ============================================
 # 주가 데이터 관련 함수
 # ============================================
 
-stock_data_map = {
-    "005380": [],  # 현대차 주가 데이터
-    "000270": []   # 기아차 주가 데이터
-}
-
-def get_naver_stock_price(symbol: str):
-    """네이버 금융에서 주가 데이터를 가져옵니다."""
-    try:
-        url = f"https://finance.naver.com/item/main.nhn?code={symbol}"
-        response = requests.get(url)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        price_element = soup.select_one('.no_today .blind')
-        if not price_element:
-            raise ValueError("주가 정보를 찾을 수 없습니다.")
-        return price_element.text
-    except Exception as e:
-        print(f"Error fetching stock price: {e}")
-        return None
-
 @router.get("/stock-history/{symbol}")
 async def fetch_stock_history(symbol: str):
-    """주가 히스토리를 반환합니다."""
-    global stock_data_map
-    price = get_naver_stock_price(symbol)
-    if price:
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        current_price = float(price.replace(",", ""))
-
-        # 이전 데이터와 동일할 경우 추가하지 않음
-        if stock_data_map[symbol] and stock_data_map[symbol][-1]["price"] == current_price:
-            return stock_data_map[symbol][-10:]  # 마지막 10개 데이터만 반환
-
-        stock_data_map[symbol].append({"time": timestamp, "price": current_price})
-
-        if len(stock_data_map[symbol]) > 100:
-            stock_data_map[symbol] = stock_data_map[symbol][-100:]
-
-    return stock_data_map[symbol][-10:]
+    """주가 히스토리를 반환합니다. (백그라운드 수집 캐시에서만 조회)"""
+    try:
+        return stock_quote_service.history(symbol)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"수집 대상이 아닌 종목입니다: {symbol}")
 
 # ============================================
 # HD_sales 및 KIA_sales 데이터 엔드포인트
@@ -88,12 +82,10 @@ class SalesData(BaseModel):
 async def get_hd_sales():
     """HD_sales 데이터를 반환합니다."""
     try:
-        conn = await get_db_connection()
-        async with conn.cursor() as cursor:
+        async with acquire("web") as conn, conn.cursor() as cursor:
             await cursor.execute("SELECT year, count FROM HD_sales ORDER BY year ASC")
             result = await cursor.fetchall()
             hd_sales = [{"year": row[0], "count": row[1]} for row in result]
-        conn.close()
         return hd_sales
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -102,12 +94,32 @@ async def get_hd_sales():
 async def get_kia_sales():
     """KIA_sales 데이터를 반환합니다."""
     try:
-        conn = await get_db_connection()
-        async with conn.cursor() as cursor:
+        async with acquire("web") as conn, conn.cursor() as cursor:
             await cursor.execute("SELECT year, count FROM KIA_sales ORDER BY year ASC")
             result = await cursor.fetchall()
             kia_sales = [{"year": row[0], "count": row[1]} for row in result]
-        conn.close()
         return kia_sales
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+# ============================================
+# 경영 대시보드 (한 화면을 한 번의 요청으로)
+# ============================================
+
+@router.get("/overview")
+async def management_overview(period: str = "day", stock_limit: int = 10):
+    """판매량(HD/KIA UNION 한 문장), 프레스/웰딩 최근 집계, 주가 히스토리를 한 번에 반환합니다.
+
+    DB 조회는 동시에 실행하므로 지연 시간은 가장 느린 조회와 비슷합니다. 실패한 섹션은 errors 에 표시됩니다.
+    """
+    if period not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"period 는 {list(GRANULARITIES)} 중 하나여야 합니다.")
+    overview = await gather_sections({
+        "sales": fetch_sales(),
+        "press": rollup_engine.query("press", period),
+        "welding": rollup_engine.query("welding", period),
+    })
+    overview["stock"] = {
+        symbol: stock_quote_service.history(symbol, stock_limit) for symbol in stock_quote_service.symbols
+    }
+    return FastJSONResponse(overview)
@@ -1,5 +1,14 @@
-from fastapi import APIRouter, HTTPException, UploadFile, Form, File
-from database import get_db_connection
+from fastapi import APIRouter, HTTPException, UploadFile, Form, File, Request, Header, Depends
+from fastapi.responses import Response, StreamingResponse
+from database import acquire
+from auth import get_current_user
+from query_cache import cached_json, query_cache
+from fast_json import RowCodec
+from model_runtime import model_runtime
+from dashboard import fetch_active_model
+from artifact_store import (
+    artifact_store, as_digest, parse_range, RangeNotSatisfiable, ArtifactTooLarge, ARTIFACT_MAX_UPLOAD_BYTES,
+)
 from typing import Optional, List
 from pydantic import BaseModel
 from urllib.parse import unquote
@@ -19,6 +28,12 @@ class ModelData(BaseModel):
     accuracy: float
     deployment_date: str
 
+# 조회 결과 행 -> 응답 변환 (컬럼 순서는 SELECT 순서와 같아야 함)
+MODEL_INFO_CODEC = RowCodec([
+    "model_info_id", "model_name", "model_version", "python_version", "library",
+    "model_type", "loss", "accuracy",
+])
+
 # ====================================
 # 기본 관리 엔드포인트
 # ====================================
@@ -38,49 +53,37 @@ async def model_insert():
 # 모델 정보 조회 엔드포인트
 # ====================================
 @router.get("/model-select")
-async def get_model_info():
+async def get_model_info(request: Request):
     """전체 모델 정보 목록 가져오기"""
-    try:
-        conn = await get_db_connection()
-        async with conn.cursor() as cursor:
+    async def load():
+        async with acquire("web") as conn, conn.cursor() as cursor:
             await cursor.execute(
                 "SELECT model_info_id, model_name, model_version, python_version, library, model_type, loss, accuracy "
                 "FROM model_info"
             )
             result = await cursor.fetchall()
-            conn.close()
-
-            models = [
-                {
-                    "model_info_id": row[0],
-                    "model_name": row[1],
-                    "model_version": row[2],
-                    "python_version": row[3],
-                    "library": row[4],
-                    "model_type": row[5],
-                    "loss": row[6],
-                    "accuracy": row[7],
-                } for row in result
-            ] if result else []
-
-            return {"models": models}
+
+            return MODEL_INFO_CODEC.encode(result, key="models")
+
+    try:
+        return await cached_json(request, "model-deployment:model-select", load, tags=("model",))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/model-info/{model_id}")
-async def get_model_info_by_id(model_id: str):
-    try:
-        # 모델 ID 디코딩 처리
-        model_id = unquote(model_id)
+async def get_model_info_by_id(request: Request, model_id: str):
+    # 모델 ID 디코딩 처리
+    model_id = unquote(model_id)
 
-        conn = await get_db_connection()
-        async with conn.cursor() as cursor:
+    async def load():
+        async with acquire("web") as conn, conn.cursor() as cursor:
             await cursor.execute(
                 "SELECT model_name, model_version, python_version, library, model_type, loss, accuracy "
                 "FROM model_info WHERE model_info_id = %s", (model_id,)
             )
             result = await cursor.fetchone()
-            conn.close()
             if result:
                 return {
                     "model_name": result[0],
@@ -93,54 +96,90 @@ async def get_model_info_by_id(model_id: str):
                 }
             else:
                 raise HTTPException(status_code=404, detail="Model not found")
+
+    try:
+        return await cached_json(request, f"model-deployment:model-info:{model_id}", load, tags=("model",))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/model-detail")
-async def get_active_model_info():
-    """활성 모델 정보 가져오기"""
-    try:
-        conn = await get_db_connection()
-        async with conn.cursor() as cursor:
-            await cursor.execute("SELECT model_use_id FROM model_use WHERE model_use_state = 1 LIMIT 1")
-            result = await cursor.fetchone()
-
-            if not result:
-                raise HTTPException(status_code=404, detail="No active model found")
+async def get_active_model_info(request: Request):
+    """활성 모델 정보 가져오기 (model_use 와 model_info 를 JOIN 한 번으로 조회)"""
+    async def load():
+        active = await fetch_active_model()
+        if active is None:
+            raise HTTPException(status_code=404, detail="No active model found")
 
-            model_info_id = result[0]
-            await cursor.execute("""
-                SELECT model_name, model_version, python_version, library, model_type, loss, accuracy
-                FROM model_info WHERE model_info_id = %s
-            """, (model_info_id,))
-            model_info = await cursor.fetchone()
-            conn.close()
+        _, model_info = active
+        if model_info is None:
+            raise HTTPException(status_code=404, detail="Model information not found")
 
-            if not model_info:
-                raise HTTPException(status_code=404, detail="Model information not found")
+        return model_info
 
-            return {
-                "model_name": model_info[0],
-                "model_version": model_info[1],
-                "python_version": model_info[2],
-                "library": model_info[3],
-                "model_type": model_info[4],
-                "loss": model_info[5],
-                "accuracy": model_info[6],
-            }
+    try:
+        return await cached_json(request, "model-deployment:model-detail", load, tags=("model",))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/model-runtime")
+async def get_model_runtime():
+    """프로세스 내부 모델 런타임 상태"""
+    return model_runtime.stats()
+
+@router.get("/model-file/{model_id}")
+async def download_model_file(model_id: str, range: Optional[str] = Header(None)):
+    """모델 파일 다운로드 (Range 요청 지원, 메모리 매핑 스트리밍)"""
+    model_id = unquote(model_id)
+    async with acquire("web") as conn, conn.cursor() as cursor:
+        await cursor.execute("SELECT model_info_file FROM model_info WHERE model_info_id = %s", (model_id,))
+        result = await cursor.fetchone()
+    if not result or result[0] is None:
+        raise HTTPException(status_code=404, detail="Model file not found")
+
+    digest = as_digest(result[0])
+    if digest is None:
+        # 저장소 도입 이전에 DB 에 직접 저장된 파일
+        return Response(content=bytes(result[0]), media_type="application/octet-stream")
+    if not artifact_store.exists(digest):
+        raise HTTPException(status_code=404, detail="Model artifact missing from store")
+
+    size = artifact_store.size(digest)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": f'"{digest}"',
+        "Content-Disposition": f'attachment; filename="{model_id}.bin"',
+    }
+    if size == 0:
+        return Response(content=b"", media_type="application/octet-stream", headers=headers)
+    if range:
+        try:
+            start, end = parse_range(range, size)
+        except RangeNotSatisfiable:
+            raise HTTPException(status_code=416, detail="Range Not Satisfiable",
+                                headers={"Content-Range": f"bytes */{size}"})
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(artifact_store.iter_range(digest, start, end), status_code=206,
+                                 media_type="application/octet-stream", headers=headers)
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(artifact_store.iter_range(digest, 0, size - 1),
+                             media_type="application/octet-stream", headers=headers)
+
 # ====================================
 # 모델 배포 및 적용 엔드포인트
 # ====================================
 @router.post("/deploy-previous-model")
-async def deploy_previous_model(model_info_id: str, deployment_date: str):
-    """이전 모델 배포"""
-    conn = await get_db_connection()
-    async with conn.cursor() as cursor:
+async def deploy_previous_model(model_info_id: str, deployment_date: str,
+                                user: dict = Depends(get_current_user)):
+    """이전 모델 배포 (배포된 모델 파일은 서버에서 역직렬화되므로 로그인 필요)"""
+    async with acquire("web") as conn, conn.cursor() as cursor:
         try:
+            await conn.begin()
             await cursor.execute(
                 "UPDATE model_info SET deployment_date = %s WHERE model_info_id = %s",
                 (deployment_date, model_info_id)
@@ -151,12 +190,12 @@ async def deploy_previous_model(model_info_id: str, deployment_date: str):
                 (model_info_id,)
             )
             await conn.commit()
+            model_runtime.activate(model_info_id)
+            await query_cache.invalidate("model")
             return {"message": "배포가 성공적으로 완료되었습니다."}
         except Exception as e:
             await conn.rollback()
             raise HTTPException(status_code=500, detail=str(e))
-        finally:
-            conn.close()
 
 @router.post("/model-apply")
 async def model_apply(
@@ -168,17 +207,28 @@ async def model_apply(
     model_type: str = Form(...),
     loss: float = Form(...),
     accuracy: float = Form(...),
-    file: Optional[UploadFile] = File(None)
+    file: Optional[UploadFile] = File(None),
+    user: dict = Depends(get_current_user)
 ):
-    """새 모델 적용 및 MySQL에 저장"""
-    conn = await get_db_connection()
-    async with conn.cursor() as cursor:
+    """새 모델 적용 및 MySQL에 저장 (업로드한 파일은 서버에서 역직렬화되므로 로그인 필요)"""
+    # 파일은 청크 단위로 아티팩트 저장소에 저장하고 DB 에는 digest 만 기록
+    file_digest = None
+    if file:
+        try:
+            file_digest, _ = await artifact_store.save_upload(file, max_bytes=ARTIFACT_MAX_UPLOAD_BYTES or None)
+        except ArtifactTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    file_content = file_digest.encode("ascii") if file_digest else None
+
+    async with acquire("web") as conn, conn.cursor() as cursor:
         try:
-            file_content = await file.read() if file else None
             date_part = deployment_date[2:10]
             time_part = deployment_date[11:16].replace(":", "-")
             model_info_id = f"{model_name}-{date_part}-{time_part}"
 
+            await conn.begin()
             insert_model_info = """
                 INSERT INTO model_info 
                 (model_info_id, model_name, model_version, python_version, library, model_type, deployment_date, loss, accuracy, model_info_file)
@@ -196,14 +246,15 @@ async def model_apply(
             """
             await cursor.execute(insert_model_use, (model_info_id, 1, file_content))
             await conn.commit()
+            model_runtime.activate(model_info_id)
+            await query_cache.invalidate("model")
 
             return {
                 "message": "데이터가 MySQL에 성공적으로 저장되었습니다.",
                 "model_info_id": model_info_id,
-                "file_uploaded": bool(file)
+                "file_uploaded": bool(file),
+                "file_digest": file_digest
             }
         except Exception as e:
             await conn.rollback()
             raise HTTPException(status_code=500, detail=str(e))
-        finally:
-            conn.close()
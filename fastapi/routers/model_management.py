@@ -1,5 +1,9 @@
-from fastapi import APIRouter, HTTPException, UploadFile, Form, File
-from database import get_db_connection
+import asyncio
+from fastapi import APIRouter, HTTPException, UploadFile, Form, File, Request
+from database import acquire
+from query_cache import cached_json
+from fast_json import RowCodec
+from dashboard import fetch_active_model
 from typing import Optional, List
 from pydantic import BaseModel
 from urllib.parse import unquote
@@ -19,6 +23,14 @@ class ModelData(BaseModel):
     accuracy: float
     deployment_date: str
 
+# 조회 결과 행 -> 응답 변환 (컬럼 순서는 SELECT 순서와 같아야 함)
+MODEL_INFO_CODEC = RowCodec([
+    "model_info_id", "model_name", "model_version", "python_version", "library",
+    "model_type", "loss", "accuracy", "deployment_date",
+])
+MODEL_ACCURACY_CODEC = RowCodec(["model_name", "accuracy"])
+MODEL_LOSS_CODEC = RowCodec(["model_name", "loss"])
+
 # ====================================
 # 기본 관리 엔드포인트
 # ====================================
@@ -30,52 +42,39 @@ async def management_home():
 # 모델 정보 조회 엔드포인트
 # ====================================
 @router.get("/model-select")
-async def get_model_info():
+async def get_model_info(request: Request):
     """전체 모델 정보 목록 가져오기"""
-    try:
-        conn = await get_db_connection()
-        async with conn.cursor() as cursor:
+    async def load():
+        async with acquire("web") as conn, conn.cursor() as cursor:
             await cursor.execute(
                 "SELECT model_info_id, model_name, model_version, python_version, library, model_type, loss, accuracy, deployment_date "
                 "FROM model_info"
             )
             result = await cursor.fetchall()
-            conn.close()
-
-            models = [
-                {
-                    "model_info_id": row[0],
-                    "model_name": row[1],
-                    "model_version": row[2],
-                    "python_version": row[3],
-                    "library": row[4],
-                    "model_type": row[5],
-                    "loss": row[6],
-                    "accuracy": row[7],
-                    "deployment_date": row[8]
-                } for row in result
-            ] if result else []
-
-            return {"models": models}
+
+            return MODEL_INFO_CODEC.encode(result, key="models")
+
+    try:
+        return await cached_json(request, "model-management:model-select", load, tags=("model",))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 
 @router.get("/model-info/{model_id}")
-async def get_model_info_by_id(model_id: str):
-    try:
-        # 모델 ID 디코딩 처리
-        model_id = unquote(model_id)
+async def get_model_info_by_id(request: Request, model_id: str):
+    # 모델 ID 디코딩 처리
+    model_id = unquote(model_id)
 
-        conn = await get_db_connection()
-        async with conn.cursor() as cursor:
+    async def load():
+        async with acquire("web") as conn, conn.cursor() as cursor:
             await cursor.execute(
                 "SELECT model_name, model_version, python_version, library, model_type, loss, accuracy, deployment_date "
                 "FROM model_info WHERE model_info_id = %s", (model_id,)
             )
             result = await cursor.fetchone()
-            conn.close()
 
             if result:
                 # 모델 이름에 따라 프로세스 이름 결정
@@ -100,16 +99,20 @@ async def get_model_info_by_id(model_id: str):
                 }
             else:
                 raise HTTPException(status_code=404, detail="Model not found")
+
+    try:
+        return await cached_json(request, f"model-management:model-info:{model_id}", load, tags=("model",))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/model-avg-accuracy")
-async def get_model_avg_accuracy():
+async def get_model_avg_accuracy(request: Request):
     """최근 3개 모델의 평균 정확도 가져오기"""
-    try:
-        conn = await get_db_connection()
-        async with conn.cursor() as cursor:
+    async def load():
+        async with acquire("web") as conn, conn.cursor() as cursor:
             await cursor.execute(
                 """SELECT model_name, accuracy 
                     FROM model_info
@@ -117,25 +120,21 @@ async def get_model_avg_accuracy():
                     LIMIT 3"""
             )
             result = await cursor.fetchall()
-            conn.close()
 
-            models = [
-                {
-                    "model_name": row[0],
-                    "accuracy": row[1]
-                } for row in result
-            ] if result else []
+            return MODEL_ACCURACY_CODEC.encode(result, key="models")
 
-            return {"models": models}
+    try:
+        return await cached_json(request, "model-management:model-avg-accuracy", load, tags=("model",))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/model-avg-loss")
-async def get_model_avg_loss():
+async def get_model_avg_loss(request: Request):
     """최근 3개 모델의 평균 손실 값 가져오기"""
-    try:
-        conn = await get_db_connection()
-        async with conn.cursor() as cursor:
+    async def load():
+        async with acquire("web") as conn, conn.cursor() as cursor:
             await cursor.execute(
                 """SELECT model_name, loss 
                     FROM model_info
@@ -144,15 +143,59 @@ async def get_model_avg_loss():
 
             )
             result = await cursor.fetchall()
-            conn.close()
 
-            models = [
-                {
-                    "model_name": row[0],
-                    "loss": row[1]
-                } for row in result
-            ] if result else []
+            return MODEL_LOSS_CODEC.encode(result, key="models")
+
+    try:
+        return await cached_json(request, "model-management:model-avg-loss", load, tags=("model",))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ====================================
+# 모델 관리 대시보드 (한 화면을 한 번의 요청으로)
+# ====================================
+MODEL_OVERVIEW_RECENT = 3
+
+def _average(values):
+    values = [float(v) for v in values if v is not None]
+    return sum(values) / len(values) if values else None
+
+@router.get("/overview")
+async def get_model_overview(request: Request):
+    """모델 목록, 최근 3개 모델의 정확도/손실, 활성 모델을 한 번에 가져오기
 
-            return {"models": models}
+    목록 조회와 활성 모델 조회(model_use JOIN model_info)를 동시에 실행하고,
+    최근 모델 통계는 model-avg-accuracy / model-avg-loss 를 따로 조회하지 않고 목록에서 계산합니다.
+    """
+    async def load_models():
+        async with acquire("web") as conn, conn.cursor() as cursor:
+            await cursor.execute(
+                "SELECT model_info_id, model_name, model_version, python_version, library, model_type, loss, accuracy, deployment_date "
+                "FROM model_info"
+            )
+            return await cursor.fetchall()
+
+    async def load():
+        models, active = await asyncio.gather(load_models(), fetch_active_model())
+        # deployment_date DESC LIMIT 3 과 같은 순서
+        recent = sorted((row for row in models if row[8] is not None), key=lambda row: row[8], reverse=True)
+        recent = recent[:MODEL_OVERVIEW_RECENT]
+        active_model = None
+        if active is not None and active[1] is not None:
+            active_model = {"model_info_id": active[0], **active[1]}
+        return {
+            "models": MODEL_INFO_CODEC.to_dicts(models),
+            "recent": [{"model_name": row[1], "accuracy": row[7], "loss": row[6]} for row in recent],
+            "avg_accuracy": _average(row[7] for row in recent),
+            "avg_loss": _average(row[6] for row in recent),
+            "active_model": active_model,
+        }
+
+    try:
+        return await cached_json(request, "model-management:overview", load, tags=("model",))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
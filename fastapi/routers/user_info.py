@@ -1,7 +1,15 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+
+from auth import get_current_user
 
 router = APIRouter()
 
 @router.get("/")
-async def management_home():
-    return {"message": "Welcome to User Info Home"}
+async def user_info(user: dict = Depends(get_current_user)):
+    """토큰에 담긴 사용자 정보 (DB 조회 없음)"""
+    return {
+        "employee_no": user["sub"],
+        "name": user["name"],
+        "position": user["position"],
+        "expires_at": user["exp"],
+    }
@@ -1,8 +1,19 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
 from pydantic import BaseModel
 from typing import Optional, List
-from database import get_db_connection
-import pytz
+from datetime import datetime
+from database import acquire
+from query_cache import query_cache
+from user_bulk import (
+    BulkUser, BulkUserUpdate, BulkEmployeeNo, BulkGroup, BulkGroupId,
+    read_rows, validate_rows, find_duplicates, placeholders, summarize,
+)
+from user_query import (
+    USER_LIST_DEFAULT_LIMIT, USER_LIST_MAX_LIMIT, TOTAL_MODES,
+    format_kst, encode_cursor, build_filters, build_page_query, sort_value_of,
+)
+import json
+import aiomysql
 
 router = APIRouter()
 
@@ -48,30 +59,79 @@ async def group():
 # ====================================
 # 사용자 정보 CRUD 엔드포인트
 # ====================================
+async def _count_employees(clauses, params, mode: str):
+    """전체 건수. estimate 는 통계/실행 계획의 추정치, exact 는 COUNT(*) 결과를 캐시해 재사용"""
+    if mode == "none":
+        return None
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    if mode == "estimate":
+        async with acquire("web") as conn, conn.cursor() as cursor:
+            if not clauses:
+                await cursor.execute(
+                    "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'employees'"
+                )
+                row = await cursor.fetchone()
+                return int(row[0] or 0) if row else None
+            await cursor.execute(f"EXPLAIN SELECT 1 FROM employees{where}", params)
+            columns = [d[0] for d in cursor.description]
+            plan = await cursor.fetchall()
+            return int(plan[0][columns.index("rows")] or 0) if plan else 0
+
+    async def load():
+        async with acquire("web") as conn, conn.cursor() as cursor:
+            await cursor.execute(f"SELECT COUNT(*) FROM employees{where}", params)
+            (total,) = await cursor.fetchone()
+            return {"total": total}
+
+    key = "user-management:user-count:" + json.dumps([clauses, params], default=str, ensure_ascii=False)
+    entry = await query_cache.get_or_load(key, load, tags=("employees",))
+    return json.loads(entry.body)["total"]
+
 @router.get("/user-list")
-async def get_employees():
-    """전체 사용자 목록 가져오기"""
+async def get_employees(
+    limit: int = Query(USER_LIST_DEFAULT_LIMIT, ge=1, le=USER_LIST_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    sort: str = "employee_no",
+    order: str = "asc",
+    position: Optional[str] = None,
+    name_prefix: Optional[str] = None,
+    last_login_from: Optional[datetime] = None,
+    last_login_to: Optional[datetime] = None,
+    total: str = "estimate",
+):
+    """사용자 목록 (키셋 페이지네이션). 다음 페이지는 응답의 next_cursor 를 cursor 로 전달합니다."""
     try:
-        conn = await get_db_connection()
-        async with conn.cursor() as cursor:
-            await cursor.execute(
-                "SELECT employees.name, employees.employee_no, employees.position, employees.last_login FROM employees"
-            )
-            result = await cursor.fetchall()
-            conn.close()
-
-            kst = pytz.timezone("Asia/Seoul")
-            employees = [
-                {
-                    "id": row[1],
-                    "name": row[0],
-                    "employeeNo": row[1],
-                    "position": row[2],
-                    "lastLogin": row[3].astimezone(kst).isoformat() if row[3] else "최근 기록이 없음"
-                }
-                for row in result
-            ]
-            return {"employees": employees}
+        if total not in TOTAL_MODES:
+            raise HTTPException(status_code=400, detail=f"total 은 {list(TOTAL_MODES)} 중 하나여야 합니다.")
+        clauses, params = build_filters(position, name_prefix, last_login_from, last_login_to)
+        sql, page_params = build_page_query(clauses, params, sort, order, limit, cursor)
+        async with acquire("web") as conn, conn.cursor() as cur:
+            await cur.execute(sql, page_params)
+            result = await cur.fetchall()
+
+        has_more = len(result) > limit
+        result = result[:limit]
+        last_logins = format_kst([row[3] for row in result])
+        employees = [
+            {
+                "id": row[1],
+                "name": row[0],
+                "employeeNo": row[1],
+                "position": row[2],
+                "lastLogin": last_login,
+            }
+            for row, last_login in zip(result, last_logins)
+        ]
+        next_cursor = encode_cursor(sort_value_of(result[-1], sort), result[-1][1]) if has_more else None
+        return {
+            "employees": employees,
+            "next_cursor": next_cursor,
+            "total": await _count_employees(clauses, params, total),
+            "total_mode": total,
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -79,13 +139,14 @@ async def get_employees():
 async def add_user(user: User):
     """새 사용자 추가"""
     try:
-        conn = await get_db_connection()
-        async with conn.cursor() as cursor:
-            await cursor.execute("SELECT COUNT(*) FROM employees WHERE employee_no = %s", (user.employeeNo,))
-            (count_employee,) = await cursor.fetchone()
-
-            await cursor.execute("SELECT COUNT(*) FROM employees WHERE name = %s", (user.name,))
-            (count_name,) = await cursor.fetchone()
+        async with acquire("web") as conn, conn.cursor() as cursor:
+            # 사번/이름 중복을 한 번의 조회로 확인
+            await cursor.execute(
+                "SELECT COALESCE(SUM(employee_no = %s), 0), COALESCE(SUM(name = %s), 0) "
+                "FROM employees WHERE employee_no = %s OR name = %s",
+                (user.employeeNo, user.name, user.employeeNo, user.name)
+            )
+            count_employee, count_name = await cursor.fetchone()
 
             if count_employee > 0:
                 raise HTTPException(status_code=400, detail="이미 존재하는 사번입니다.")
@@ -97,8 +158,10 @@ async def add_user(user: User):
                 (user.name, user.employeeNo, user.position)
             )
             await conn.commit()
-        conn.close()
+        await query_cache.invalidate("employees")
         return {"message": "사용자가 성공적으로 추가되었습니다."}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -106,14 +169,13 @@ async def add_user(user: User):
 async def update_user_detail(user_id: int, user: UpdateUser):
     """사용자 정보 업데이트"""
     try:
-        conn = await get_db_connection()
-        async with conn.cursor() as cursor:
+        async with acquire("web") as conn, conn.cursor() as cursor:
             await cursor.execute(
                 "UPDATE employees SET position = %s WHERE employee_no = %s",
                 (user.position, user_id)
             )
             await conn.commit()
-        conn.close()
+        await query_cache.invalidate("employees")
         return {"message": "사용자 정보가 성공적으로 업데이트되었습니다."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -122,11 +184,10 @@ async def update_user_detail(user_id: int, user: UpdateUser):
 async def delete_user(employee_no: int):
     """사용자 삭제"""
     try:
-        conn = await get_db_connection()
-        async with conn.cursor() as cursor:
+        async with acquire("web") as conn, conn.cursor() as cursor:
             await cursor.execute("DELETE FROM employees WHERE employee_no = %s", (employee_no,))
             await conn.commit()
-        conn.close()
+        await query_cache.invalidate("employees")
         return {"message": "사용자가 성공적으로 삭제되었습니다."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -138,11 +199,9 @@ async def delete_user(employee_no: int):
 async def get_user_groups():
     """전체 그룹 목록 가져오기"""
     try:
-        conn = await get_db_connection()
-        async with conn.cursor() as cursor:
+        async with acquire("web") as conn, conn.cursor() as cursor:
             await cursor.execute("SELECT id, group_name, description FROM user_groups")
             user_groups = await cursor.fetchall()
-        conn.close()
         return {"user_groups": user_groups}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -151,14 +210,12 @@ async def get_user_groups():
 async def add_group(group: Group):
     """새 그룹 추가"""
     try:
-        conn = await get_db_connection()
-        async with conn.cursor() as cursor:
+        async with acquire("web") as conn, conn.cursor() as cursor:
             await cursor.execute(
                 "INSERT INTO user_groups (group_name, description) VALUES (%s, %s)",
                 (group.group_name, group.description)
             )
             await conn.commit()
-        conn.close()
         return {"message": "권한이 성공적으로 추가되었습니다."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -167,11 +224,9 @@ async def add_group(group: Group):
 async def delete_group(group_id: int):
     """그룹 삭제"""
     try:
-        conn = await get_db_connection()
-        async with conn.cursor() as cursor:
+        async with acquire("web") as conn, conn.cursor() as cursor:
             await cursor.execute("DELETE FROM user_groups WHERE id = %s", (group_id,))
             await conn.commit()
-        conn.close()
         return {"message": "권한이 성공적으로 삭제되었습니다."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -180,8 +235,7 @@ async def delete_group(group_id: int):
 async def get_user_detail(user_id: int):
     """단일 사용자 정보 조회"""
     try:
-        conn = await get_db_connection()
-        async with conn.cursor() as cursor:
+        async with acquire("web") as conn, conn.cursor() as cursor:
             await cursor.execute(
                 "SELECT name, employee_no, position, last_login FROM employees WHERE employee_no = %s", (user_id,)
             )
@@ -196,7 +250,202 @@ async def get_user_detail(user_id: int):
                 "lastLogin": user_result[3],
                 "roles": user_result[2].split(';') if user_result[2] else []
             }
-        conn.close()
         return user
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+# ====================================
+# 일괄 처리 엔드포인트 (JSON 배열 또는 CSV 업로드)
+# ====================================
+def _mark(report, number, status, detail=None, **fields):
+    item = {"row": number, "status": status, **fields}
+    if detail:
+        item["detail"] = detail
+    report.append(item)
+
+@router.post("/user-bulk-add")
+async def bulk_add_users(request: Request):
+    """사용자 일괄 추가. 중복 검사는 한 번의 조회로, INSERT 는 한 문장으로 처리합니다."""
+    try:
+        valid, report = validate_rows(await read_rows(request), BulkUser)
+        dup_no = find_duplicates(valid, lambda u: u.employeeNo)
+        # employees.name 의 콜레이션이 대소문자를 구분하지 않으므로 casefold 로 비교
+        dup_name = find_duplicates(valid, lambda u: u.name.casefold())
+        candidates = []
+        for number, user in valid:
+            if number in dup_no:
+                _mark(report, number, "error", "요청 안에서 사번이 중복됩니다.", employeeNo=user.employeeNo)
+            elif number in dup_name:
+                _mark(report, number, "error", "요청 안에서 이름이 중복됩니다.", employeeNo=user.employeeNo)
+            else:
+                candidates.append((number, user))
+        if not candidates:
+            return summarize(report)
+
+        async with acquire("web") as conn, conn.cursor() as cursor:
+            await conn.begin()
+            numbers = [user.employeeNo for _, user in candidates]
+            names = [user.name for _, user in candidates]
+            await cursor.execute(
+                f"SELECT employee_no, name FROM employees "
+                f"WHERE employee_no IN ({placeholders(len(numbers))}) OR name IN ({placeholders(len(names))})",
+                numbers + names
+            )
+            existing = await cursor.fetchall()
+            existing_no = {row[0] for row in existing}
+            existing_name = {row[1].casefold() for row in existing}
+
+            rows = []
+            for number, user in candidates:
+                if user.employeeNo in existing_no:
+                    _mark(report, number, "error", "이미 존재하는 사번입니다.", employeeNo=user.employeeNo)
+                elif user.name.casefold() in existing_name:
+                    _mark(report, number, "error", "이미 존재하는 이름입니다.", employeeNo=user.employeeNo)
+                else:
+                    rows.append((number, user))
+            if rows:
+                await cursor.execute(
+                    "INSERT INTO employees (name, employee_no, position, last_login) VALUES "
+                    + ", ".join(["(%s, %s, %s, NULL)"] * len(rows)),
+                    [value for _, user in rows for value in (user.name, user.employeeNo, user.position)]
+                )
+            await conn.commit()
+        await query_cache.invalidate("employees")
+        for number, user in rows:
+            _mark(report, number, "created", employeeNo=user.employeeNo)
+        return summarize(report)
+    except HTTPException:
+        raise
+    except aiomysql.IntegrityError as e:
+        # 조회와 INSERT 사이에 다른 요청이 같은 사번을 추가한 경우 (트랜잭션은 롤백됨)
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/user-bulk-update")
+async def bulk_update_users(request: Request):
+    """사용자 직급 일괄 변경. 한 번의 UPDATE ... CASE 로 처리합니다."""
+    try:
+        valid, report = validate_rows(await read_rows(request), BulkUserUpdate)
+        duplicated = find_duplicates(valid, lambda u: u.employeeNo)
+        candidates = []
+        for number, user in valid:
+            if number in duplicated:
+                _mark(report, number, "error", "요청 안에서 사번이 중복됩니다.", employeeNo=user.employeeNo)
+            else:
+                candidates.append((number, user))
+        if not candidates:
+            return summarize(report)
+
+        async with acquire("web") as conn, conn.cursor() as cursor:
+            await conn.begin()
+            numbers = [user.employeeNo for _, user in candidates]
+            await cursor.execute(
+                f"SELECT employee_no FROM employees WHERE employee_no IN ({placeholders(len(numbers))}) FOR UPDATE",
+                numbers
+            )
+            existing = {row[0] for row in await cursor.fetchall()}
+            rows = [(number, user) for number, user in candidates if user.employeeNo in existing]
+            if rows:
+                await cursor.execute(
+                    "UPDATE employees SET position = CASE employee_no "
+                    + " ".join(["WHEN %s THEN %s"] * len(rows))
+                    + f" END WHERE employee_no IN ({placeholders(len(rows))})",
+                    [value for _, user in rows for value in (user.employeeNo, user.position)]
+                    + [user.employeeNo for _, user in rows]
+                )
+            await conn.commit()
+        await query_cache.invalidate("employees")
+        for number, user in candidates:
+            if user.employeeNo in existing:
+                _mark(report, number, "updated", employeeNo=user.employeeNo)
+            else:
+                _mark(report, number, "not_found", "존재하지 않는 사번입니다.", employeeNo=user.employeeNo)
+        return summarize(report)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _bulk_delete(request: Request, model, attr: str, table: str, column: str, label: str):
+    """키 목록을 받아 존재 여부를 한 번에 확인한 뒤 DELETE ... IN 한 문장으로 삭제"""
+    valid, report = validate_rows(await read_rows(request), model)
+    duplicated = find_duplicates(valid, lambda item: getattr(item, attr))
+    candidates = []
+    for number, item in valid:
+        if number in duplicated:
+            _mark(report, number, "error", "요청 안에서 중복됩니다.", **{attr: getattr(item, attr)})
+        else:
+            candidates.append((number, getattr(item, attr)))
+    if not candidates:
+        return summarize(report)
+
+    keys = [key for _, key in candidates]
+    async with acquire("web") as conn, conn.cursor() as cursor:
+        await conn.begin()
+        await cursor.execute(
+            f"SELECT {column} FROM {table} WHERE {column} IN ({placeholders(len(keys))}) FOR UPDATE", keys
+        )
+        existing = {row[0] for row in await cursor.fetchall()}
+        if existing:
+            await cursor.execute(
+                f"DELETE FROM {table} WHERE {column} IN ({placeholders(len(existing))})", list(existing)
+            )
+        await conn.commit()
+    await query_cache.invalidate(table)
+    for number, key in candidates:
+        if key in existing:
+            _mark(report, number, "deleted", **{attr: key})
+        else:
+            _mark(report, number, "not_found", f"존재하지 않는 {label}입니다.", **{attr: key})
+    return summarize(report)
+
+@router.post("/user-bulk-delete")
+async def bulk_delete_users(request: Request):
+    """사용자 일괄 삭제 ([{"employeeNo": ...}] 또는 employeeNo 열이 있는 CSV)"""
+    try:
+        return await _bulk_delete(request, BulkEmployeeNo, "employeeNo", "employees", "employee_no", "사번")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/group-bulk-add")
+async def bulk_add_groups(request: Request):
+    """그룹 일괄 추가"""
+    try:
+        valid, report = validate_rows(await read_rows(request), BulkGroup)
+        duplicated = find_duplicates(valid, lambda g: g.group_name.casefold())
+        rows = []
+        for number, group in valid:
+            if number in duplicated:
+                _mark(report, number, "error", "요청 안에서 그룹 이름이 중복됩니다.", group_name=group.group_name)
+            else:
+                rows.append((number, group))
+        if rows:
+            async with acquire("web") as conn, conn.cursor() as cursor:
+                await conn.begin()
+                await cursor.execute(
+                    "INSERT INTO user_groups (group_name, description) VALUES "
+                    + ", ".join(["(%s, %s)"] * len(rows)),
+                    [value for _, group in rows for value in (group.group_name, group.description)]
+                )
+                await conn.commit()
+        for number, group in rows:
+            _mark(report, number, "created", group_name=group.group_name)
+        return summarize(report)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/group-bulk-delete")
+async def bulk_delete_groups(request: Request):
+    """그룹 일괄 삭제 ([{"id": ...}] 또는 id 열이 있는 CSV)"""
+    try:
+        return await _bulk_delete(request, BulkGroupId, "id", "user_groups", "id", "그룹")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
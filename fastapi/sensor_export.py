@@ -0,0 +1,182 @@
+import asyncio
+import io
+import os
+from datetime import datetime
+from typing import List, Optional
+
+from database import acquire
+from replay import PRESS_COLUMNS, WELDING_COLUMNS
+
+# ============================================
+# 센서 데이터 내보내기 설정
+# ============================================
+
+# 한 번에 DB 에서 읽어 하나의 레코드 배치(Parquet 은 row group)로 만드는 행 수
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "50000"))
+
+EXPORT_TABLES = {
+    "press": {"db": "press", "table": "press_raw_data", "columns": PRESS_COLUMNS},
+    "welding": {"db": "welding", "table": "welding_raw_data", "columns": WELDING_COLUMNS},
+}
+EXPORT_FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+STRING_COLUMNS = {"machine_name", "item_no"}
+
+
+class ExportUnavailable(Exception):
+    """pyarrow 가 설치되어 있지 않음"""
+
+
+def require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise ExportUnavailable("pyarrow 가 설치되어 있지 않습니다.")
+    return pyarrow
+
+
+def arrow_type(pa, column: str):
+    if column == "idx":
+        return pa.int64()
+    if column in STRING_COLUMNS:
+        return pa.string()
+    if column == "working_time":
+        return pa.timestamp("us")
+    return pa.float64()
+
+
+def _to_array(pa, values, data_type):
+    try:
+        return pa.array(values, type=data_type, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+        # DECIMAL 컬럼이나 문자열로 저장된 시각은 추론한 타입에서 변환
+        return pa.array(values, from_pandas=True).cast(data_type)
+
+
+class ExportQuery:
+    """컬럼 선택과 조건(machine_name, item_no, working_time, idx 범위)을 SQL 로 내려보냅니다."""
+
+    def __init__(self, process: str, columns: Optional[List[str]] = None,
+                 machine_names: Optional[List[str]] = None, item_nos: Optional[List[str]] = None,
+                 start: Optional[datetime] = None, end: Optional[datetime] = None,
+                 start_idx: Optional[int] = None, end_idx: Optional[int] = None,
+                 batch_rows: int = EXPORT_BATCH_ROWS):
+        if process not in EXPORT_TABLES:
+            raise ValueError(f"Unknown process: {process}")
+        spec = EXPORT_TABLES[process]
+        self.process = process
+        self.db = spec["db"]
+        self.table = spec["table"]
+        self.columns = columns or list(spec["columns"])
+        unknown = [c for c in self.columns if c not in spec["columns"]]
+        if unknown:
+            raise ValueError(f"Unknown column: {', '.join(unknown)}")
+        self.batch_rows = batch_rows
+        self.first_idx = (start_idx - 1) if start_idx is not None else 0
+
+        clauses, params = [], []
+        if machine_names:
+            clauses.append(f"machine_name IN ({', '.join(['%s'] * len(machine_names))})")
+            params.extend(machine_names)
+        if item_nos:
+            clauses.append(f"item_no IN ({', '.join(['%s'] * len(item_nos))})")
+            params.extend(item_nos)
+        if start:
+            clauses.append("working_time >= %s")
+            params.append(start)
+        if end:
+            clauses.append("working_time < %s")
+            params.append(end)
+        if end_idx is not None:
+            clauses.append("idx <= %s")
+            params.append(end_idx)
+        self._filters = "".join(f" AND {c}" for c in clauses)
+        self._params = params
+        # 키셋 커서로 쓰기 위해 idx 는 항상 첫 번째로 읽고, 배치에는 요청한 컬럼 순서대로 담음
+        self._select = ["idx"] + [c for c in self.columns if c != "idx"]
+        self._positions = [self._select.index(c) for c in self.columns]
+
+    def schema(self):
+        pa = require_pyarrow()
+        return pa.schema([pa.field(c, arrow_type(pa, c)) for c in self.columns])
+
+    async def fetch_page(self, after_idx: int):
+        sql = (
+            f"SELECT {', '.join(self._select)} FROM {self.table} "
+            f"WHERE idx > %s{self._filters} ORDER BY idx LIMIT %s"
+        )
+        async with acquire(self.db) as conn, conn.cursor() as cursor:
+            await cursor.execute(sql, [after_idx] + self._params + [self.batch_rows])
+            return await cursor.fetchall()
+
+    def to_batch(self, rows, schema):
+        """행 목록을 컬럼 배열로 바꿔 RecordBatch 생성"""
+        pa = require_pyarrow()
+        columns = list(zip(*rows))
+        arrays = [_to_array(pa, columns[self._positions[i]], field.type) for i, field in enumerate(schema)]
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    async def batches(self):
+        """idx 키셋으로 batch_rows 씩 읽어 RecordBatch 를 차례로 돌려줍니다. 메모리는 배치 하나 분량"""
+        schema = self.schema()
+        after_idx = self.first_idx
+        # 다음 페이지 조회와 현재 배치 변환을 겹쳐서 실행
+        pending = asyncio.ensure_future(self.fetch_page(after_idx))
+        try:
+            while True:
+                rows = await pending
+                pending = None
+                if not rows:
+                    return
+                after_idx = rows[-1][0]
+                if len(rows) == self.batch_rows:
+                    pending = asyncio.ensure_future(self.fetch_page(after_idx))
+                yield await asyncio.to_thread(self.to_batch, rows, schema)
+                if pending is None:
+                    return
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+
+class _Drain(io.RawIOBase):
+    """pyarrow writer 가 쓴 바이트를 모아 두었다가 응답으로 흘려보내는 버퍼"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+async def stream_export(query: ExportQuery, output_format: str):
+    """Arrow IPC 스트림 또는 Parquet 파일을 배치 단위 바이트 조각으로 생성합니다."""
+    pa = require_pyarrow()
+    schema = query.schema()
+    drain = _Drain()
+    sink = pa.PythonFile(drain, mode="w")
+    if output_format == "parquet":
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    try:
+        async for batch in query.batches():
+            await asyncio.to_thread(writer.write_batch, batch)
+            chunk = drain.take()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield drain.take()
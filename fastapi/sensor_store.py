@@ -0,0 +1,334 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import date, datetime
+from typing import List, Optional
+from urllib.parse import quote
+
+from sensor_export import EXPORT_TABLES, ExportQuery, ExportUnavailable, require_pyarrow
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# 로컬 컬럼형 센서 저장소 설정
+# ============================================
+
+SENSOR_STORE_ENABLED = os.getenv("SENSOR_STORE_ENABLED", "1") == "1"
+SENSOR_STORE_DIR = os.getenv(
+    "SENSOR_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "sensor_store")
+)
+SENSOR_SYNC_INTERVAL_SECONDS = float(os.getenv("SENSOR_SYNC_INTERVAL_SECONDS", "60"))
+SENSOR_SYNC_BATCH_ROWS = int(os.getenv("SENSOR_SYNC_BATCH_ROWS", "100000"))
+
+# 조회 단위 -> pyarrow floor_temporal 단위
+HISTORY_GRANULARITIES = ("minute", "hour", "day", "week", "month")
+SIGNALS = {
+    process: [c for c in spec["columns"] if c not in ("idx", "machine_name", "item_no", "working_time")]
+    for process, spec in EXPORT_TABLES.items()
+}
+
+
+def _part_range(name: str):
+    """part-<첫 idx>-<마지막 idx>.parquet -> (첫 idx, 마지막 idx)"""
+    first, last = name[len("part-"):-len(".parquet")].split("-")
+    return int(first), int(last)
+
+
+class SensorStore:
+    """press/welding 원본 데이터를 day=/machine= 파티션의 Parquet 파일로 복제해 두고 이력 조회에 사용합니다.
+
+    idx 워터마크 이후의 행만 주기적으로 가져오므로 운영 DB 에는 키셋 조회 부하만 남습니다.
+    파일을 먼저 쓰고 워터마크를 나중에 기록하며, 시작 시 워터마크보다 뒤의 파일은 지웁니다.
+
+    원본을 기간 단위로 훑는 조회(/management/history, /engineering/history)만 이 저장소를 사용합니다.
+    기존 /management/{press,welding}/{period} 는 버킷당 몇 행인 집계 테이블(rollup)을, 트렌드는
+    실시간 피드의 메모리 윈도를 읽으므로 운영 DB 원본을 스캔하지 않아 그대로 둡니다.
+    pyarrow 가 없으면 경고를 한 번 남기고 동기화를 시작하지 않습니다 (이력 조회는 501).
+    """
+
+    def __init__(self, root: str = SENSOR_STORE_DIR, interval: float = SENSOR_SYNC_INTERVAL_SECONDS,
+                 batch_rows: int = SENSOR_SYNC_BATCH_ROWS):
+        self.root = root
+        self.interval = interval
+        self.batch_rows = batch_rows
+        self._watermarks = {}
+        self._compacted = set()
+        self._task = None
+        self._lock_file = None
+        self.last_synced_at = {}
+        # 동기화를 끈 사유 (pyarrow 없음 등)
+        self.disabled_reason = None
+
+    # ---------- 파일 배치 ----------
+
+    def _process_dir(self, process: str) -> str:
+        return os.path.join(self.root, process)
+
+    def _watermark_path(self, process: str) -> str:
+        return os.path.join(self._process_dir(process), "_watermark.json")
+
+    def watermark(self, process: str) -> int:
+        if process not in self._watermarks:
+            try:
+                with open(self._watermark_path(process)) as f:
+                    self._watermarks[process] = int(json.load(f)["last_idx"])
+            except FileNotFoundError:
+                self._watermarks[process] = 0
+        return self._watermarks[process]
+
+    def _save_watermark(self, process: str, last_idx: int):
+        path = self._watermark_path(process)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = os.path.join(os.path.dirname(path), ".watermark.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"last_idx": last_idx, "synced_at": datetime.now().isoformat()}, f)
+        os.replace(tmp, path)
+        self._watermarks[process] = last_idx
+
+    def _partition_dirs(self, process: str):
+        base = self._process_dir(process)
+        if not os.path.isdir(base):
+            return
+        for day_dir in sorted(os.listdir(base)):
+            if not day_dir.startswith("day="):
+                continue
+            for machine_dir in os.listdir(os.path.join(base, day_dir)):
+                yield day_dir[len("day="):], os.path.join(base, day_dir, machine_dir)
+
+    def recover(self, process: str):
+        """워터마크 기록 전에 중단되어 남은 파일과, 압축 도중 남은 중복 파일을 정리합니다."""
+        watermark = self.watermark(process)
+        for _, directory in self._partition_dirs(process):
+            parts = [n for n in os.listdir(directory) if n.startswith("part-")]
+            ranges = {n: _part_range(n) for n in parts}
+            for name, (first, last) in ranges.items():
+                # 압축 후 원본을 지우기 전에 중단되면 합쳐진 파일이 원본 범위를 포함함
+                contained = any(
+                    (o_first, o_last) != (first, last) and o_first <= first and last <= o_last
+                    for o_first, o_last in ranges.values()
+                )
+                if first > watermark or contained:
+                    os.remove(os.path.join(directory, name))
+            for name in os.listdir(directory):
+                if name.startswith("."):
+                    os.remove(os.path.join(directory, name))
+
+    def _write_file(self, table, directory: str, first: int, last: int):
+        import pyarrow.parquet as pq
+
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"part-{first:012d}-{last:012d}.parquet")
+        tmp = os.path.join(directory, f".part-{first:012d}-{last:012d}.tmp")
+        pq.write_table(table, tmp, compression="zstd")
+        os.replace(tmp, path)
+
+    def _write_partitions(self, process: str, table):
+        """한 페이지의 행을 (날짜, 설비) 파티션별 파일로 나눠 씁니다."""
+        pa = require_pyarrow()
+        import pyarrow.compute as pc
+
+        days = pc.strftime(table["working_time"], format="%Y-%m-%d")
+        keys = pa.table({"day": days, "machine": table["machine_name"]})
+        for key in keys.group_by(["day", "machine"]).aggregate([]).to_pylist():
+            mask = pc.and_(
+                pc.equal(days, key["day"]),
+                pc.equal(table["machine_name"], key["machine"]),
+            )
+            part = table.filter(mask)
+            idx = part["idx"]
+            directory = os.path.join(
+                self._process_dir(process), f"day={key['day']}", f"machine={quote(str(key['machine']), safe='')}"
+            )
+            self._write_file(part, directory, pc.min(idx).as_py(), pc.max(idx).as_py())
+
+    # ---------- 동기화 ----------
+
+    async def sync(self, process: str) -> int:
+        """워터마크 이후 최대 batch_rows 행을 가져와 저장하고, 가져온 행 수를 반환합니다."""
+        pa = require_pyarrow()
+        query = ExportQuery(process, batch_rows=self.batch_rows)
+        fetched = await query.fetch_page(self.watermark(process))
+        if not fetched:
+            return 0
+        # 설비/시각이 없는 행은 파티션을 정할 수 없으므로 건너뜀
+        rows = [row for row in fetched if row[1] is not None and row[3] is not None]
+        if rows:
+            table = await asyncio.to_thread(
+                lambda: pa.Table.from_batches([query.to_batch(rows, query.schema())])
+            )
+            await asyncio.to_thread(self._write_partitions, process, table)
+        self._save_watermark(process, fetched[-1][0])
+        self.last_synced_at[process] = datetime.now().isoformat()
+        return len(fetched)
+
+    def compact(self, process: str):
+        """지난 날짜의 파티션은 파일 하나로 합칩니다. (오늘 파티션은 계속 추가되므로 제외)"""
+        import pyarrow.parquet as pq
+
+        today = date.today().isoformat()
+        for day, directory in self._partition_dirs(process):
+            if day >= today or directory in self._compacted:
+                continue
+            parts = sorted(n for n in os.listdir(directory) if n.startswith("part-"))
+            if len(parts) > 1:
+                ranges = [_part_range(n) for n in parts]
+                table = pq.read_table([os.path.join(directory, n) for n in parts]).sort_by("idx")
+                self._write_file(table, directory, min(r[0] for r in ranges), max(r[1] for r in ranges))
+                for name in parts:
+                    os.remove(os.path.join(directory, name))
+            self._compacted.add(directory)
+
+    async def sync_all(self):
+        for process in EXPORT_TABLES:
+            while await self.sync(process) >= self.batch_rows:
+                pass
+            await asyncio.to_thread(self.compact, process)
+
+    def _try_lock(self) -> bool:
+        """여러 워커 중 파일 잠금을 얻은 하나만 동기화합니다. (잠금을 가진 워커가 죽으면 다른 워커가 이어받음)"""
+        if self._lock_file is not None:
+            return True
+        os.makedirs(self.root, exist_ok=True)
+        lock_file = open(os.path.join(self.root, ".sync.lock"), "w")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+        self._lock_file = lock_file
+        return True
+
+    async def _loop(self):
+        recovered = False
+        while True:
+            try:
+                if self._try_lock():
+                    if not recovered:
+                        for process in EXPORT_TABLES:
+                            await asyncio.to_thread(self.recover, process)
+                        recovered = True
+                    await self.sync_all()
+            except ExportUnavailable as e:
+                self._disable(str(e))
+                return
+            except Exception:
+                logger.exception("sensor store sync failed")
+            await asyncio.sleep(self.interval)
+
+    def _disable(self, reason: str):
+        self.disabled_reason = reason
+        logger.warning("sensor store disabled: %s", reason)
+
+    def start(self):
+        if self.disabled_reason is not None:
+            return
+        try:
+            require_pyarrow()
+        except ExportUnavailable as e:
+            self._disable(str(e))
+            return
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="sensor-store-sync")
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    # ---------- 조회 ----------
+
+    def scan(self, process: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+             machines: Optional[List[str]] = None, columns: Optional[List[str]] = None):
+        """파티션 가지치기(day, machine) 후 working_time 범위로 필터링한 pyarrow Table"""
+        if process not in EXPORT_TABLES:
+            raise ValueError(f"Unknown process: {process}")
+        pa = require_pyarrow()
+        import pyarrow.dataset as ds
+
+        columns = columns or list(EXPORT_TABLES[process]["columns"])
+        base = self._process_dir(process)
+        if not os.path.isdir(base):
+            return ExportQuery(process, columns).schema().empty_table()
+        partitioning = ds.partitioning(pa.schema([("day", pa.string()), ("machine", pa.string())]), flavor="hive")
+        import pyarrow.fs as fs
+
+        dataset = ds.dataset(base, format="parquet", partitioning=partitioning,
+                             filesystem=fs.LocalFileSystem(use_mmap=True))
+        condition = None
+
+        def add(expr):
+            nonlocal condition
+            condition = expr if condition is None else condition & expr
+
+        if start is not None:
+            add(ds.field("day") >= start.strftime("%Y-%m-%d"))
+            add(ds.field("working_time") >= pa.scalar(start, type=pa.timestamp("us")))
+        if end is not None:
+            add(ds.field("day") <= end.strftime("%Y-%m-%d"))
+            add(ds.field("working_time") < pa.scalar(end, type=pa.timestamp("us")))
+        if machines:
+            add(ds.field("machine").isin(machines))
+        return dataset.to_table(columns=columns, filter=condition)
+
+    def aggregate(self, process: str, granularity: str, start=None, end=None, machines=None,
+                  signals=None, by=("machine_name",)):
+        """버킷 x 그룹별 행 수와 신호별 평균/최소/최대 (컬럼형 결과)"""
+        if process not in EXPORT_TABLES:
+            raise ValueError(f"Unknown process: {process}")
+        if granularity not in HISTORY_GRANULARITIES:
+            raise ValueError(f"Unknown granularity: {granularity}")
+        signals = signals or SIGNALS[process]
+        unknown = [s for s in signals if s not in SIGNALS[process]]
+        if unknown:
+            raise ValueError(f"Unknown signal: {', '.join(unknown)}")
+        import pyarrow.compute as pc
+
+        table = self.scan(process, start, end, machines, ["idx", "working_time", *by, *signals])
+        table = table.append_column("bucket", pc.floor_temporal(table["working_time"], 1, granularity))
+        aggregations = [("idx", "count")]
+        for signal in signals:
+            aggregations += [(signal, "mean"), (signal, "min"), (signal, "max")]
+        grouped = table.group_by(["bucket", *by]).aggregate(aggregations)
+        grouped = grouped.sort_by([("bucket", "ascending")] + [(c, "ascending") for c in by])
+        names = ["bucket_start" if n == "bucket" else "row_count" if n == "idx_count" else n
+                 for n in grouped.column_names]
+        return {
+            "period": granularity,
+            "columns": names,
+            "rows": [list(row) for row in zip(*(column.to_pylist() for column in grouped.columns))],
+        }
+
+    async def history(self, *args, **kwargs):
+        try:
+            return await asyncio.to_thread(self.aggregate, *args, **kwargs)
+        except FileNotFoundError:
+            # 조회 도중 동기화 워커가 파티션을 압축한 경우 한 번 더 시도
+            return await asyncio.to_thread(self.aggregate, *args, **kwargs)
+
+    def stats(self):
+        if self._lock_file is None:
+            # 동기화하지 않는 워커는 파일의 워터마크를 다시 읽음
+            self._watermarks.clear()
+        return {
+            "enabled": SENSOR_STORE_ENABLED and self.disabled_reason is None,
+            "disabled_reason": self.disabled_reason,
+            "watermarks": {p: self.watermark(p) for p in EXPORT_TABLES},
+            "last_synced_at": self.last_synced_at,
+        }
+
+
+sensor_store = SensorStore()
@@ -0,0 +1,51 @@
+"""운영 서버 실행 진입점
+
+    python server.py                  # uvicorn 멀티 워커
+    gunicorn -c gunicorn.conf.py main:app
+
+워커 수 등은 환경 변수로 조정합니다. 공유 자원(커넥션 풀, 백그라운드 태스크 등)은
+각 워커의 lifespan 에서 만들어지고 종료 시 정리됩니다.
+"""
+import importlib.util
+import os
+
+import uvicorn
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+WORKERS = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+# 종료 신호 후 진행 중인 요청을 마무리할 시간(초)
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info")
+
+
+def _has_module(name: str) -> bool:
+    return importlib.util.find_spec(name) is not None
+
+
+def event_loop() -> str:
+    """uvloop 가 설치되어 있으면 사용"""
+    return "uvloop" if _has_module("uvloop") else "asyncio"
+
+
+def http_protocol() -> str:
+    """httptools 가 설치되어 있으면 사용"""
+    return "httptools" if _has_module("httptools") else "h11"
+
+
+def main():
+    uvicorn.run(
+        "main:app",
+        host=HOST,
+        port=PORT,
+        workers=WORKERS,
+        loop=event_loop(),
+        http=http_protocol(),
+        lifespan="on",
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+        log_level=LOG_LEVEL,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""라우터 등록 및 시작 시간 측정
+
+    python startup.py             # main 임포트 시 모듈별 임포트 시간 상위 목록
+    python startup.py --check     # routers/ 디렉터리와 ROUTER_MANIFEST 가 일치하는지 확인
+"""
+import importlib
+import logging
+import os
+import subprocess
+import sys
+import time
+
+from fastapi import APIRouter
+
+logger = logging.getLogger(__name__)
+
+# STARTUP_PROFILE=1 이면 라우터 모듈별 임포트 시간을 로그로 남김
+STARTUP_PROFILE = os.getenv("STARTUP_PROFILE", "0") == "1"
+
+# 미리 계산된 라우터 목록 (모듈 이름, URL prefix, 태그).
+# 시작할 때마다 routers 패키지를 탐색하지 않도록 여기에 고정합니다.
+# 라우터 파일을 추가하면 `python startup.py --check` 로 누락 여부를 확인하세요.
+ROUTER_MANIFEST = [
+    ("engineering", "/engineering", "Engineering"),
+    ("export", "/export", "Export"),
+    ("logout", "/logout", "Logout"),
+    ("management", "/management", "Management"),
+    ("model_deployment", "/model-deployment", "Model_deployment"),
+    ("model_management", "/model-management", "Model_management"),
+    ("social", "/social", "Social"),
+    ("test_router", "/test-router", "Test_router"),
+    ("user_info", "/user-info", "User_info"),
+    ("user_management", "/user-management", "User_management"),
+]
+
+import_timings = {}
+
+
+def register_routers(app, package: str = "routers"):
+    router = APIRouter()
+    for module_name, prefix, tag in ROUTER_MANIFEST:
+        full_module_name = f"{package}.{module_name}"
+        started = time.perf_counter()
+        module = importlib.import_module(full_module_name)
+        import_timings[full_module_name] = time.perf_counter() - started
+        router.include_router(module.router, prefix=prefix, tags=[tag])
+    app.include_router(router)
+    if STARTUP_PROFILE:
+        for name, seconds in sorted(import_timings.items(), key=lambda item: -item[1]):
+            logger.info("import %-32s %8.1f ms", name, seconds * 1000)
+
+
+def check_manifest(package_dir: str = "routers"):
+    """디렉터리의 라우터 파일과 매니페스트의 차이"""
+    on_disk = {
+        name[:-3] for name in os.listdir(package_dir)
+        if name.endswith(".py") and not name.startswith("_")
+    }
+    listed = {module_name for module_name, _, _ in ROUTER_MANIFEST}
+    return sorted(on_disk - listed), sorted(listed - on_disk)
+
+
+def profile_imports(target: str = "main", top: int = 25):
+    """`python -X importtime` 으로 target 임포트 시 모듈별 누적 시간을 측정합니다."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    rows = []
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        self_us, cumulative_us, name = int(fields[0]), int(fields[1]), fields[2].strip()
+        if name == target:
+            total = cumulative_us
+        rows.append((cumulative_us, self_us, name))
+    return total, sorted(rows, reverse=True)[:top]
+
+
+def main(argv):
+    if "--check" in argv:
+        missing, stale = check_manifest()
+        if missing or stale:
+            print(f"ROUTER_MANIFEST 에 없는 라우터: {missing}")
+            print(f"파일이 없는 매니페스트 항목: {stale}")
+            return 1
+        print("ROUTER_MANIFEST OK")
+        return 0
+    total, rows = profile_imports()
+    print(f"import main: {total / 1000:.1f} ms")
+    print(f"{'cumulative(ms)':>15} {'self(ms)':>10}  module")
+    for cumulative_us, self_us, name in rows:
+        print(f"{cumulative_us / 1000:15.1f} {self_us / 1000:10.1f}  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
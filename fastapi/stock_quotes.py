@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime
+
+import httpx
+
+from metrics import outbound
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# 주가 수집 설정
+# ============================================
+
+STOCK_SYMBOLS = [s.strip() for s in os.getenv("STOCK_SYMBOLS", "005380,000270").split(",") if s.strip()]
+STOCK_REFRESH_SECONDS = float(os.getenv("STOCK_REFRESH_SECONDS", "30"))
+STOCK_HISTORY_SIZE = int(os.getenv("STOCK_HISTORY_SIZE", "100"))
+# 이 시간보다 오래된 시세는 히스토리에서 제외
+STOCK_HISTORY_TTL = float(os.getenv("STOCK_HISTORY_TTL", "86400"))
+STOCK_FETCH_TIMEOUT = float(os.getenv("STOCK_FETCH_TIMEOUT", "5"))
+NAVER_FINANCE_URL = os.getenv("NAVER_FINANCE_URL", "https://finance.naver.com")
+
+
+def parse_naver_price(html: str) -> float:
+    """네이버 금융 종목 페이지에서 현재가를 추출합니다."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    price_element = soup.select_one(".no_today .blind")
+    if not price_element:
+        raise ValueError("주가 정보를 찾을 수 없습니다.")
+    return float(price_element.text.replace(",", ""))
+
+
+class NaverStockSource:
+    """네이버 금융 시세 소스. base_url 을 바꾸면 로컬 테스트 서버를 사용할 수 있습니다."""
+
+    def __init__(self, base_url: str = NAVER_FINANCE_URL, timeout: float = STOCK_FETCH_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._client = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        return self._client
+
+    async def fetch(self, symbol: str) -> float:
+        async with outbound("naver"):
+            response = await self._get_client().get(f"{self.base_url}/item/main.nhn", params={"code": symbol})
+            response.raise_for_status()
+        # HTML 파싱은 CPU 작업이므로 이벤트 루프 밖에서 실행
+        return await asyncio.to_thread(parse_naver_price, response.text)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class StockQuoteService:
+    """종목별 수집 태스크가 주기적으로 시세를 갱신하고, 엔드포인트는 캐시만 읽습니다."""
+
+    def __init__(self, source=None, symbols=None, interval: float = STOCK_REFRESH_SECONDS,
+                 history_size: int = STOCK_HISTORY_SIZE, ttl: float = STOCK_HISTORY_TTL):
+        self.source = source if source is not None else NaverStockSource()
+        self.symbols = list(symbols if symbols is not None else STOCK_SYMBOLS)
+        self.interval = interval
+        self.ttl = ttl
+        self._history = {symbol: deque(maxlen=history_size) for symbol in self.symbols}
+        self._fetched_at = {}
+        self._tasks = []
+
+    def _expire(self, symbol: str):
+        series = self._history[symbol]
+        cutoff = time.time() - self.ttl
+        while series and series[0]["fetched_at"] < cutoff:
+            series.popleft()
+
+    async def refresh(self, symbol: str):
+        price = await self.source.fetch(symbol)
+        now = time.time()
+        self._fetched_at[symbol] = now
+        series = self._history[symbol]
+        self._expire(symbol)
+        # 이전 데이터와 동일할 경우 추가하지 않음
+        if series and series[-1]["price"] == price:
+            return
+        series.append({
+            "time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "price": price,
+            "fetched_at": now,
+        })
+
+    async def _run(self, symbol: str):
+        while True:
+            try:
+                await self.refresh(symbol)
+            except Exception as e:
+                logger.warning("stock %s refresh failed: %s", symbol, e)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._run(symbol), name=f"stock-{symbol}") for symbol in self.symbols
+            ]
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.source.close()
+
+    def history(self, symbol: str, limit: int = 10):
+        """캐시된 시세 히스토리(최근 limit 개). 수집 대상이 아니면 KeyError"""
+        self._expire(symbol)
+        series = list(self._history[symbol])[-limit:]
+        return [{"time": entry["time"], "price": entry["price"]} for entry in series]
+
+    def last_fetched(self, symbol: str):
+        return self._fetched_at.get(symbol)
+
+
+stock_quote_service = StockQuoteService()
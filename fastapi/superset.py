@@ -1,10 +1,150 @@
+import asyncio
+import logging
+import os
+import time
+
 import httpx
 
-async def get_superset_data():
-    superset_url = "http://localhost:8088/api/v1/dashboard/"  # Superset API 엔드포인트
+from metrics import outbound
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# Superset 게이트웨이 설정
+# ============================================
+
+SUPERSET_URL = os.getenv("SUPERSET_URL", "http://localhost:8088")
+SUPERSET_TIMEOUT = float(os.getenv("SUPERSET_TIMEOUT", "10"))
+SUPERSET_POOL_SIZE = int(os.getenv("SUPERSET_POOL_SIZE", "10"))
+# 이 시간 안의 응답은 그대로 사용
+SUPERSET_CACHE_TTL = float(os.getenv("SUPERSET_CACHE_TTL", "30"))
+# TTL 이 지나도 이 시간까지는 기존 응답을 주고 백그라운드에서 갱신 (stale-while-revalidate)
+SUPERSET_STALE_TTL = float(os.getenv("SUPERSET_STALE_TTL", "600"))
+
+DASHBOARD_PATH = "/api/v1/dashboard/"
+
+
+class CachedResponse:
+    __slots__ = ("value", "fetched_at")
+
+    def __init__(self, value):
+        self.value = value
+        self.fetched_at = time.monotonic()
+
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+
+class SupersetGateway:
+    """Superset API 호출을 한 곳에서 처리합니다.
+
+    - 워커당 하나의 httpx 클라이언트(커넥션 풀)를 재사용
+    - 같은 요청이 동시에 들어오면 Superset 호출은 한 번만 (single-flight)
+    - TTL 이 지난 응답은 즉시 돌려주고 백그라운드에서 갱신, 갱신 실패 시 기존 응답 유지
+    base_url 이나 transport 를 바꾸면 로컬 스텁 서버로 테스트할 수 있습니다.
+    """
+
+    def __init__(self, base_url: str = SUPERSET_URL, ttl: float = SUPERSET_CACHE_TTL,
+                 stale_ttl: float = SUPERSET_STALE_TTL, timeout: float = SUPERSET_TIMEOUT,
+                 pool_size: int = SUPERSET_POOL_SIZE, transport=None):
+        self.base_url = base_url.rstrip("/")
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.transport = transport
+        self._client = None
+        self._cache = {}
+        self._inflight = {}
+        self.upstream_calls = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.errors = 0
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(superset_url)  # 헤더에서 Authorization 제거
-        response.raise_for_status()  # 오류 발생 시 예외 발생
-        return response.json()  # JSON 데이터 반환
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                transport=self.transport,
+            )
+        return self._client
 
+    async def _fetch(self, key, path: str, params):
+        self.upstream_calls += 1
+        async with outbound("superset"):
+            response = await self._get_client().get(path, params=params)
+            response.raise_for_status()
+        entry = self._cache[key] = CachedResponse(response.json())
+        return entry
+
+    def _fetch_once(self, key, path: str, params) -> asyncio.Future:
+        """같은 키의 조회가 진행 중이면 그 결과를 함께 기다림"""
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._inflight[key] = asyncio.ensure_future(self._fetch(key, path, params))
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return future
+
+    def _revalidate(self, key, path: str, params):
+        future = self._fetch_once(key, path, params)
+
+        def report(f):
+            if not f.cancelled() and f.exception() is not None:
+                self.errors += 1
+                logger.warning("superset revalidate failed for %s: %s", path, f.exception())
+
+        future.add_done_callback(report)
+
+    async def get(self, path: str, params=None):
+        key = (path, tuple(sorted((params or {}).items())))
+        entry = self._cache.get(key)
+        if entry is not None:
+            age = entry.age()
+            if age < self.ttl:
+                self.hits += 1
+                return entry.value
+            if age < self.stale_ttl:
+                self.stale_hits += 1
+                self._revalidate(key, path, params)
+                return entry.value
+        try:
+            return (await asyncio.shield(self._fetch_once(key, path, params))).value
+        except (httpx.HTTPError, ValueError):
+            self.errors += 1
+            if entry is not None:
+                # Superset 장애 시에는 오래된 응답이라도 반환
+                logger.warning("superset unavailable, serving cached %s (age %.0fs)", path, entry.age())
+                return entry.value
+            raise
+
+    async def get_dashboards(self):
+        return await self.get(DASHBOARD_PATH)
+
+    def invalidate(self):
+        self._cache.clear()
+
+    async def close(self):
+        for future in list(self._inflight.values()):
+            future.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self):
+        return {
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "upstream_calls": self.upstream_calls,
+            "errors": self.errors,
+        }
+
+
+superset_gateway = SupersetGateway()
+
+
+async def get_superset_data():
+    """Superset 대시보드 목록 (게이트웨이 캐시 사용)"""
+    return await superset_gateway.get_dashboards()
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# 테스트는 AUTH_SECRET 없이 실행 (auth 모듈이 프로세스별 임의 키를 사용)
+os.environ.setdefault("AUTH_DEV_MODE", "1")
+
+# 모듈을 `python main.py` 와 같은 방식(fastapi/ 기준 임포트)으로 불러오기 위함
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
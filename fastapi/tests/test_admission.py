@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+import admission
+from admission import ConcurrencyLimiter, MemoryRateLimitBackend
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(admission.time, "monotonic", clock)
+    return clock
+
+
+def test_token_bucket_allows_burst_then_refills(clock):
+    backend = MemoryRateLimitBackend()
+
+    async def run():
+        burst = [await backend.take("client", rate=2.0, burst=3) for _ in range(4)]
+        clock.now += 0.5
+        refilled = await backend.take("client", rate=2.0, burst=3)
+        other = await backend.take("other", rate=2.0, burst=3)
+        return burst, refilled, other
+
+    burst, refilled, other = asyncio.run(run())
+    assert burst[:3] == [0.0, 0.0, 0.0]
+    assert burst[3] == pytest.approx(0.5)
+    assert refilled == 0.0
+    assert other == 0.0
+
+
+def test_full_buckets_are_swept(clock, monkeypatch):
+    monkeypatch.setattr(MemoryRateLimitBackend, "SWEEP_EVERY", 4)
+    backend = MemoryRateLimitBackend()
+
+    async def run():
+        for n in range(3):
+            await backend.take(f"client-{n}", rate=1.0, burst=2)
+        clock.now += 10
+        await backend.take("late", rate=1.0, burst=2)
+
+    asyncio.run(run())
+    assert list(backend._buckets) == ["late"]
+
+
+def test_concurrency_limiter_queues_then_rejects():
+    limiter = ConcurrencyLimiter(limit=2, max_queue=1, timeout=0.2)
+
+    async def request(hold: float):
+        if not await limiter.acquire():
+            return "rejected"
+        try:
+            await asyncio.sleep(hold)
+            return "ok"
+        finally:
+            limiter.release()
+
+    async def run():
+        return await asyncio.gather(*(request(0.05) for _ in range(5)))
+
+    results = asyncio.run(run())
+    # 2개는 바로, 1개는 대기열에서 차례를 받고, 나머지는 대기열이 가득 차 거절
+    assert results.count("ok") == 3
+    assert results.count("rejected") == 2
+    assert limiter.active == 0 and limiter.waiting == 0
+
+
+def test_concurrency_limiter_times_out_in_queue():
+    limiter = ConcurrencyLimiter(limit=1, max_queue=5, timeout=0.01)
+
+    async def run():
+        assert await limiter.acquire()
+        try:
+            return await limiter.acquire()
+        finally:
+            limiter.release()
+
+    assert asyncio.run(run()) is False
+    assert limiter.waiting == 0
@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from auth import issue_token, decode_token, get_current_user
+
+
+def test_token_round_trip():
+    claims = decode_token(issue_token(1001, "홍길동", "manager"))
+    assert claims["sub"] == 1001
+    assert claims["name"] == "홍길동"
+
+
+@pytest.mark.parametrize("signature", ["é" * 43, "서명", "\x00"])
+def test_non_ascii_signature_is_invalid(signature):
+    payload = issue_token(1001, "홍길동", "manager").split(".")[0]
+    with pytest.raises(ValueError, match="invalid signature"):
+        decode_token(f"{payload}.{signature}")
+
+
+def test_non_ascii_payload_is_malformed():
+    with pytest.raises(ValueError, match="malformed token"):
+        decode_token("페이로드.signature")
+
+
+def test_malformed_signature_header_is_401():
+    payload = issue_token(1001, "홍길동", "manager").split(".")[0]
+    # 헤더 값은 latin-1 로 디코딩되어 들어옴
+    header = f"Bearer {payload}.".encode("ascii") + "ÿé".encode("latin-1")
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(get_current_user(header.decode("latin-1")))
+    assert exc.value.status_code == 401
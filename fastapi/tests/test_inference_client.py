@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from inference_client import InferenceClient, InferenceError
+
+
+class FakeModelApi:
+    """InferenceClient._post 대체. batch 가 False 면 배치 URL 에 404"""
+
+    def __init__(self, batch=True, delay=0.0):
+        self.batch = batch
+        self.delay = delay
+        self.calls = []
+
+    async def __call__(self, url, payload):
+        self.calls.append((url, payload["data"]))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if url == "batch":
+            if not self.batch:
+                raise InferenceError("모델 API 예측 실패, 상태: 404", 404)
+            return {"predictions": [sum(row) for row in payload["data"]]}
+        return {"prediction": sum(payload["data"])}
+
+
+def _client(api, **kwargs):
+    client = InferenceClient(url="one", batch_url=kwargs.pop("batch_url", "batch"), **kwargs)
+    client._post = api
+    return client
+
+
+def test_defaults_do_not_batch():
+    client = InferenceClient(url="one", batch_url="")
+    assert not client.batching
+
+
+def test_concurrent_calls_share_one_batch():
+    api = FakeModelApi()
+    client = _client(api, max_batch_size=8, max_wait=0.05)
+
+    async def run():
+        try:
+            return await asyncio.gather(*(client.predict([n, 1]) for n in range(5)))
+        finally:
+            await client.close()
+
+    assert asyncio.run(run()) == [1, 2, 3, 4, 5]
+    assert [url for url, _ in api.calls] == ["batch"]
+
+
+def test_missing_batch_endpoint_falls_back_to_single_calls():
+    api = FakeModelApi(batch=False)
+    client = _client(api, max_batch_size=8, max_wait=0.05)
+
+    async def run():
+        try:
+            first = await asyncio.gather(*(client.predict([n]) for n in range(3)))
+            second = await asyncio.gather(*(client.predict([n]) for n in range(3)))
+            return first, second
+        finally:
+            await client.close()
+
+    assert asyncio.run(run()) == ([0, 1, 2], [0, 1, 2])
+    urls = [url for url, _ in api.calls]
+    assert urls.count("batch") == 1
+    assert urls.count("one") == 6
+    assert client.batch_url is None
+
+
+def test_close_fails_pending_calls():
+    api = FakeModelApi(delay=1.0)
+    client = _client(api, max_batch_size=2, max_wait=0.01)
+
+    async def run():
+        calls = [asyncio.create_task(client.predict([n])) for n in range(5)]
+        await asyncio.sleep(0.05)
+        await client.close()
+        return await asyncio.wait_for(asyncio.gather(*calls, return_exceptions=True), 1)
+
+    results = asyncio.run(run())
+    assert len(results) == 5
+    assert all(isinstance(r, InferenceError) for r in results)
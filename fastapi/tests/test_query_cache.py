@@ -0,0 +1,126 @@
+import asyncio
+
+import query_cache
+from query_cache import MemoryGenerationStore, MySQLGenerationStore, QueryCache
+
+
+class Loader:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0)
+        return {"version": self.calls}
+
+
+def test_hit_until_invalidated():
+    cache = QueryCache(generations=MemoryGenerationStore())
+    loader = Loader()
+
+    async def run():
+        first = await cache.get_or_load("k", loader, tags=("model",))
+        again = await cache.get_or_load("k", loader, tags=("model",))
+        await cache.invalidate("model")
+        fresh = await cache.get_or_load("k", loader, tags=("model",))
+        return first, again, fresh
+
+    first, again, fresh = asyncio.run(run())
+    assert again is first
+    assert fresh.body != first.body
+    assert loader.calls == 2
+
+
+def test_invalidation_reaches_other_workers():
+    shared = MemoryGenerationStore()
+    worker_a, worker_b = QueryCache(generations=shared), QueryCache(generations=shared)
+    loader = Loader()
+
+    async def run():
+        stale = await worker_b.get_or_load("k", loader, tags=("employees",))
+        await worker_a.invalidate("employees")
+        return stale, await worker_b.get_or_load("k", loader, tags=("employees",))
+
+    stale, fresh = asyncio.run(run())
+    assert fresh is not stale
+    assert loader.calls == 2
+
+
+def test_other_tags_stay_cached():
+    cache = QueryCache(generations=MemoryGenerationStore())
+    loader = Loader()
+
+    async def run():
+        entry = await cache.get_or_load("k", loader, tags=("model",))
+        await cache.invalidate("employees")
+        return entry, await cache.get_or_load("k", loader, tags=("model",))
+
+    entry, again = asyncio.run(run())
+    assert again is entry
+    assert loader.calls == 1
+
+
+def test_concurrent_misses_load_once():
+    cache = QueryCache(generations=MemoryGenerationStore())
+    loader = Loader()
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_load("k", loader, tags=("model",)) for _ in range(5)))
+
+    entries = asyncio.run(run())
+    assert all(entry is entries[0] for entry in entries)
+    assert loader.calls == 1
+
+
+class CountingConnection:
+    """cache_generation 조회를 흉내 내고 커넥션 사용 횟수를 셉니다."""
+
+    def __init__(self, table):
+        self.table = table
+        self.calls = 0
+        self._rows = []
+
+    def __call__(self, db):
+        self.calls += 1
+        return self
+
+    def cursor(self):
+        return self
+
+    async def execute(self, sql, params=None):
+        self._rows = list(self.table.items())
+
+    async def fetchall(self):
+        return self._rows
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def test_hits_do_not_touch_generation_table(monkeypatch):
+    table = {"model": 3}
+    connection = CountingConnection(table)
+    monkeypatch.setattr(query_cache, "acquire", connection)
+    store = MySQLGenerationStore()
+    cache = QueryCache(generations=store)
+    loader = Loader()
+
+    async def run():
+        await store.sync()
+        first = await cache.get_or_load("k", loader, tags=("model",))
+        calls_before = connection.calls
+        hits = [await cache.get_or_load("k", loader, tags=("model",)) for _ in range(50)]
+        hit_calls = connection.calls - calls_before
+        # 다른 워커의 무효화는 다음 동기화 때 반영
+        table["model"] = 4
+        await store.sync()
+        return first, hits, hit_calls, await cache.get_or_load("k", loader, tags=("model",))
+
+    first, hits, hit_calls, fresh = asyncio.run(run())
+    assert hit_calls == 0
+    assert all(hit is first for hit in hits)
+    assert fresh is not first
+    assert loader.calls == 2
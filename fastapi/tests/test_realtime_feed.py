@@ -0,0 +1,55 @@
+import asyncio
+from datetime import datetime
+
+from realtime_feed import FeedChannel, FeedLeader, Subscription
+from replay import MemoryCursorStore
+
+
+class FakeEngine:
+    columns = ["idx", "working_time"]
+
+    def __init__(self, store, count: int):
+        self.store = store
+        self.rows = [(i, datetime(2024, 5, 1, 13, 0, i)) for i in range(1, count + 1)]
+
+    async def fetch_after(self, after_idx: int, limit: int):
+        return [row for row in self.rows if row[0] > after_idx][:limit]
+
+
+def _worker(store, lock_path):
+    # 워커마다 자신의 엔진/잠금 파일 핸들을 가지고 커서 저장소만 공유
+    channel = FeedChannel("welding", FakeEngine(store, 3), FeedLeader(lock_path), interval=0)
+    received = []
+    # 생산자 태스크 대신 테스트에서 _step 을 직접 호출
+    channel.listeners.append(lambda row: received.append(row["idx"]))
+    return channel, received
+
+
+def test_workers_follow_one_shared_position(tmp_path):
+    lock_path = str(tmp_path / "feed.lock")
+    store = MemoryCursorStore()
+
+    async def run():
+        leader, leader_rows = _worker(store, lock_path)
+        follower, follower_rows = _worker(store, lock_path)
+        for _ in range(5):
+            await leader._step()
+            await follower._step()
+        return leader, follower, leader_rows, follower_rows
+
+    leader, follower, leader_rows, follower_rows = asyncio.run(run())
+    assert leader.leader.held and not follower.leader.held
+    # 시작할 때의 위치(1) 다음부터 따라가고, 끝까지 재생하면 처음으로 돌아감
+    assert leader_rows == [2, 3, 1]
+    assert follower_rows == leader_rows
+    leader.leader.release()
+
+
+def test_publish_serializes_rows_with_fast_json():
+    channel = FeedChannel("welding", FakeEngine(MemoryCursorStore(), 0), FeedLeader(), interval=0)
+    subscription = Subscription(4)
+    channel.subscribers.add(subscription)
+    channel.publish({"idx": 1, "working_time": datetime(2024, 5, 1, 13), "name": "용접"})
+    message = subscription.queue.get_nowait()
+    assert isinstance(message, str)
+    assert '"2024-05-01T13:00:00"' in message and "용접" in message
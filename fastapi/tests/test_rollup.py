@@ -0,0 +1,164 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+import rollup
+from rollup import RollupEngine, LiveScoreWriter, bucket_start, parse_bucket, score_deltas
+
+
+def test_merge_sql_counts_each_signal_and_skips_null_keys():
+    sql = RollupEngine()._merge_sql("press", "hour")
+    assert "COUNT(r.pressure_1)" in sql
+    assert "pressure_1_count = pressure_1_count + VALUES(pressure_1_count)" in sql
+    assert "COALESCE(r.machine_name, ''), COALESCE(r.item_no, '')" in sql
+    assert "r.working_time IS NOT NULL" in sql
+    # 예측/불량 건수는 집계할 때 예측 테이블에서 세어 누적
+    assert "LEFT JOIN press_quality_score q ON q.idx = r.idx" in sql
+    assert "COUNT(q.idx), COALESCE(SUM(q.is_defect), 0)" in sql
+    assert "defect_count = defect_count + VALUES(defect_count)" in sql
+    assert "%%H:00:00" in sql
+
+
+@pytest.mark.parametrize("granularity, start", [
+    ("minute", datetime(2024, 5, 1, 13, 59)),
+    ("hour", datetime(2024, 5, 1, 13)),
+    ("day", datetime(2024, 5, 1)),
+    # 2024-05-01 은 수요일 -> 그 주 월요일
+    ("week", datetime(2024, 4, 29)),
+    ("month", datetime(2024, 5, 1)),
+])
+def test_bucket_start(granularity, start):
+    assert bucket_start(granularity, datetime(2024, 5, 1, 13, 59, 42, 500)) == start
+
+
+def test_score_deltas_count_new_scores_and_changed_defects():
+    t = datetime(2024, 5, 1, 13, 30)
+    raw = [(1, "w-1", "A", t), (2, "w-1", "A", t), (3, "w-1", "A", t), (4, "w-2", "", t)]
+    # 1: 처음 예측(불량), 2: 불량 -> 정상, 3: 결과 같음, 4: 처음 예측(정상)
+    previous = {2: 1, 3: 0}
+    current = {1: 1, 2: 0, 3: 0, 4: 0}
+    deltas = {(g, m): (s, d) for s, d, g, _, m, _ in score_deltas(raw, previous, current)}
+    assert deltas[("hour", "w-1")] == (1, 0)
+    assert deltas[("month", "w-2")] == (1, 0)
+    assert len(deltas) == 10
+    assert score_deltas([(3, "w-1", "A", t)], previous, current) == []
+
+
+def test_malformed_bucket_rejected():
+    assert parse_bucket("2024-05-01T13:00:00") == datetime(2024, 5, 1, 13)
+    with pytest.raises(ValueError):
+        parse_bucket("yesterday")
+
+
+class FakeCursor:
+    def __init__(self, results):
+        self.results = list(results)
+        self.executed = []
+
+    async def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+
+    async def executemany(self, sql, params):
+        self.executed.append((sql, list(params)))
+
+    async def fetchall(self):
+        return self.results.pop(0)
+
+    async def fetchone(self):
+        return self.results.pop(0)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+    async def begin(self):
+        pass
+
+    async def commit(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def test_query_reads_stored_counts_only(monkeypatch):
+    # press 신호 4개: (count, sum, sumsq, min, max)
+    signals = [(2, 10.0, 52.0, 4.0, 6.0)] + [(0, 0.0, 0.0, None, None)] * 3
+    rollup_row = ("press-1", "A", 3, 3, 1) + tuple(value for signal in signals for value in signal)
+    cursor = FakeCursor([[rollup_row]])
+    monkeypatch.setattr(rollup, "acquire", lambda db: FakeConnection(cursor))
+    engine = RollupEngine()
+    engine._ready.add("press")
+    result = asyncio.run(engine.query("press", "hour", "2024-05-01T13:00:00"))
+
+    row = result["rows"][0]
+    assert row["count"] == 3
+    assert row["signals"]["pressure_1"]["mean"] == 5.0
+    assert row["signals"]["pressure_1"]["stddev"] == 1.0
+    assert row["signals"]["pressure_2"]["mean"] is None
+    assert row["scored_count"] == 3
+    assert row["defect_rate"] == pytest.approx(1 / 3)
+    # 원본/예측 테이블은 읽지 않음
+    assert len(cursor.executed) == 1
+
+
+def test_record_scores_applies_deltas_only_below_watermark(monkeypatch):
+    t = datetime(2024, 5, 1, 13, 30)
+    cursor = FakeCursor([
+        (10,),              # 워터마크
+        [(5, 1)],           # idx 5 는 이전에 불량으로 예측됨
+        [(5, "w-1", "A", t), (6, "w-1", "A", t)],
+    ])
+    monkeypatch.setattr(rollup, "acquire", lambda db: FakeConnection(cursor))
+    engine = RollupEngine()
+    engine._ready.add("welding")
+    asyncio.run(engine.record_scores("welding", "m-1", [5, 6, 11], [0.0, 1.0, 1.0]))
+
+    sql = [statement for statement, _ in cursor.executed]
+    assert "LOCK IN SHARE MODE" in sql[0]
+    assert sql[1].endswith("FOR UPDATE")
+    assert cursor.executed[2][1] == [(5, "m-1", 0.0, 0), (6, "m-1", 1.0, 1), (11, "m-1", 1.0, 1)]
+    # 워터마크 이후(11)는 집계할 때 세어지므로 원본을 읽지 않음
+    assert cursor.executed[3][1] == [5, 6]
+    updates = {params[2]: params[:2] for params in cursor.executed[4][1]}
+    # idx 5: 불량 -> 정상 (건수 그대로, 불량 -1), idx 6: 새 예측(불량)
+    assert updates["hour"] == (1, 0)
+    assert set(updates) == set(rollup.GRANULARITIES)
+
+
+def test_live_score_writer_batches_and_retries():
+    calls = []
+
+    class Engine:
+        fail = True
+
+        async def record_scores(self, process, model_use_id, idx, predictions):
+            calls.append((process, model_use_id, idx, predictions))
+            if self.fail:
+                raise RuntimeError("db down")
+
+    engine = Engine()
+    writer = LiveScoreWriter(engine)
+    writer.record("welding", "m-1", 1, 0.0)
+    writer.record("welding", "m-1", 1, 1.0)
+    writer.record("welding", "m-1", 2, 0.0)
+    with pytest.raises(RuntimeError):
+        asyncio.run(writer.flush())
+    engine.fail = False
+    asyncio.run(writer.flush())
+    assert calls[-1] == ("welding", "m-1", [1, 2], [1.0, 0.0])
+    assert calls[0] == calls[-1]
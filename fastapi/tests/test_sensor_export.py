@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from sensor_export import ExportQuery
+
+pa = pytest.importorskip("pyarrow")
+
+
+def _fake_pages(query, total=7):
+    """idx 1..total 의 원본 행을 흉내 내는 fetch_page"""
+    calls = []
+
+    async def fetch_page(after_idx):
+        calls.append(after_idx)
+        rows = []
+        for idx in range(after_idx + 1, total + 1):
+            row = {"idx": idx, "machine_name": f"press-{idx % 3}", "press_time_ms": float(idx)}
+            rows.append(tuple(row[c] for c in query._select))
+            if len(rows) == query.batch_rows:
+                break
+        return rows
+
+    query.fetch_page = fetch_page
+    return calls
+
+
+async def _collect(query):
+    return [batch async for batch in query.batches()]
+
+
+def test_idx_is_cursor_even_when_not_first():
+    query = ExportQuery("press", columns=["machine_name", "idx"], batch_rows=3)
+    calls = _fake_pages(query)
+    batches = asyncio.run(_collect(query))
+    assert query._select[0] == "idx"
+    assert calls == [0, 3, 6]
+    table = pa.Table.from_batches(batches)
+    assert table.column_names == ["machine_name", "idx"]
+    assert table.column("idx").to_pylist() == list(range(1, 8))
+
+
+def test_idx_omitted_from_output():
+    query = ExportQuery("press", columns=["press_time_ms"], batch_rows=4)
+    _fake_pages(query)
+    table = pa.Table.from_batches(asyncio.run(_collect(query)))
+    assert table.column_names == ["press_time_ms"]
+    assert table.num_rows == 7
+
+
+def test_zero_bounds_are_kept():
+    query = ExportQuery("press", start_idx=0, end_idx=0)
+    assert query.first_idx == -1
+    assert "idx <= %s" in query._filters
+    assert query._params == [0]
+
+
+def test_unknown_column_rejected():
+    with pytest.raises(ValueError):
+        ExportQuery("press", columns=["nope"])
@@ -0,0 +1,100 @@
+import asyncio
+
+import httpx
+
+from superset import SupersetGateway, DASHBOARD_PATH
+
+
+class StubSuperset:
+    """httpx.MockTransport 핸들러. gate 가 열릴 때까지 응답을 보류합니다."""
+
+    def __init__(self):
+        self.calls = 0
+        self.status = 200
+        self.version = 1
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        assert request.url.path == DASHBOARD_PATH
+        self.calls += 1
+        await self.gate.wait()
+        if self.status != 200:
+            return httpx.Response(self.status, json={"message": "unavailable"})
+        return httpx.Response(200, json={"result": [{"id": 1, "version": self.version}]})
+
+
+def _gateway(stub: StubSuperset) -> SupersetGateway:
+    return SupersetGateway(base_url="http://superset.test", ttl=30, stale_ttl=600,
+                           transport=httpx.MockTransport(stub))
+
+
+def _age(gateway: SupersetGateway, seconds: float):
+    for entry in gateway._cache.values():
+        entry.fetched_at -= seconds
+
+
+def test_concurrent_calls_share_one_upstream_request():
+    async def run():
+        stub = StubSuperset()
+        stub.gate.clear()
+        gateway = _gateway(stub)
+        calls = [asyncio.create_task(gateway.get_dashboards()) for _ in range(10)]
+        await asyncio.sleep(0)
+        stub.gate.set()
+        results = await asyncio.gather(*calls)
+        await gateway.close()
+        return stub, gateway, results
+
+    stub, gateway, results = asyncio.run(run())
+    assert stub.calls == 1
+    assert gateway.upstream_calls == 1
+    assert all(result == results[0] for result in results)
+
+
+def test_stale_entry_returned_immediately_and_refreshed_in_background():
+    async def run():
+        stub = StubSuperset()
+        gateway = _gateway(stub)
+        first = await gateway.get_dashboards()
+        _age(gateway, 31)
+        stub.version = 2
+        stub.gate.clear()
+        # 갱신 응답이 보류된 상태에서도 기존 값을 바로 반환
+        stale = await asyncio.wait_for(gateway.get_dashboards(), 1)
+        stub.gate.set()
+        await asyncio.gather(*gateway._inflight.values())
+        fresh = await gateway.get_dashboards()
+        await gateway.close()
+        return stub, gateway, first, stale, fresh
+
+    stub, gateway, first, stale, fresh = asyncio.run(run())
+    assert stale == first
+    assert fresh["result"][0]["version"] == 2
+    assert stub.calls == 2
+    assert gateway.stale_hits == 1
+
+
+def test_cached_value_served_when_upstream_fails():
+    async def run():
+        stub = StubSuperset()
+        gateway = _gateway(stub)
+        first = await gateway.get_dashboards()
+        stub.status = 503
+        # stale_ttl 도 지나 백그라운드 갱신 대신 직접 조회하는 경우
+        _age(gateway, 601)
+        fallback = await gateway.get_dashboards()
+        # 백그라운드 갱신이 실패해도 기존 값을 유지
+        _age(gateway, -560)
+        stale = await gateway.get_dashboards()
+        await asyncio.sleep(0.01)
+        after_failed_refresh = await gateway.get_dashboards()
+        await gateway.close()
+        return stub, gateway, first, fallback, stale, after_failed_refresh
+
+    stub, gateway, first, fallback, stale, after_failed_refresh = asyncio.run(run())
+    assert fallback == first
+    assert stale == first
+    assert after_failed_refresh == first
+    assert stub.calls >= 3
+    assert gateway.errors >= 2
@@ -0,0 +1,28 @@
+import numpy as np
+
+from trend import lttb
+
+
+def test_lttb_returns_input_when_small_enough():
+    x = np.arange(5, dtype=np.float64)
+    y = x * 2
+    sx, sy = lttb(x, y, 10)
+    assert sx is x and sy is y
+
+
+def test_lttb_keeps_endpoints_and_size():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.sin(x / 50)
+    sx, sy = lttb(x, y, 100)
+    assert len(sx) == len(sy) == 100
+    assert sx[0] == 0 and sx[-1] == 999
+    assert np.all(np.diff(sx) > 0)
+    assert np.array_equal(sy, y[sx.astype(np.int64)])
+
+
+def test_lttb_keeps_spike():
+    x = np.arange(500, dtype=np.float64)
+    y = np.zeros(500)
+    y[123] = 50.0
+    _, sy = lttb(x, y, 20)
+    assert sy.max() == 50.0
@@ -0,0 +1,170 @@
+import math
+import os
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from quality_scores import PROCESSES
+
+# ============================================
+# 트렌드 엔진 설정
+# ============================================
+
+TREND_WINDOW = int(os.getenv("TREND_WINDOW", "3600"))
+TREND_EWMA_ALPHA = float(os.getenv("TREND_EWMA_ALPHA", "0.1"))
+# 관리 한계: 이동 평균 ± k·σ
+TREND_SIGMA_K = float(os.getenv("TREND_SIGMA_K", "3"))
+# 관리 한계를 계산하기 전에 필요한 최소 샘플 수
+TREND_MIN_SAMPLES = int(os.getenv("TREND_MIN_SAMPLES", "30"))
+TREND_DEFAULT_WIDTH = int(os.getenv("TREND_DEFAULT_WIDTH", "300"))
+
+TREND_SIGNALS = {process: spec["features"] for process, spec in PROCESSES.items()}
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int):
+    """Largest-Triangle-Three-Buckets 다운샘플링. 차트 폭에 맞춰 모양을 유지하며 점 개수를 줄입니다."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+    sampled = np.empty(threshold, dtype=np.int64)
+    sampled[0] = 0
+    sampled[-1] = n - 1
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        bx, by = x[start:end], y[start:end]
+        area = np.abs((x[a] - avg_x) * (by - y[a]) - (x[a] - bx) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        sampled[i + 1] = a
+    return x[sampled], y[sampled]
+
+
+class SignalWindow:
+    """신호 하나에 대한 고정 크기 배열 링 버퍼.
+
+    이동 평균/분산은 합과 제곱합을, EWMA 는 직전 값을 갱신하므로 샘플당 O(1) 입니다.
+    백분위수는 조회 시 윈도우 전체에서 계산합니다.
+    """
+
+    def __init__(self, capacity: int = TREND_WINDOW):
+        self.capacity = capacity
+        self.xs = np.zeros(capacity, dtype=np.float64)
+        self.values = np.zeros(capacity, dtype=np.float64)
+        self.head = 0
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.ewma = None
+        self.breach_count = 0
+        self.breaches = deque(maxlen=50)
+
+    def limits(self):
+        if self.count < TREND_MIN_SAMPLES:
+            return None, None
+        mean = self.total / self.count
+        sigma = math.sqrt(max(self.total_sq / self.count - mean * mean, 0.0))
+        return mean - TREND_SIGMA_K * sigma, mean + TREND_SIGMA_K * sigma
+
+    def push(self, x: float, value: float):
+        lcl, ucl = self.limits()
+        if lcl is not None and not (lcl <= value <= ucl):
+            self.breach_count += 1
+            self.breaches.append({"x": x, "value": value, "lcl": lcl, "ucl": ucl})
+
+        if self.count == self.capacity:
+            old = float(self.values[self.head])
+            self.total -= old
+            self.total_sq -= old * old
+        else:
+            self.count += 1
+        self.xs[self.head] = x
+        self.values[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        self.total += value
+        self.total_sq += value * value
+        if self.head == 0:
+            # 덧셈/뺄셈 누적 오차를 한 바퀴마다 정리 (분할 상환 O(1))
+            self.total = float(self.values.sum())
+            self.total_sq = float(np.dot(self.values, self.values))
+        self.ewma = value if self.ewma is None else TREND_EWMA_ALPHA * value + (1 - TREND_EWMA_ALPHA) * self.ewma
+
+    def ordered(self):
+        """오래된 순서의 (x, value) 배열"""
+        if self.count < self.capacity:
+            return self.xs[:self.count], self.values[:self.count]
+        order = np.r_[self.head:self.capacity, 0:self.head]
+        return self.xs[order], self.values[order]
+
+    def summary(self, width: int):
+        xs, values = self.ordered()
+        lcl, ucl = self.limits()
+        mean = self.total / self.count if self.count else None
+        stddev = math.sqrt(max(self.total_sq / self.count - mean * mean, 0.0)) if self.count else None
+        p50 = p95 = p99 = None
+        if self.count:
+            p50, p95, p99 = (float(v) for v in np.percentile(values, [50, 95, 99]))
+        sx, sy = lttb(xs, values, width)
+        return {
+            "count": self.count,
+            "mean": mean,
+            "stddev": stddev,
+            "ewma": self.ewma,
+            "p50": p50,
+            "p95": p95,
+            "p99": p99,
+            "lcl": lcl,
+            "ucl": ucl,
+            "breach_count": self.breach_count,
+            "recent_breaches": list(self.breaches),
+            "series": {"x": sx.tolist(), "y": sy.tolist()},
+        }
+
+
+class TrendEngine:
+    """실시간 행을 설비/신호별 슬라이딩 윈도우에 적재합니다."""
+
+    def __init__(self, capacity: int = TREND_WINDOW):
+        self.capacity = capacity
+        self._windows = {process: {} for process in TREND_SIGNALS}
+
+    def ingest(self, process: str, row: dict):
+        machines = self._windows.get(process)
+        if machines is None:
+            return
+        machine = row.get("machine_name")
+        signals = machines.get(machine)
+        if signals is None:
+            signals = machines[machine] = {s: SignalWindow(self.capacity) for s in TREND_SIGNALS[process]}
+        working_time = row.get("working_time")
+        x = working_time.timestamp() if isinstance(working_time, datetime) else float(row["idx"])
+        for signal, window in signals.items():
+            value = row.get(signal)
+            if value is not None:
+                window.push(x, float(value))
+
+    def listener(self, process: str):
+        return lambda row: self.ingest(process, row)
+
+    def machines(self, process: str):
+        return sorted(self._windows.get(process, {}), key=str)
+
+    def query(self, process: str, machine: str, signals=None, width: int = TREND_DEFAULT_WIDTH):
+        windows = self._windows.get(process, {}).get(machine)
+        if windows is None:
+            raise KeyError(machine)
+        selected = signals or list(windows)
+        unknown = [s for s in selected if s not in windows]
+        if unknown:
+            raise ValueError(f"Unknown signal: {', '.join(unknown)}")
+        return {
+            "machine_name": machine,
+            "signals": {s: windows[s].summary(width) for s in selected},
+        }
+
+
+trend_engine = TrendEngine()
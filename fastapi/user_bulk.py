@@ -0,0 +1,119 @@
+import csv
+import io
+import json
+import os
+
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+
+# ============================================
+# 사용자/그룹 일괄 처리 설정
+# ============================================
+
+# 한 요청에서 처리할 수 있는 최대 행 수
+USER_BULK_MAX_ROWS = int(os.getenv("USER_BULK_MAX_ROWS", "5000"))
+
+
+class BulkUser(BaseModel):
+    name: str
+    employeeNo: int
+    position: str
+
+
+class BulkUserUpdate(BaseModel):
+    employeeNo: int
+    position: str
+
+
+class BulkEmployeeNo(BaseModel):
+    employeeNo: int
+
+
+class BulkGroup(BaseModel):
+    group_name: str
+    description: str = ""
+
+
+class BulkGroupId(BaseModel):
+    id: int
+
+
+async def read_rows(request: Request):
+    """JSON 배열 또는 CSV 업로드(multipart 의 file 필드, text/csv 본문)를 dict 목록으로 읽습니다."""
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="file 필드에 CSV 파일을 첨부하세요.")
+        rows = parse_csv(await upload.read())
+    elif content_type.startswith("text/csv"):
+        rows = parse_csv(await request.body())
+    else:
+        try:
+            rows = json.loads(await request.body())
+        except UnicodeDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"JSON 본문이 UTF-8 이 아닙니다 (바이트 {e.start}).")
+        except json.JSONDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"JSON 형식 오류: {e.msg} ({e.lineno}번째 줄 {e.colno}번째 글자)")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="JSON 배열이 필요합니다.")
+    if len(rows) > USER_BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"한 번에 최대 {USER_BULK_MAX_ROWS}행까지 처리할 수 있습니다.")
+    return rows
+
+
+def parse_csv(data: bytes):
+    """CSV -> dict 목록. 디코딩/형식 오류는 몇 번째 줄인지 담아 400"""
+    try:
+        # 엑셀에서 저장한 CSV 의 BOM 제거
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError as e:
+        line = data.count(b"\n", 0, e.start) + 1
+        raise HTTPException(status_code=400, detail=f"CSV 가 UTF-8 이 아닙니다 ({line}번째 줄). UTF-8 로 저장해 주세요.")
+    reader = csv.DictReader(io.StringIO(text))
+    try:
+        return [
+            {key.strip(): (value.strip() if isinstance(value, str) else value) for key, value in row.items() if key}
+            for row in reader
+        ]
+    except csv.Error as e:
+        raise HTTPException(status_code=400, detail=f"CSV 형식 오류: {e} ({reader.line_num}번째 줄)")
+
+
+def validate_rows(rows, model):
+    """행마다 모델 검증. (행 번호, 모델) 목록과 실패한 행의 결과 목록을 반환"""
+    valid, report = [], []
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            report.append({"row": number, "status": "error", "detail": "객체 형식이 아닙니다."})
+            continue
+        try:
+            valid.append((number, model(**row)))
+        except ValidationError as e:
+            errors = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            report.append({"row": number, "status": "error", "detail": errors})
+    return valid, report
+
+
+def find_duplicates(valid, key):
+    """같은 요청 안에서 key 가 중복된 행 번호 집합 (처음 나온 행은 제외)"""
+    seen, duplicated = set(), set()
+    for number, item in valid:
+        value = key(item)
+        if value in seen:
+            duplicated.add(number)
+        seen.add(value)
+    return duplicated
+
+
+def placeholders(count: int) -> str:
+    return ", ".join(["%s"] * count)
+
+
+def summarize(report):
+    report.sort(key=lambda item: item["row"])
+    counts = {}
+    for item in report:
+        counts[item["status"]] = counts.get(item["status"], 0) + 1
+    return {"summary": counts, "results": report}
@@ -0,0 +1,123 @@
+import base64
+import json
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from fastapi import HTTPException
+
+# ============================================
+# 사용자 목록 페이지 설정
+# ============================================
+
+USER_LIST_DEFAULT_LIMIT = int(os.getenv("USER_LIST_DEFAULT_LIMIT", "100"))
+USER_LIST_MAX_LIMIT = int(os.getenv("USER_LIST_MAX_LIMIT", "500"))
+
+NO_LOGIN_TEXT = "최근 기록이 없음"
+# last_login 이 NULL 인 행도 키셋 비교가 가능하도록 정렬할 때 쓰는 값
+NULL_LOGIN = "1000-01-01 00:00:00"
+
+# 정렬 키 -> SQL 식. 모든 정렬은 employee_no(유일) 를 보조 키로 사용합니다.
+SORT_COLUMNS = {
+    "employee_no": "employee_no",
+    "name": "name",
+    "position": "position",
+    "last_login": f"COALESCE(last_login, '{NULL_LOGIN}')",
+}
+TOTAL_MODES = ("none", "estimate", "exact")
+
+KST_OFFSET = timedelta(hours=9)
+
+
+def _local_to_kst() -> np.timedelta64:
+    """DB 의 naive datetime 을 서버 로컬 시간으로 보고 KST 로 옮기는 오프셋 (프로세스당 한 번 계산)"""
+    local_offset = datetime.now().astimezone().utcoffset() or timedelta(0)
+    return np.timedelta64(int((KST_OFFSET - local_offset).total_seconds()), "s")
+
+
+LOCAL_TO_KST = _local_to_kst()
+
+
+def format_kst(values):
+    """last_login 목록을 한 번에 KST ISO 문자열로 변환합니다. NULL 은 NO_LOGIN_TEXT"""
+    if not values:
+        return []
+    stamps = np.array([v if v is not None else np.datetime64("NaT") for v in values], dtype="datetime64[s]")
+    texts = np.char.add(np.datetime_as_string(stamps + LOCAL_TO_KST, unit="s"), "+09:00")
+    return np.where(np.isnat(stamps), NO_LOGIN_TEXT, texts).tolist()
+
+
+def encode_cursor(sort_value, employee_no: int) -> str:
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.strftime("%Y-%m-%d %H:%M:%S")
+    raw = json.dumps([sort_value, employee_no], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, employee_no = json.loads(raw)
+        return sort_value, int(employee_no)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="잘못된 cursor 입니다.")
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def build_filters(position=None, name_prefix=None, last_login_from=None, last_login_to=None):
+    """WHERE 조건 목록과 파라미터. 이름은 접두어 검색이라 name 인덱스를 사용할 수 있습니다."""
+    clauses, params = [], []
+    if position:
+        clauses.append("position = %s")
+        params.append(position)
+    if name_prefix:
+        clauses.append("name LIKE %s")
+        params.append(_escape_like(name_prefix) + "%")
+    if last_login_from:
+        clauses.append("last_login >= %s")
+        params.append(last_login_from)
+    if last_login_to:
+        clauses.append("last_login < %s")
+        params.append(last_login_to)
+    return clauses, params
+
+
+def build_page_query(clauses, params, sort: str, order: str, limit: int, cursor=None):
+    """키셋 페이지 조회 SQL. 다음 페이지 여부를 알기 위해 limit + 1 행을 읽습니다."""
+    if sort not in SORT_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"sort 는 {list(SORT_COLUMNS)} 중 하나여야 합니다.")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order 는 asc 또는 desc 여야 합니다.")
+    column = SORT_COLUMNS[sort]
+    op = ">" if order == "asc" else "<"
+    clauses, params = list(clauses), list(params)
+    if cursor is not None:
+        sort_value, employee_no = decode_cursor(cursor)
+        if sort == "employee_no":
+            clauses.append(f"employee_no {op} %s")
+            params.append(employee_no)
+        else:
+            clauses.append(f"({column} {op} %s OR ({column} = %s AND employee_no {op} %s))")
+            params.extend([sort_value, sort_value, employee_no])
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    order_by = f"employee_no {order}" if sort == "employee_no" else f"{column} {order}, employee_no {order}"
+    sql = (
+        f"SELECT name, employee_no, position, last_login FROM employees{where} "
+        f"ORDER BY {order_by} LIMIT %s"
+    )
+    return sql, params + [limit + 1]
+
+
+def sort_value_of(row, sort: str):
+    name, employee_no, position, last_login = row
+    if sort == "name":
+        return name
+    if sort == "position":
+        return position
+    if sort == "last_login":
+        return last_login if last_login is not None else NULL_LOGIN
+    return employee_no
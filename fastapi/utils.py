@@ -1,13 +1,11 @@
-import logging
-from passlib.context import CryptContext
+# 비밀번호 해시/검증은 credentials 모듈로 통합했습니다.
+# bcrypt 는 credentials 의 프로세스 풀에서 실행되므로 async 핸들러에서 await 로 호출합니다.
+from credentials import credential_service
 
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+async def hash_password(password: str) -> str:
+    return await credential_service.hash(password)
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await credential_service.check(plain_password, hashed_password)